@@ -1,6 +1,8 @@
-from typing import List
+import json
+from typing import AsyncIterator, List, Literal, Optional, Union
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 
 from .models import (
     CreateSessionResponse,
@@ -12,22 +14,34 @@ from .models import (
     ConceptNodeModel,
     ConceptEdgeModel,
     ConceptGraphResponse,
+    ConceptGraphDeltaResponse,
+    ConceptSubgraphResponse,
     GoalNodeInitRequest,
     GoalNodeResponse,
     ConceptExpandRequest,
     ConceptDeclutterRequest,
     ConceptDeclutterResponse,
     ConceptExpandResponse,
+    GoalRefinementJobResponse,
 )
 from .chat_service import ChatService
 from .concept_graph import ConceptGraphService
 from .goal_node import GoalNodeService, InteractionEvent
+from .session_locks import SessionLocks
+
+# Upper bound on concepts returned by the neighborhood/subgraph routes.
+SUBGRAPH_MAX_CONCEPTS = 1000
+
+# Polled routes: intermediaries may store the response but must revalidate it with the ETag.
+POLL_CACHE_CONTROL = "no-cache"
 
 def build_router(
     chat: ChatService,
     concept_graphs: ConceptGraphService,
     goal_nodes: GoalNodeService,
+    locks: SessionLocks,
 ) -> APIRouter:
+    # Every route that mutates a session's graph or goal holds that session's lock.
     router = APIRouter(prefix="/v1/chat", tags=["chat"])
 
     @router.post("/sessions", response_model=CreateSessionResponse)
@@ -43,7 +57,7 @@ def build_router(
             session_id=session_id,
             created_ts=s.created_ts,
             started_ts=s.first_user_ts,
-            messages=s.messages,
+            messages=[m.to_model() for m in s.messages],
         )
 
     @router.post("/sessions/{session_id}/end", response_model=SessionElapsedResponse)
@@ -56,7 +70,7 @@ def build_router(
 
     @router.post("/sessions/{session_id}/generate", response_model=GenerateResponse)
     async def generate(session_id: str, req: GenerateRequest):
-        if not chat.get_state(session_id):
+        if not chat.has_session(session_id):
             raise HTTPException(status_code=404, detail="session not found")
 
         content = await chat.generate(
@@ -69,30 +83,115 @@ def build_router(
 
         return GenerateResponse(content=content)
 
+    @router.post("/sessions/{session_id}/generate/stream")
+    async def generate_stream(session_id: str, req: GenerateRequest):
+        if not chat.has_session(session_id):
+            raise HTTPException(status_code=404, detail="session not found")
+
+        deltas = chat.generate_stream(
+            session_id=session_id,
+            user_text=req.content,
+            system_prompt=req.system_prompt,
+            persist=req.persist,
+            model=req.model,
+        )
+        return StreamingResponse(
+            _sse_events(deltas),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
     @router.post(
         "/sessions/{session_id}/concept-graph/build",
         response_model=ConceptGraphResponse,
     )
     async def build_concept_graph(session_id: str, req: ConceptGraphBuildRequest):
         try:
-            graph = await concept_graphs.build_graph(session_id, mode=req.mode)
+            async with locks.hold(session_id):
+                await concept_graphs.build_graph(session_id, mode=req.mode, use_cache=req.use_cache)
         except KeyError:
             raise HTTPException(status_code=404, detail="session not found")
-        return ConceptGraphResponse(**graph.to_dict())
+        return Response(content=concept_graphs.export_graph_json(session_id), media_type="application/json")
 
-    @router.get("/sessions/{session_id}/concept-graph", response_model=ConceptGraphResponse)
-    def get_concept_graph(session_id: str):
+    @router.get(
+        "/sessions/{session_id}/concept-graph",
+        response_model=Union[ConceptGraphDeltaResponse, ConceptGraphResponse],
+    )
+    async def get_concept_graph(
+        session_id: str,
+        request: Request,
+        since: Optional[int] = Query(default=None, ge=0),
+    ):
+        # Runs on the event loop so it never observes a background build mid-merge.
         try:
-            data = concept_graphs.export_graph(session_id)
+            etag = concept_graphs.graph_etag(session_id)
         except KeyError:
             raise HTTPException(status_code=404, detail="session not found")
-        return ConceptGraphResponse(**data)
+        if _etag_matches(request, etag):
+            return _not_modified(etag)
+        # The graph encodes itself from cached fragments; skip re-validating it through pydantic.
+        body = concept_graphs.export_graph_json(session_id, since=since)
+        return Response(
+            content=body,
+            media_type="application/json",
+            headers={"ETag": etag, "Cache-Control": POLL_CACHE_CONTROL},
+        )
+
+    @router.get("/sessions/{session_id}/concept-graph/subgraph", response_model=ConceptSubgraphResponse)
+    async def get_concept_subgraph(
+        session_id: str,
+        concept_id: Optional[List[str]] = Query(default=None),
+        type: Optional[List[str]] = Query(default=None),
+        relation: Optional[List[str]] = Query(default=None),
+        limit: int = Query(default=200, ge=1, le=SUBGRAPH_MAX_CONCEPTS),
+    ):
+        try:
+            body = concept_graphs.subgraph_json(
+                session_id,
+                concept_ids=concept_id,
+                types=type,
+                relations=relation,
+                limit=limit,
+            )
+        except KeyError:
+            raise HTTPException(status_code=404, detail="session not found")
+        return Response(content=body, media_type="application/json")
+
+    @router.get(
+        "/sessions/{session_id}/concept-graph/{concept_id}/neighborhood",
+        response_model=ConceptSubgraphResponse,
+    )
+    async def get_concept_neighborhood(
+        session_id: str,
+        concept_id: str,
+        hops: int = Query(default=1, ge=0, le=5),
+        direction: Literal["out", "in", "both"] = "both",
+        relation: Optional[List[str]] = Query(default=None),
+        limit: int = Query(default=200, ge=1, le=SUBGRAPH_MAX_CONCEPTS),
+    ):
+        try:
+            body = concept_graphs.neighborhood_json(
+                session_id,
+                concept_id,
+                hops=hops,
+                direction=direction,
+                relations=relation,
+                limit=limit,
+            )
+        except KeyError as exc:
+            detail = "concept not found" if "concept" in str(exc) else "session not found"
+            raise HTTPException(status_code=404, detail=detail)
+        return Response(content=body, media_type="application/json")
 
     @router.post(
         "/sessions/{session_id}/concept-graph/{concept_id}/expand",
         response_model=ConceptExpandResponse,
     )
     async def expand_concept(session_id: str, concept_id: str, req: ConceptExpandRequest):
+        async with locks.hold(session_id):
+            return await _expand_concept(session_id, concept_id, req)
+
+    async def _expand_concept(session_id: str, concept_id: str, req: ConceptExpandRequest):
         try:
             concept_graphs.apply_focus_data(
                 session_id,
@@ -107,13 +206,22 @@ def build_router(
         events = [
             InteractionEvent(concept_id=concept_id, event="expand", strength=req.strength)
         ]
+        background = req.auto_refine and req.refine_in_background
+        pending_events: List[InteractionEvent] = []
         try:
-            await goal_nodes.apply_interactions(session_id, events, auto_refine=req.auto_refine)
+            if background:
+                # Focus updates are cheap; the LLM work runs as a job. Without a goal yet,
+                # the job creates it and applies the events first.
+                if goal_nodes.record_interactions(session_id, events) is None:
+                    pending_events = events
+            else:
+                await goal_nodes.apply_interactions(session_id, events, auto_refine=req.auto_refine)
         except KeyError:
             raise HTTPException(status_code=404, detail="session not found")
 
         new_children: List[ConceptNodeModel] = []
         new_edges: List[ConceptEdgeModel] = []
+        child_ids: List[str] = []
         try:
             concept = concept_graphs.get_concept(session_id, concept_id)
         except KeyError:
@@ -132,16 +240,26 @@ def build_router(
             new_children = [ConceptNodeModel(**child) for child in result.get("children", [])]
             new_edges = [ConceptEdgeModel(**edge) for edge in result.get("edges", [])]
             child_ids = [child.id for child in new_children]
-            if req.auto_refine and child_ids:
+            if req.auto_refine and child_ids and not background:
                 try:
                     await goal_nodes.refine_for_concepts(session_id, child_ids)
                 except KeyError:
                     raise HTTPException(status_code=404, detail="session not found")
 
+        job_id = None
+        if background:
+            job = goal_nodes.enqueue_refinement(
+                session_id,
+                events=pending_events,
+                concept_ids=child_ids,
+                select_focus=True,
+            )
+            job_id = job.id
         return ConceptExpandResponse(
             concept=ConceptNodeModel(**concept),
             new_children=new_children,
             new_edges=new_edges,
+            refine_job_id=job_id,
         )
 
     @router.post(
@@ -149,6 +267,10 @@ def build_router(
         response_model=ConceptDeclutterResponse,
     )
     async def declutter_concept(session_id: str, concept_id: str, req: ConceptDeclutterRequest):
+        async with locks.hold(session_id):
+            return await _declutter_concept(session_id, concept_id, req)
+
+    async def _declutter_concept(session_id: str, concept_id: str, req: ConceptDeclutterRequest):
         try:
             result = concept_graphs.declutter_concept(
                 session_id,
@@ -163,33 +285,113 @@ def build_router(
         child_models = [ConceptNodeModel(**child) for child in result.get("children", [])]
         edge_models = [ConceptEdgeModel(**edge) for edge in result.get("edges", [])]
 
+        job_id = None
         if req.auto_refine and child_models:
-            try:
-                await goal_nodes.refine_for_concepts(session_id, [child.id for child in child_models])
-            except KeyError:
-                raise HTTPException(status_code=404, detail="session not found")
+            child_ids = [child.id for child in child_models]
+            if req.refine_in_background:
+                job_id = goal_nodes.enqueue_refinement(session_id, concept_ids=child_ids).id
+            else:
+                try:
+                    await goal_nodes.refine_for_concepts(session_id, child_ids)
+                except KeyError:
+                    raise HTTPException(status_code=404, detail="session not found")
 
         return ConceptDeclutterResponse(
             parent=ConceptNodeModel(**result["parent"]),
             children=child_models,
             edges=edge_models,
             skipped_expansions=result.get("skipped_expansions", []),
+            refine_job_id=job_id,
         )
 
     @router.post("/sessions/{session_id}/goal", response_model=GoalNodeResponse)
     async def initialize_goal_node(session_id: str, req: GoalNodeInitRequest):
         try:
-            goal = await goal_nodes.initialize_goal(session_id, force=req.force)
+            async with locks.hold(session_id):
+                goal = await goal_nodes.initialize_goal(session_id, force=req.force)
         except KeyError:
             raise HTTPException(status_code=404, detail="session not found")
         return GoalNodeResponse(**goal_nodes.serialize(goal))
 
     @router.get("/sessions/{session_id}/goal", response_model=GoalNodeResponse)
-    async def get_goal_node(session_id: str, create_if_missing: bool = True):
-        try:
-            goal = await goal_nodes.get_goal(session_id, create_if_missing=create_if_missing)
-        except KeyError:
-            raise HTTPException(status_code=404, detail="goal node not found")
+    async def get_goal_node(
+        session_id: str,
+        request: Request,
+        response: Response,
+        create_if_missing: bool = True,
+    ):
+        goal = goal_nodes.peek_goal(session_id)
+        if goal is None:
+            # Generating the first goal is a write; polling an existing one is not.
+            try:
+                async with locks.hold(session_id):
+                    goal = await goal_nodes.get_goal(session_id, create_if_missing=create_if_missing)
+            except KeyError:
+                raise HTTPException(status_code=404, detail="goal node not found")
+        etag = goal_nodes.etag(goal)
+        if _etag_matches(request, etag):
+            return _not_modified(etag)
+        _set_validators(response, etag)
         return GoalNodeResponse(**goal_nodes.serialize(goal))
 
+    @router.get("/sessions/{session_id}/goal/jobs/{job_id}", response_model=GoalRefinementJobResponse)
+    def get_refinement_job(session_id: str, job_id: str):
+        job = goal_nodes.get_job(job_id)
+        if job is None or job.session_id != session_id:
+            raise HTTPException(status_code=404, detail="job not found")
+        goal = goal_nodes.peek_goal(session_id) if job.status == "done" else None
+        return GoalRefinementJobResponse(
+            id=job.id,
+            session_id=job.session_id,
+            status=job.status,
+            concept_ids=job.concept_ids,
+            coalesced=job.coalesced,
+            created_ts=job.created_ts,
+            started_ts=job.started_ts,
+            finished_ts=job.finished_ts,
+            error=job.error,
+            goal=GoalNodeResponse(**goal_nodes.serialize(goal)) if goal is not None else None,
+        )
+
     return router
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    # If-None-Match uses weak comparison, so W/ prefixes are ignored on both sides.
+    wanted = etag.removeprefix("W/")
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == wanted:
+            return True
+    return False
+
+
+def _set_validators(response: Response, etag: str) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = POLL_CACHE_CONTROL
+
+
+def _not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": POLL_CACHE_CONTROL})
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _sse_events(deltas: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Frame deltas as SSE; a client disconnect cancels this generator and closes the upstream stream."""
+    parts: List[str] = []
+    try:
+        async for delta in deltas:
+            parts.append(delta)
+            yield _sse("delta", {"content": delta})
+    except Exception:
+        yield _sse("error", {"detail": "generation failed"})
+        return
+    finally:
+        await deltas.aclose()
+    yield _sse("done", {"content": "".join(parts)})
@@ -0,0 +1,287 @@
+import atexit
+import hashlib
+import logging
+import os
+import pickle
+import shutil
+import socket
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Generic, Optional, Tuple, TypeVar
+
+V = TypeVar("V")
+
+logger = logging.getLogger(__name__)
+
+_process_dirs: Dict[Tuple[int, str], Path] = {}
+
+
+def process_spill_dir(base: str) -> Path:
+    """This process's private directory under the shared spill root `base`.
+
+    Every worker spills under `<base>/<host>-<pid>-<token>/`, so workers sharing
+    `base` never read, overwrite or wipe each other's files. The directory is
+    removed at exit; directories left by dead processes on this host are swept
+    when the first one is created.
+    """
+    key = (os.getpid(), str(base))
+    path = _process_dirs.get(key)
+    if path is None:
+        root = Path(base)
+        host = socket.gethostname()
+        _sweep_dead_process_dirs(root, host)
+        path = root / f"{host}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        path.mkdir(parents=True, exist_ok=True)
+        _process_dirs[key] = path
+        atexit.register(shutil.rmtree, path, True)
+    return path
+
+
+def _sweep_dead_process_dirs(root: Path, host: str) -> None:
+    if not root.is_dir():
+        return
+    for child in root.iterdir():
+        owner, _, rest = child.name.rpartition("-")[0].rpartition("-")
+        if owner != host or not rest.isdigit() or not child.is_dir():
+            continue
+        try:
+            os.kill(int(rest), 0)
+        except ProcessLookupError:
+            shutil.rmtree(child, ignore_errors=True)
+        except OSError:
+            continue
+
+
+@dataclass(frozen=True)
+class CacheLimits:
+    """Capacity settings for a store; `None` disables the corresponding bound."""
+
+    max_items: Optional[int] = None
+    max_bytes: Optional[int] = None
+    idle_ttl: Optional[float] = None
+    spill_dir: Optional[str] = None
+
+
+@dataclass
+class _Entry(Generic[V]):
+    value: V
+    size: int
+    last_access: float
+
+
+class SpillingLRUCache(Generic[V]):
+    """LRU map with idle-TTL eviction that spills evicted values to disk.
+
+    Evicted entries are written as zlib-compressed pickles under this process's
+    `process_spill_dir(spill_dir)/<name>/` and transparently reloaded on the next
+    `get`. Eviction only pickles on the caller's thread; compression and file I/O
+    run on a background writer, and a value is served from its pickle until the
+    write lands. `on_drop` is called with values that leave the cache for good:
+    evicted without a spill directory, or replaced while spilled.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        limits: Optional[CacheLimits] = None,
+        sizer: Optional[Callable[[V], int]] = None,
+        on_drop: Optional[Callable[[V], None]] = None,
+    ) -> None:
+        self._name = name
+        self._limits = limits or CacheLimits()
+        self._sizer = sizer or (lambda _value: 1)
+        self._on_drop = on_drop
+        self._entries: "OrderedDict[str, _Entry[V]]" = OrderedDict()
+        self._bytes = 0
+        self._spill_root: Optional[Path] = None
+        if self._limits.spill_dir:
+            self._spill_root = process_spill_dir(self._limits.spill_dir) / name
+            self._spill_root.mkdir(parents=True, exist_ok=True)
+        self._spilled: Dict[str, Path] = {}
+        # Pickles whose compressed file is not written yet, guarded by `_pending_lock`.
+        self._pending: Dict[str, bytes] = {}
+        self._pending_lock = threading.Lock()
+        self._writer: Optional[ThreadPoolExecutor] = None
+        self.evictions = 0
+        self.spills = 0
+        self.reloads = 0
+
+    def __len__(self) -> int:
+        return len(self._entries) + len(self._spilled)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries or key in self._spilled
+
+    def get(self, key: str) -> Optional[V]:
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry.last_access = now
+            self._entries.move_to_end(key)
+            self._expire(now)
+            return entry.value
+        value = self._reload(key)
+        if value is None:
+            return None
+        self._insert(key, value, now)
+        return value
+
+    def put(self, key: str, value: V) -> V:
+        self._discard_spill(key)
+        self._insert(key, value, time.time())
+        return value
+
+    def touch(self, key: str) -> None:
+        """Re-measure an entry after in-place mutation and mark it recently used."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+        size = self._sizer(entry.value)
+        self._bytes += size - entry.size
+        entry.size = size
+        entry.last_access = time.time()
+        self._entries.move_to_end(key)
+        self._enforce(entry.last_access, keep=key)
+
+    def pop(self, key: str) -> Optional[V]:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return self._reload(key)
+        self._bytes -= entry.size
+        return entry.value
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "resident": len(self._entries),
+            "spilled": len(self._spilled),
+            "resident_bytes": self._bytes,
+            "evictions": self.evictions,
+            "spills": self.spills,
+            "reloads": self.reloads,
+            "pending_writes": len(self._pending),
+        }
+
+    def close(self) -> None:
+        """Stop the writer and delete this cache's spill files."""
+        if self._writer is not None:
+            self._writer.shutdown(wait=True)
+            self._writer = None
+        if self._spill_root is not None:
+            shutil.rmtree(self._spill_root, ignore_errors=True)
+        self._spilled.clear()
+        self._pending.clear()
+
+    # ------------------------------------------------------------------ helpers
+    def _insert(self, key: str, value: V, now: float) -> None:
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= previous.size
+        size = self._sizer(value)
+        self._entries[key] = _Entry(value=value, size=size, last_access=now)
+        self._bytes += size
+        self._enforce(now, keep=key)
+
+    def _enforce(self, now: float, *, keep: str) -> None:
+        self._expire(now)
+        limits = self._limits
+        while len(self._entries) > 1:
+            over_items = limits.max_items is not None and len(self._entries) > limits.max_items
+            over_bytes = limits.max_bytes is not None and self._bytes > limits.max_bytes
+            if not (over_items or over_bytes):
+                break
+            oldest = next(iter(self._entries))
+            if oldest == keep:
+                break
+            self._evict(oldest)
+
+    def _expire(self, now: float) -> None:
+        ttl = self._limits.idle_ttl
+        if not ttl:
+            return
+        cutoff = now - ttl
+        while self._entries:
+            oldest_key, oldest = next(iter(self._entries.items()))
+            if oldest.last_access >= cutoff:
+                break
+            self._evict(oldest_key)
+
+    def _evict(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+        self.evictions += 1
+        if self._spill_root is None:
+            if self._on_drop is not None:
+                self._on_drop(entry.value)
+            return
+        path = self._spill_root / f"{hashlib.sha1(key.encode('utf-8')).hexdigest()}.bin"
+        # Pickle here so the snapshot is consistent; the writer only compresses and writes it.
+        raw = pickle.dumps((key, entry.value), protocol=pickle.HIGHEST_PROTOCOL)
+        with self._pending_lock:
+            self._pending[key] = raw
+        self._spilled[key] = path
+        self._submit(self._write_spill, key, raw, path)
+        self.spills += 1
+
+    def _reload(self, key: str) -> Optional[V]:
+        path = self._spilled.pop(key, None)
+        if path is None:
+            return None
+        with self._pending_lock:
+            raw = self._pending.pop(key, None)
+        try:
+            if raw is None:
+                raw = zlib.decompress(path.read_bytes())
+            stored_key, value = pickle.loads(raw)
+        except (OSError, zlib.error, pickle.UnpicklingError):
+            return None
+        finally:
+            # Queued behind any pending write of the same file.
+            self._submit(self._unlink, path)
+        if stored_key != key:
+            return None
+        self.reloads += 1
+        return value
+
+    def _discard_spill(self, key: str) -> None:
+        if key not in self._spilled:
+            return
+        if self._on_drop is None:
+            path = self._spilled.pop(key)
+            with self._pending_lock:
+                self._pending.pop(key, None)
+            self._submit(self._unlink, path)
+            return
+        value = self._reload(key)
+        if value is not None:
+            self._on_drop(value)
+
+    def _submit(self, fn: Callable[..., None], *args: object) -> None:
+        if self._writer is None:
+            # One thread keeps writes and deletes of the same file in order.
+            self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"spill-{self._name}")
+        self._writer.submit(fn, *args)
+
+    def _write_spill(self, key: str, raw: bytes, path: Path) -> None:
+        tmp_path = path.with_suffix(".tmp")
+        try:
+            tmp_path.write_bytes(zlib.compress(raw))
+            tmp_path.replace(path)
+        except OSError:
+            # Keep serving the entry from its in-memory pickle.
+            logger.warning("spill write failed for %s", path, exc_info=True)
+            return
+        with self._pending_lock:
+            # A newer eviction of the same key may have replaced the pickle meanwhile.
+            if self._pending.get(key) is raw:
+                del self._pending[key]
+
+    @staticmethod
+    def _unlink(path: Path) -> None:
+        path.unlink(missing_ok=True)
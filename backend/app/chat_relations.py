@@ -1,7 +1,8 @@
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import List, Optional, Sequence
 
-from .models import ChatMessage, Role
+from .message_record import MessageRecord
+from .models import Role
 
 
 @dataclass
@@ -15,7 +16,7 @@ class RelationNode:
     ts: float
 
 
-def build_relational_view(messages: List[ChatMessage]) -> List[RelationNode]:
+def build_relational_view(messages: Sequence[MessageRecord]) -> List[RelationNode]:
     """Produce a simple linked structure showing how the conversation flows."""
     nodes: List[RelationNode] = []
     previous_id: Optional[str] = None
@@ -1,19 +1,43 @@
+import asyncio
 import time
-from typing import Optional, List
+from typing import AsyncIterator, Callable, Dict, Optional, List
 
-from .config import CHAT_MAX_HISTORY, OPENAI_MODEL
-from .context_loader import load_initial_context
-from .models import ChatMessage
+from .config import (
+    CHAT_CONTEXT_MODEL_BUDGETS,
+    CHAT_CONTEXT_TOKEN_BUDGET,
+    CHAT_MAX_HISTORY,
+    CHAT_SUMMARY_ENABLED,
+    CHAT_SUMMARY_MAX_TOKENS,
+    OPENAI_MODEL,
+)
+from .context_builder import ContextBuilder, message_tokens, render_transcript
+from .context_loader import load_docs_retriever
+from .message_record import MessageRecord
 from .openai_client import OpenAIClient
-from .store import InMemoryChatStore
+from .store import ChatStore
 from .chat_relations import RelationNode, build_relational_view
-from .prompts import CHAT_SYSTEM_PROMPT
+from .prompts import CHAT_SUMMARY_PROMPT, CHAT_SYSTEM_PROMPT
 
 class ChatService:
-    def __init__(self, store: InMemoryChatStore, llm: OpenAIClient) -> None:
+    def __init__(
+        self,
+        store: ChatStore,
+        llm: OpenAIClient,
+        *,
+        context_builder: Optional[ContextBuilder] = None,
+    ) -> None:
         self._store = store
         self._llm = llm
-        self._doc_context = load_initial_context()
+        self._docs = load_docs_retriever()
+        self._context = context_builder or ContextBuilder(
+            default_budget=CHAT_CONTEXT_TOKEN_BUDGET,
+            model_budgets=CHAT_CONTEXT_MODEL_BUDGETS,
+        )
+        self._summarizers: Dict[str, "asyncio.Task"] = {}
+        self._listeners: List[Callable[[str], None]] = []
+        self._prompt_tokens_last = 0
+        self.summaries_written = 0
+        self.summary_failures = 0
 
     def create_session(self) -> str:
         return self._store.create_session()
@@ -21,18 +45,30 @@ class ChatService:
     def get_state(self, session_id: str):
         return self._store.get_session(session_id)
 
-    def _build_context(self, session_id: str, system_prompt: Optional[str]) -> List[dict]:
-        msgs = self._store.list_messages(session_id)[-CHAT_MAX_HISTORY:]
-        out: List[dict] = [
-            {"role": "system", "content": CHAT_SYSTEM_PROMPT},
-        ]
-        if self._doc_context:
-            out.append({"role": "system", "content": self._doc_context})
-        if system_prompt:
-            out.append({"role": "system", "content": system_prompt})
-        for m in msgs:
-            out.append({"role": m.role, "content": m.content})
-        return out
+    def has_session(self, session_id: str) -> bool:
+        return self._store.has_session(session_id)
+
+    def add_message_listener(self, listener: Callable[[str], None]) -> None:
+        """Call `listener(session_id)` after each generated turn has been stored."""
+        self._listeners.append(listener)
+
+    async def _build_context(self, session_id: str, system_prompt: Optional[str], model: str) -> List[dict]:
+        total = self._store.count_messages(session_id)
+        window = self._store.list_messages(session_id, limit=CHAT_MAX_HISTORY)
+        window_start = total - len(window)
+        summary, summary_upto = self._store.get_summary(session_id)
+        query = next((m.content for m in reversed(window) if m.role == "user"), "")
+        doc_context = await self._docs.context_for_async(query)
+        packed = self._context.pack(
+            model=model,
+            system_parts=[CHAT_SYSTEM_PROMPT, doc_context.render(), system_prompt or ""],
+            window=window,
+            summary=summary,
+            window_is_complete=window_start == 0,
+        )
+        self._prompt_tokens_last = packed.tokens
+        self._schedule_summary(session_id, window_start + packed.first_kept, summary_upto)
+        return packed.messages
 
     async def generate(
         self,
@@ -43,16 +79,44 @@ class ChatService:
         persist: bool,
         model: Optional[str],
     ) -> str:
-        self._store.append(session_id, ChatMessage(role="user", content=user_text))
-        context = self._build_context(session_id, system_prompt)
+        self._store.append(session_id, MessageRecord.create("user", user_text))
         chosen_model = model or OPENAI_MODEL
-        full = await self._llm.generate_text(model=chosen_model, messages=context)
+        context = await self._build_context(session_id, system_prompt, chosen_model)
+        full = await self._llm.generate_text(model=chosen_model, messages=context, policy="chat")
 
         if persist and full:
-            self._store.append(session_id, ChatMessage(role="assistant", content=full))
+            self._store.append(session_id, MessageRecord.create("assistant", full))
+        self._notify(session_id)
 
         return full
 
+    async def generate_stream(
+        self,
+        *,
+        session_id: str,
+        user_text: str,
+        system_prompt: Optional[str],
+        persist: bool,
+        model: Optional[str],
+    ) -> AsyncIterator[str]:
+        """Yield assistant deltas; the assembled reply is persisted only if the stream completes."""
+        self._store.append(session_id, MessageRecord.create("user", user_text))
+        chosen_model = model or OPENAI_MODEL
+        context = await self._build_context(session_id, system_prompt, chosen_model)
+        deltas = self._llm.stream_text(model=chosen_model, messages=context, policy="chat")
+        parts: List[str] = []
+        try:
+            async for delta in deltas:
+                parts.append(delta)
+                yield delta
+        finally:
+            await deltas.aclose()
+
+        full = "".join(parts)
+        if persist and full:
+            self._store.append(session_id, MessageRecord.create("assistant", full))
+        self._notify(session_id)
+
     def get_relational_view(self, session_id: str) -> List[RelationNode]:
         session = self._store.get_session(session_id)
         if not session:
@@ -65,3 +129,65 @@ class ChatService:
             raise KeyError("session not found")
         start = session.first_user_ts or session.created_ts
         return max(0.0, time.time() - start)
+
+    def context_stats(self) -> Dict[str, int]:
+        return {
+            "prompt_tokens_last": self._prompt_tokens_last,
+            "summaries_running": len(self._summarizers),
+            "summaries_written": self.summaries_written,
+            "summary_failures": self.summary_failures,
+        }
+
+    def close(self) -> None:
+        for task in list(self._summarizers.values()):
+            task.cancel()
+
+    # ------------------------------------------------------------------ helpers
+    def _notify(self, session_id: str) -> None:
+        for listener in self._listeners:
+            listener(session_id)
+
+    def _schedule_summary(self, session_id: str, dropped_upto: int, summary_upto: int) -> None:
+        """Fold turns that fell out of the budget into the running summary, off the request path."""
+        if not CHAT_SUMMARY_ENABLED or dropped_upto <= summary_upto or session_id in self._summarizers:
+            return
+        task = asyncio.ensure_future(self._summarize(session_id, dropped_upto))
+        self._summarizers[session_id] = task
+        task.add_done_callback(lambda done: self._summary_done(session_id, done))
+
+    async def _summarize(self, session_id: str, target: int) -> None:
+        summary, upto = self._store.get_summary(session_id)
+        if target <= upto:
+            return
+        pending = self._store.list_messages(session_id, start=upto, stop=target)
+        # Fold long backlogs in passes so one summarization prompt stays within budget.
+        pass_budget = max(1, self._context.budget_for(OPENAI_MODEL) // 2)
+        while pending:
+            take, used = 0, 0
+            while take < len(pending) and (take == 0 or used + message_tokens(pending[take]) <= pass_budget):
+                used += message_tokens(pending[take])
+                take += 1
+            chunk, pending = pending[:take], pending[take:]
+            prompt = [
+                {"role": "system", "content": CHAT_SUMMARY_PROMPT},
+                {
+                    "role": "user",
+                    "content": f"Current summary:\n{summary or '(none)'}\n\nNew turns:\n{render_transcript(chunk)}",
+                },
+            ]
+            summary = await self._llm.generate_text(
+                model=OPENAI_MODEL,
+                messages=prompt,
+                temperature=0.0,
+                max_output_tokens=CHAT_SUMMARY_MAX_TOKENS,
+                policy="summary",
+            )
+            upto += take
+            self._store.set_summary(session_id, summary.strip(), upto)
+            self.summaries_written += 1
+
+    def _summary_done(self, session_id: str, task: "asyncio.Task") -> None:
+        if self._summarizers.get(session_id) is task:
+            del self._summarizers[session_id]
+        if not task.cancelled() and task.exception() is not None:
+            self.summary_failures += 1
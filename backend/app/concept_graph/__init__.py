@@ -1,3 +1,4 @@
-from .service import ConceptGraphService, BuildMode
+from .scheduler import GraphBuildScheduler
+from .service import ConceptGraphService, BuildMode, BuildStatus
 
-__all__ = ["ConceptGraphService", "BuildMode"]
+__all__ = ["ConceptGraphService", "BuildMode", "BuildStatus", "GraphBuildScheduler"]
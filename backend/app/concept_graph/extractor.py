@@ -1,12 +1,22 @@
+import asyncio
 import textwrap
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Set, Tuple
+from typing import Dict, List, Optional, Sequence, Set, Tuple
 
-from ..config import OPENAI_CONCEPT_MODEL
-from ..models import ChatMessage
+from ..config import (
+    CONCEPT_DEDUP_THRESHOLD,
+    CONCEPT_WINDOW_CONCURRENCY,
+    CONCEPT_WINDOW_OVERLAP_TOKENS,
+    CONCEPT_WINDOW_TOKENS,
+    LLM_CACHE_TTL_CONCEPTS,
+    OPENAI_CONCEPT_MODEL,
+)
+from ..context_builder import count_tokens
+from ..message_record import MessageRecord
 from ..openai_client import OpenAIClient
-from ..context_loader import load_initial_context
+from ..context_loader import load_docs_retriever
 from ..id_utils import generate_concept_id, generate_edge_id
+from .models import ConceptGraph
 
 MAX_OUTLINE_CONCEPTS = 8
 SUMMARY_WORD_LIMIT = 18
@@ -38,23 +48,73 @@ class ConceptExtractor:
         model: str = OPENAI_CONCEPT_MODEL,
         max_concepts: int = MAX_OUTLINE_CONCEPTS,
         summary_word_limit: int = SUMMARY_WORD_LIMIT,
+        window_tokens: int = CONCEPT_WINDOW_TOKENS,
+        overlap_tokens: int = CONCEPT_WINDOW_OVERLAP_TOKENS,
+        window_concurrency: int = CONCEPT_WINDOW_CONCURRENCY,
     ) -> None:
         self._llm = llm
         self._model = model
         self._max_concepts = max_concepts
         self._summary_word_limit = summary_word_limit
-        self._doc_context = load_initial_context()
+        self._window_tokens = max(1, window_tokens)
+        self._overlap_tokens = max(0, overlap_tokens)
+        self._window_concurrency = max(1, window_concurrency)
+        self._docs = load_docs_retriever()
 
     async def extract(
         self,
         *,
         session_id: str,
-        messages: List[ChatMessage],
+        messages: Sequence[MessageRecord],
         start_index: int,
+        use_cache: bool = True,
     ) -> ConceptExtractionResult:
+        """Extract concepts from a transcript slice.
+
+        Slices longer than `window_tokens` are split into overlapping windows
+        that are extracted concurrently and reduced through `ConceptGraph.merge`,
+        which folds concepts sharing a label or alias into one node.
+        """
         if not messages:
             return ConceptExtractionResult.empty()
+        windows = self._windows(messages, start_index)
+        if len(windows) == 1:
+            return await self._extract_window(
+                session_id=session_id, messages=messages, start_index=start_index, use_cache=use_cache
+            )
+
+        limiter = asyncio.Semaphore(self._window_concurrency)
+
+        async def run(window_start: int, window: Sequence[MessageRecord]) -> ConceptExtractionResult:
+            async with limiter:
+                return await self._extract_window(
+                    session_id=session_id, messages=window, start_index=window_start, use_cache=use_cache
+                )
+
+        tasks = [asyncio.ensure_future(run(window_start, window)) for window_start, window in windows]
+        try:
+            results = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+        merged = ConceptGraph(dedup_threshold=CONCEPT_DEDUP_THRESHOLD)
+        for result in results:
+            merged.merge(concepts=result.concepts, edges=result.edges)
+        return ConceptExtractionResult(
+            concepts=[node.to_dict() for node in merged.concepts.values()],
+            edges=[edge.to_dict() for edge in merged.edges.values()],
+        )
 
+    async def _extract_window(
+        self,
+        *,
+        session_id: str,
+        messages: Sequence[MessageRecord],
+        start_index: int,
+        use_cache: bool,
+    ) -> ConceptExtractionResult:
         transcript = self._format_messages(messages, start_index)
         user_prompt = textwrap.dedent(
             f"""
@@ -142,8 +202,9 @@ class ConceptExtractor:
 
         try:
             system_messages = [{"role": "system", "content": SYSTEM_PROMPT}]
-            if self._doc_context:
-                system_messages.append({"role": "system", "content": self._doc_context})
+            doc_context = await self._docs.context_for_async(" ".join(m.content for m in messages if m.role == "user"))
+            if doc_context.text:
+                system_messages.append({"role": "system", "content": doc_context.render()})
             payload = await self._llm.generate_json(
                 model=self._model,
                 messages=[
@@ -152,6 +213,10 @@ class ConceptExtractor:
                 ],
                 temperature=0.0,
                 max_output_tokens=2400,
+                cache_ttl=LLM_CACHE_TTL_CONCEPTS,
+                use_cache=use_cache,
+                policy="concepts",
+                context_version=doc_context.version,
             )
             pass
         except ValueError as e:
@@ -168,15 +233,39 @@ class ConceptExtractor:
         edges = self._filter_edges(edges_raw, lookup)
         return ConceptExtractionResult(concepts=concepts, edges=edges)
 
+    def _windows(self, messages: Sequence[MessageRecord], start_index: int) -> List[Tuple[int, Sequence[MessageRecord]]]:
+        """Split into windows of at most `window_tokens`, each overlapping the previous by ~`overlap_tokens`."""
+        costs = [
+            count_tokens(self._format_line(start_index + offset, msg)) for offset, msg in enumerate(messages)
+        ]
+        if sum(costs) <= self._window_tokens:
+            return [(start_index, messages)]
+        windows: List[Tuple[int, Sequence[MessageRecord]]] = []
+        begin = 0
+        while begin < len(messages):
+            end, used = begin, 0
+            while end < len(messages) and (end == begin or used + costs[end] <= self._window_tokens):
+                used += costs[end]
+                end += 1
+            windows.append((start_index + begin, messages[begin:end]))
+            if end >= len(messages):
+                break
+            next_begin, overlap = end, 0
+            while next_begin - 1 > begin and overlap + costs[next_begin - 1] <= self._overlap_tokens:
+                next_begin -= 1
+                overlap += costs[next_begin]
+            begin = next_begin
+        return windows
+
+    @classmethod
+    def _format_messages(cls, messages: Sequence[MessageRecord], start_index: int) -> str:
+        return "\n".join(cls._format_line(start_index + offset, msg) for offset, msg in enumerate(messages))
+
     @staticmethod
-    def _format_messages(messages: List[ChatMessage], start_index: int) -> str:
-        formatted: List[str] = []
-        for offset, msg in enumerate(messages):
-            idx = start_index + offset
-            snippet = " ".join(msg.content.split())
-            snippet = snippet[:500]
-            formatted.append(f"[{idx}] ({msg.role}) id={msg.id}: {snippet}")
-        return "\n".join(formatted)
+    def _format_line(idx: int, msg: MessageRecord) -> str:
+        snippet = " ".join(msg.content.split())
+        snippet = snippet[:500]
+        return f"[{idx}] ({msg.role}) id={msg.id}: {snippet}"
 
     def _shape_concepts(
         self, concepts: List[Dict[str, object]]
@@ -1,15 +1,33 @@
+import bisect
+import json
+import sys
 import time
 import uuid
+from collections import deque
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Tuple
+from typing import Deque, Dict, Iterable, Iterator, List, Literal, Optional, Set, Tuple
 
 from ..id_utils import generate_concept_id, generate_edge_id
+from .similarity import SimilarityIndex
 
 
 def _normalize(text: str) -> str:
     return " ".join(text.strip().lower().split())
 
 
+Direction = Literal["out", "in", "both"]
+
+# Delta-log entries retained per graph before older revisions need a full resync.
+DEFAULT_HISTORY_LIMIT = 2000
+# Similarity at which an incoming concept merges into an existing one (0 = exact labels only).
+DEFAULT_DEDUP_THRESHOLD = 0.65
+
+
+def _encode(value: object) -> bytes:
+    # Same compact form FastAPI's JSONResponse produces.
+    return json.dumps(value, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
 def _unique(items: List[str]) -> List[str]:
     seen = []
     for item in items:
@@ -21,7 +39,7 @@ def _unique(items: List[str]) -> List[str]:
     return seen
 
 
-@dataclass
+@dataclass(slots=True)
 class ConceptNode:
     id: str
     label: str
@@ -33,6 +51,9 @@ class ConceptNode:
     weight: float = 0.0
     expansions: List[str] = field(default_factory=list)
 
+    def __post_init__(self) -> None:
+        self.type = sys.intern(self.type)
+
     def to_dict(self) -> Dict[str, object]:
         return {
             "id": self.id,
@@ -47,7 +68,7 @@ class ConceptNode:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class ConceptEdge:
     id: str
     from_concept_id: str
@@ -58,6 +79,9 @@ class ConceptEdge:
     evidence_snippet: Optional[str] = None
     last_referenced_index: int = 0
 
+    def __post_init__(self) -> None:
+        self.relation = sys.intern(self.relation)
+
     def to_dict(self) -> Dict[str, object]:
         return {
             "id": self.id,
@@ -75,6 +99,7 @@ class ConceptEdge:
 class ConceptGraphMeta:
     last_processed_index: int = -1
     graph_version: str = "1.0"
+    revision: int = 0
     updated_ts: float = field(default_factory=lambda: time.time())
 
     def touch(self) -> None:
@@ -84,40 +109,142 @@ class ConceptGraphMeta:
         return {
             "last_processed_index": self.last_processed_index,
             "graph_version": self.graph_version,
+            "revision": self.revision,
             "updated_ts": self.updated_ts,
         }
 
 
+@dataclass
+class GraphDelta:
+    """Concepts and edges changed after `since`, or `full` when the log no longer reaches back."""
+
+    since: int
+    revision: int
+    full: bool
+    concept_ids: Set[str] = field(default_factory=set)
+    edge_ids: Set[str] = field(default_factory=set)
+
+
 @dataclass
 class ConceptGraph:
     concepts: Dict[str, ConceptNode] = field(default_factory=dict)
     edges: Dict[str, ConceptEdge] = field(default_factory=dict)
     meta: ConceptGraphMeta = field(default_factory=ConceptGraphMeta)
+    history_limit: int = field(default=DEFAULT_HISTORY_LIMIT, repr=False)
+    dedup_threshold: float = field(default=DEFAULT_DEDUP_THRESHOLD, repr=False)
+    # Set once the intent node exists; until then every build or declutter tries to derive it.
+    intent_id: Optional[str] = field(default=None, repr=False)
     _label_index: Dict[str, str] = field(default_factory=dict, init=False, repr=False)
     _edge_index: Dict[Tuple[str, str, str], str] = field(default_factory=dict, init=False, repr=False)
+    _similar: SimilarityIndex = field(default_factory=SimilarityIndex, init=False, repr=False)
+    # concept id -> normalized relation -> edge ids, per edge direction.
+    _out_edges: Dict[str, Dict[str, Set[str]]] = field(default_factory=dict, init=False, repr=False)
+    _in_edges: Dict[str, Dict[str, Set[str]]] = field(default_factory=dict, init=False, repr=False)
+    # (revision, kind, id) for every concept/edge change, oldest first.
+    _history: Deque[Tuple[int, str, str]] = field(default_factory=deque, init=False, repr=False)
+    # Deltas after this revision are complete in `_history`.
+    _history_floor: int = field(default=0, init=False, repr=False)
+    # Serialization order kept sorted as nodes change, keyed like `to_dict` sorts.
+    _concept_order: List[Tuple[int, str, str]] = field(default_factory=list, init=False, repr=False)
+    _concept_sort_keys: Dict[str, Tuple[int, str, str]] = field(default_factory=dict, init=False, repr=False)
+    _edge_order: List[Tuple[int, str]] = field(default_factory=list, init=False, repr=False)
+    _edge_sort_keys: Dict[str, Tuple[int, str]] = field(default_factory=dict, init=False, repr=False)
+    # Encoded JSON per concept/edge and for the whole concepts+edges body; dropped on change.
+    _fragments: Dict[Tuple[str, str], bytes] = field(default_factory=dict, init=False, repr=False)
+    _encoded_body: Optional[bytes] = field(default=None, init=False, repr=False)
 
     def __post_init__(self) -> None:
         self._rebuild_indexes()
 
+    def __getstate__(self) -> Dict[str, object]:
+        # Spilled graphs keep their data and history; encoded caches are rebuilt on demand.
+        state = dict(self.__dict__)
+        state["_fragments"] = {}
+        state["_encoded_body"] = None
+        return state
+
     def _rebuild_indexes(self) -> None:
         self._label_index = {}
+        self._similar = SimilarityIndex()
         for node in self.concepts.values():
             self._register_aliases(node)
         self._edge_index = {}
+        self._out_edges = {}
+        self._in_edges = {}
         for edge in self.edges.values():
-            key = self._edge_key(edge.from_concept_id, edge.to_concept_id, edge.relation)
-            self._edge_index[key] = edge.id
+            self._index_edge(edge)
+        self._concept_sort_keys = {cid: self._concept_sort_key(node) for cid, node in self.concepts.items()}
+        self._concept_order = sorted(self._concept_sort_keys.values())
+        self._edge_sort_keys = {eid: (edge.introduced_index, eid) for eid, edge in self.edges.items()}
+        self._edge_order = sorted(self._edge_sort_keys.values())
+        self._fragments = {}
+        self._encoded_body = None
+
+    @staticmethod
+    def _concept_sort_key(node: ConceptNode) -> Tuple[int, str, str]:
+        return (node.first_seen_index, node.label, node.id)
+
+    def _reorder(self, kind: str, item_id: str) -> None:
+        """Move one changed concept/edge to its sorted position and drop its encoded form."""
+        self._fragments.pop((kind, item_id), None)
+        if kind == "concept":
+            order, keys = self._concept_order, self._concept_sort_keys
+            node = self.concepts.get(item_id)
+            new_key = self._concept_sort_key(node) if node else None
+        else:
+            order, keys = self._edge_order, self._edge_sort_keys
+            edge = self.edges.get(item_id)
+            new_key = (edge.introduced_index, item_id) if edge else None
+        old_key = keys.get(item_id)
+        if old_key == new_key:
+            return
+        if old_key is not None:
+            del order[bisect.bisect_left(order, old_key)]
+            del keys[item_id]
+        if new_key is not None:
+            bisect.insort(order, new_key)
+            keys[item_id] = new_key
 
     @staticmethod
     def _edge_key(src: str, dst: str, relation: str) -> Tuple[str, str, str]:
         return (src, dst, relation.strip().lower())
 
+    def _index_edge(self, edge: ConceptEdge) -> None:
+        key = self._edge_key(edge.from_concept_id, edge.to_concept_id, edge.relation)
+        self._edge_index[key] = edge.id
+        relation = key[2]
+        self._out_edges.setdefault(edge.from_concept_id, {}).setdefault(relation, set()).add(edge.id)
+        self._in_edges.setdefault(edge.to_concept_id, {}).setdefault(relation, set()).add(edge.id)
+
+    def _unindex_edge(self, edge: ConceptEdge) -> None:
+        key = self._edge_key(edge.from_concept_id, edge.to_concept_id, edge.relation)
+        if self._edge_index.get(key) == edge.id:
+            del self._edge_index[key]
+        for adjacency, concept_id in ((self._out_edges, edge.from_concept_id), (self._in_edges, edge.to_concept_id)):
+            by_relation = adjacency.get(concept_id, {})
+            ids = by_relation.get(key[2])
+            if ids is None:
+                continue
+            ids.discard(edge.id)
+            if not ids:
+                del by_relation[key[2]]
+            if not by_relation:
+                del adjacency[concept_id]
+
     def _register_aliases(self, node: ConceptNode) -> None:
         labels = [node.label] + node.aliases
         for label in labels:
             if not label:
                 continue
             self._label_index[_normalize(label)] = node.id
+        self._index_similarity(node)
+
+    def _index_similarity(self, node: ConceptNode) -> None:
+        # The intent node is the user's question, never a merge target.
+        if node.type == "intent":
+            self._similar.remove(node.id)
+        else:
+            self._similar.add(node.id, [node.label, *node.aliases], node.summary)
 
     def _match_concept(self, label: str, aliases: List[str]) -> Optional[ConceptNode]:
         for candidate in [label, *aliases]:
@@ -128,6 +255,12 @@ class ConceptGraph:
                 return self.concepts[key]
         return None
 
+    def _match_similar(self, label: str, aliases: List[str], summary: str) -> Optional[ConceptNode]:
+        match = self._similar.best_match([label, *aliases], summary=summary, threshold=self.dedup_threshold)
+        if match is None:
+            return None
+        return self.concepts.get(match[0])
+
     def _get_concept(self, identifier: str) -> Optional[ConceptNode]:
         if identifier in self.concepts:
             return self.concepts[identifier]
@@ -139,17 +272,71 @@ class ConceptGraph:
     def find_concept(self, identifier: str) -> Optional[ConceptNode]:
         return self._get_concept(identifier)
 
-    def merge(self, *, concepts: List[Dict[str, object]], edges: List[Dict[str, object]]) -> None:
+    # ---- revisions
+    def mark_changed(
+        self,
+        *,
+        concept_ids: Iterable[str] = (),
+        edge_ids: Iterable[str] = (),
+    ) -> int:
+        """Record one new revision covering the given concepts and edges."""
+        changes = [("concept", cid) for cid in concept_ids] + [("edge", eid) for eid in edge_ids]
+        if not changes:
+            return self.meta.revision
+        self.meta.revision += 1
+        revision = self.meta.revision
+        for kind, item_id in changes:
+            self._history.append((revision, kind, item_id))
+            self._reorder(kind, item_id)
+            if kind == "concept" and item_id in self.concepts:
+                self._index_similarity(self.concepts[item_id])
+        self._encoded_body = None
+        while len(self._history) > max(1, self.history_limit):
+            dropped, _, _ = self._history.popleft()
+            self._history_floor = max(self._history_floor, dropped)
+        self.meta.touch()
+        return revision
+
+    def continue_from(self, previous: "ConceptGraph") -> None:
+        """Carry the revision counter over a full rebuild; older clients must resync."""
+        self.meta.revision = max(self.meta.revision, previous.meta.revision + 1)
+        self._history.clear()
+        self._history_floor = self.meta.revision
+
+    def changes_since(self, since: int) -> GraphDelta:
+        revision = self.meta.revision
+        if since < self._history_floor or since > revision:
+            return GraphDelta(since=since, revision=revision, full=True)
+        delta = GraphDelta(since=since, revision=revision, full=False)
+        for entry_revision, kind, item_id in reversed(self._history):
+            if entry_revision <= since:
+                break
+            if kind == "concept":
+                if item_id in self.concepts:
+                    delta.concept_ids.add(item_id)
+            elif item_id in self.edges:
+                delta.edge_ids.add(item_id)
+        return delta
+
+    def merge(self, *, concepts: List[Dict[str, object]], edges: List[Dict[str, object]]) -> List[str]:
+        """Upsert concepts and edges; returns the ids of the concepts touched."""
         id_map: Dict[str, str] = {}
+        concept_ids: List[str] = []
+        edge_ids: List[str] = []
         for raw in concepts:
             node = self._upsert_concept(raw)
             raw_id = str(raw.get("id")) if raw.get("id") else node.id
             id_map[raw_id] = node.id
+            concept_ids.append(node.id)
 
         for raw in edges:
-            self._upsert_edge(raw, id_map)
+            edge = self._upsert_edge(raw, id_map)
+            if edge is not None:
+                edge_ids.append(edge.id)
 
+        self.mark_changed(concept_ids=concept_ids, edge_ids=edge_ids)
         self.meta.touch()
+        return concept_ids
 
     def _upsert_concept(self, payload: Dict[str, object]) -> ConceptNode:
         label = str(payload.get("label", "")).strip()
@@ -165,6 +352,11 @@ class ConceptGraph:
         last_seen = int(payload.get("last_seen_index", first_seen) or first_seen)
 
         existing = self._match_concept(label, aliases)
+        if existing is None:
+            existing = self._match_similar(label, aliases, summary)
+            if existing is not None and _normalize(label) != _normalize(existing.label):
+                # Keep the near-duplicate's label so the next mention matches exactly.
+                aliases = _unique(aliases + [label])
         if existing:
             combined_aliases = _unique(existing.aliases + aliases)
             existing.aliases = combined_aliases
@@ -209,26 +401,115 @@ class ConceptGraph:
     def add_concept(self, node: ConceptNode) -> None:
         self.concepts[node.id] = node
         self._register_aliases(node)
+        self.mark_changed(concept_ids=[node.id])
 
     def add_edge(self, edge: ConceptEdge) -> None:
+        previous = self.edges.get(edge.id)
+        if previous is not None:
+            self._unindex_edge(previous)
         self.edges[edge.id] = edge
-        key = self._edge_key(edge.from_concept_id, edge.to_concept_id, edge.relation)
-        self._edge_index[key] = edge.id
+        self._index_edge(edge)
+        self.mark_changed(edge_ids=[edge.id])
 
     def has_edge(self, src: str, dst: str, relation: str) -> bool:
         key = self._edge_key(src, dst, relation)
         return key in self._edge_index
 
+    # ---- adjacency queries
+    def edge_ids_of(
+        self,
+        concept_id: str,
+        *,
+        direction: Direction = "both",
+        relations: Optional[Iterable[str]] = None,
+    ) -> List[str]:
+        """Ids of edges leaving and/or entering `concept_id`, optionally limited to `relations`."""
+        wanted = {relation.strip().lower() for relation in relations} if relations else None
+        sides = []
+        if direction in ("out", "both"):
+            sides.append(self._out_edges.get(concept_id, {}))
+        if direction in ("in", "both"):
+            sides.append(self._in_edges.get(concept_id, {}))
+        found: List[str] = []
+        for by_relation in sides:
+            for relation, ids in by_relation.items():
+                if wanted is None or relation in wanted:
+                    found.extend(ids)
+        return found
+
+    def neighborhood(
+        self,
+        concept_id: str,
+        *,
+        hops: int = 1,
+        direction: Direction = "both",
+        relations: Optional[Iterable[str]] = None,
+        max_concepts: Optional[int] = None,
+    ) -> Tuple[List[str], List[str], bool]:
+        """Breadth-first concepts within `hops` edges plus the edges walked to reach them.
+
+        Returns (concept ids, edge ids, truncated); `truncated` is set when
+        `max_concepts` stopped the walk early.
+        """
+        relations = list(relations) if relations else None
+        seen: Dict[str, None] = {concept_id: None}
+        edge_ids: Dict[str, None] = {}
+        frontier = [concept_id]
+        truncated = False
+        for _ in range(max(0, hops)):
+            next_frontier: List[str] = []
+            for current in frontier:
+                for edge_id in self.edge_ids_of(current, direction=direction, relations=relations):
+                    edge = self.edges[edge_id]
+                    other = edge.to_concept_id if edge.from_concept_id == current else edge.from_concept_id
+                    if other not in seen:
+                        if max_concepts is not None and len(seen) >= max_concepts:
+                            truncated = True
+                            continue
+                        seen[other] = None
+                        next_frontier.append(other)
+                    edge_ids[edge_id] = None
+            frontier = next_frontier
+            if not frontier:
+                break
+        return list(seen), list(edge_ids), truncated
+
+    def induced_edge_ids(
+        self,
+        concept_ids: Iterable[str],
+        *,
+        relations: Optional[Iterable[str]] = None,
+    ) -> List[str]:
+        """Edges whose both endpoints are in `concept_ids`."""
+        members = set(concept_ids)
+        relations = list(relations) if relations else None
+        found: List[str] = []
+        for concept_id in members:
+            for edge_id in self.edge_ids_of(concept_id, direction="out", relations=relations):
+                if self.edges[edge_id].to_concept_id in members:
+                    found.append(edge_id)
+        return found
+
+    def ordered_concepts(self) -> Iterator[ConceptNode]:
+        """Concepts in response order without serializing them."""
+        for key in self._concept_order:
+            yield self.concepts[key[-1]]
+
     def apply_focus(self, concept_id: str, *, weight: Optional[float], expansion: Optional[str]) -> bool:
         node = self._get_concept(concept_id)
         if not node:
             return False
-        if weight is not None:
-            node.weight = max(node.weight, float(weight))
+        changed = False
+        if weight is not None and float(weight) > node.weight:
+            node.weight = float(weight)
+            changed = True
         if expansion:
             clean = str(expansion).strip()
             if clean and not self._looks_like_placeholder(clean) and clean not in node.expansions:
                 node.expansions.append(clean)
+                changed = True
+        if changed:
+            self.mark_changed(concept_ids=[node.id])
         return True
 
     @staticmethod
@@ -296,14 +577,88 @@ class ConceptGraph:
             last_referenced_index=last_seen,
         )
         self.edges[edge.id] = edge
-        self._edge_index[key] = edge.id
+        self._index_edge(edge)
         return edge
 
     def to_dict(self) -> Dict[str, object]:
-        concepts = sorted(self.concepts.values(), key=lambda c: (c.first_seen_index, c.label))
-        edges = sorted(self.edges.values(), key=lambda e: (e.introduced_index, e.id))
         return {
-            "concepts": [node.to_dict() for node in concepts],
-            "edges": [edge.to_dict() for edge in edges],
+            "concepts": [self.concepts[key[-1]].to_dict() for key in self._concept_order],
+            "edges": [self.edges[key[-1]].to_dict() for key in self._edge_order],
             "meta": self.meta.to_dict(),
         }
+
+    def delta_to_dict(self, since: int) -> Dict[str, object]:
+        """Serialize only what changed after revision `since` (everything when `full`)."""
+        delta = self.changes_since(since)
+        if delta.full:
+            data = self.to_dict()
+        else:
+            data = {
+                "concepts": [self.concepts[key[-1]].to_dict() for key in self._delta_concept_keys(delta)],
+                "edges": [self.edges[key[-1]].to_dict() for key in self._delta_edge_keys(delta)],
+                "meta": self.meta.to_dict(),
+            }
+        data["since"] = since
+        data["full"] = delta.full
+        return data
+
+    def to_json(
+        self,
+        *,
+        since: Optional[int] = None,
+        extra_meta: Optional[Dict[str, object]] = None,
+    ) -> bytes:
+        """Encoded `to_dict` (or `delta_to_dict(since)`) built from cached per-item JSON."""
+        meta = self.meta.to_dict()
+        meta.update(extra_meta or {})
+        tail = b',"meta":' + _encode(meta)
+        if since is None:
+            return b"{" + self._body() + tail + b"}"
+        delta = self.changes_since(since)
+        if delta.full:
+            body = self._body()
+        else:
+            body = self._encode_lists(self._delta_concept_keys(delta), self._delta_edge_keys(delta))
+        tail += b',"since":' + _encode(since) + b',"full":' + _encode(delta.full)
+        return b"{" + body + tail + b"}"
+
+    def subset_to_json(
+        self,
+        concept_ids: Iterable[str],
+        edge_ids: Iterable[str],
+        *,
+        extra_meta: Optional[Dict[str, object]] = None,
+        extra_fields: Optional[Dict[str, object]] = None,
+    ) -> bytes:
+        """Encode a subgraph in the same shape as `to_json`, reusing cached fragments."""
+        concept_keys = sorted(self._concept_sort_keys[cid] for cid in set(concept_ids) if cid in self.concepts)
+        edge_keys = sorted(self._edge_sort_keys[eid] for eid in set(edge_ids) if eid in self.edges)
+        meta = self.meta.to_dict()
+        meta.update(extra_meta or {})
+        tail = b',"meta":' + _encode(meta)
+        for name, value in (extra_fields or {}).items():
+            tail += b"," + _encode(name) + b":" + _encode(value)
+        return b"{" + self._encode_lists(concept_keys, edge_keys) + tail + b"}"
+
+    def _body(self) -> bytes:
+        if self._encoded_body is None:
+            self._encoded_body = self._encode_lists(self._concept_order, self._edge_order)
+        return self._encoded_body
+
+    def _encode_lists(self, concept_keys: Iterable[Tuple], edge_keys: Iterable[Tuple]) -> bytes:
+        concepts = b",".join(self._fragment("concept", key[-1]) for key in concept_keys)
+        edges = b",".join(self._fragment("edge", key[-1]) for key in edge_keys)
+        return b'"concepts":[' + concepts + b'],"edges":[' + edges + b"]"
+
+    def _fragment(self, kind: str, item_id: str) -> bytes:
+        cached = self._fragments.get((kind, item_id))
+        if cached is None:
+            item = self.concepts[item_id] if kind == "concept" else self.edges[item_id]
+            cached = self._fragments[(kind, item_id)] = _encode(item.to_dict())
+        return cached
+
+    def _delta_concept_keys(self, delta: GraphDelta) -> List[Tuple[int, str, str]]:
+        return sorted(self._concept_sort_keys[cid] for cid in delta.concept_ids)
+
+    def _delta_edge_keys(self, delta: GraphDelta) -> List[Tuple[int, str]]:
+        return sorted(self._edge_sort_keys[eid] for eid in delta.edge_ids)
@@ -0,0 +1,102 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Set
+
+logger = logging.getLogger(__name__)
+
+
+class GraphBuildScheduler:
+    """Debounce per-session background graph builds.
+
+    Every `notify` re-arms the session's timer, so a burst of messages yields
+    one build `debounce` seconds after the last of them; `max_delay` bounds how
+    long a steady stream of messages can postpone it. A notify that arrives
+    while the session is building queues exactly one follow-up build.
+    """
+
+    def __init__(
+        self,
+        build: Callable[[str], Awaitable[object]],
+        *,
+        debounce: float = 2.0,
+        max_delay: float = 10.0,
+    ) -> None:
+        self._build = build
+        self._debounce = max(0.0, debounce)
+        self._max_delay = max(self._debounce, max_delay)
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self._first_notified: Dict[str, float] = {}
+        self._running: Dict[str, "asyncio.Task"] = {}
+        self._dirty: Set[str] = set()
+        self.notified = 0
+        self.coalesced = 0
+        self.builds = 0
+        self.failures = 0
+
+    def notify(self, session_id: str) -> None:
+        loop = asyncio.get_running_loop()
+        self.notified += 1
+        if session_id in self._running:
+            if session_id in self._dirty:
+                self.coalesced += 1
+            self._dirty.add(session_id)
+            return
+        now = loop.time()
+        first = self._first_notified.setdefault(session_id, now)
+        handle = self._timers.pop(session_id, None)
+        if handle is not None:
+            handle.cancel()
+            self.coalesced += 1
+        delay = min(self._debounce, max(0.0, first + self._max_delay - now))
+        self._timers[session_id] = loop.call_later(delay, self._start, session_id)
+
+    def is_pending(self, session_id: str) -> bool:
+        return session_id in self._timers or session_id in self._running
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "scheduled": len(self._timers),
+            "running": len(self._running),
+            "notified": self.notified,
+            "coalesced": self.coalesced,
+            "builds": self.builds,
+            "failures": self.failures,
+        }
+
+    def close(self) -> None:
+        for handle in self._timers.values():
+            handle.cancel()
+        for task in self._running.values():
+            task.cancel()
+        self._timers.clear()
+        self._first_notified.clear()
+        self._dirty.clear()
+
+    # ------------------------------------------------------------------ helpers
+    def _start(self, session_id: str) -> None:
+        self._timers.pop(session_id, None)
+        self._first_notified.pop(session_id, None)
+        task = asyncio.ensure_future(self._build(session_id))
+        self._running[session_id] = task
+        self.builds += 1
+        task.add_done_callback(lambda done: self._finished(session_id, done))
+
+    def _finished(self, session_id: str, task: "asyncio.Task") -> None:
+        if self._running.get(session_id) is task:
+            del self._running[session_id]
+        if task.cancelled():
+            self._dirty.discard(session_id)
+            return
+        exc = task.exception()
+        if exc is not None:
+            self.failures += 1
+            logger.warning(
+                "background concept-graph build failed for session %s: %s",
+                session_id,
+                exc,
+                exc_info=exc,
+            )
+        if session_id in self._dirty:
+            self._dirty.discard(session_id)
+            self.notify(session_id)
+            self.notified -= 1
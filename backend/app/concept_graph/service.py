@@ -1,42 +1,141 @@
-from typing import Dict, List, Literal, Optional, Sequence, Tuple
+from contextlib import nullcontext
+from typing import AsyncContextManager, Dict, List, Literal, Optional, Sequence, Tuple
 
+from ..bounded_cache import CacheLimits
 from ..openai_client import OpenAIClient
-from ..store import InMemoryChatStore, Session
+from ..session_locks import RevisionConflict, SessionLocks
+from ..single_flight import SingleFlight
+from ..store import ChatStore, Session
 from ..text_utils import derive_intent_label
 from ..id_utils import generate_concept_id, generate_edge_id
 from .extractor import ConceptExtractor
-from .models import ConceptEdge, ConceptGraph, ConceptNode
+from .models import ConceptEdge, ConceptGraph, ConceptNode, Direction
+from .scheduler import GraphBuildScheduler
 from .store import ConceptGraphStore
 
 BuildMode = Literal["full", "incremental"]
+BuildStatus = Literal["fresh", "building", "stale"]
 
 
 class ConceptGraphService:
-    def __init__(self, store: InMemoryChatStore, llm: OpenAIClient) -> None:
+    def __init__(
+        self,
+        store: ChatStore,
+        llm: OpenAIClient,
+        *,
+        limits: Optional[CacheLimits] = None,
+        flights: Optional[SingleFlight] = None,
+        locks: Optional[SessionLocks] = None,
+    ) -> None:
         self._chat_store = store
-        self._graphs = ConceptGraphStore()
+        self._locks = locks or SessionLocks()
+        self._graphs = ConceptGraphStore(limits)
         self._extractor = ConceptExtractor(llm)
+        self._flights = flights or SingleFlight()
+        self._scheduler: Optional[GraphBuildScheduler] = None
+
+    def store_stats(self) -> Dict[str, int]:
+        return self._graphs.stats()
+
+    def enable_auto_build(self, *, debounce: float, max_delay: float) -> GraphBuildScheduler:
+        """Build incrementally in the background whenever `schedule_build` is called."""
+        self._scheduler = GraphBuildScheduler(
+            self._build_in_background,
+            debounce=debounce,
+            max_delay=max_delay,
+        )
+        return self._scheduler
+
+    async def _build_in_background(self, session_id: str) -> None:
+        # Extract without the session lock so routes never queue behind the LLM;
+        # only the merge takes it.
+        try:
+            await self.build_graph(session_id, mode="incremental", apply_locks=self._locks)
+        except RevisionConflict:
+            # Another build advanced the graph meanwhile; pick up whatever it left.
+            self.schedule_build(session_id)
+
+    def schedule_build(self, session_id: str) -> None:
+        if self._scheduler is not None:
+            self._scheduler.notify(session_id)
+
+    def scheduler_stats(self) -> Dict[str, int]:
+        return self._scheduler.stats() if self._scheduler is not None else {}
+
+    def close(self) -> None:
+        if self._scheduler is not None:
+            self._scheduler.close()
+        self._graphs.close()
+
+    def build_status(self, session_id: str, graph: ConceptGraph) -> BuildStatus:
+        if self._scheduler is not None and self._scheduler.is_pending(session_id):
+            return "building"
+        if graph.meta.last_processed_index >= self._chat_store.count_messages(session_id) - 1:
+            return "fresh"
+        return "stale"
 
     def get_graph(self, session_id: str) -> ConceptGraph:
-        session = self._chat_store.get_session(session_id)
-        if not session:
+        """Current graph, or an empty one that is not stored; never changes state.
+
+        The intent node is added by builds and declutters, not by reads, so a
+        GET cannot move the revision behind the ETag it returns.
+        """
+        if not self._chat_store.has_session(session_id):
             raise KeyError("session not found")
-        graph = self._graphs.ensure(session_id)
-        self._ensure_intent_links(session_id, graph, session=session)
+        graph = self._graphs.get(session_id)
+        if graph is None:
+            graph = self._graphs.new_graph()
+            # A fixed timestamp keeps the ETag of a not-yet-built graph stable across polls.
+            graph.meta.updated_ts = 0.0
         return graph
 
-    async def build_graph(self, session_id: str, *, mode: BuildMode) -> ConceptGraph:
+    async def build_graph(
+        self,
+        session_id: str,
+        *,
+        mode: BuildMode,
+        use_cache: bool = True,
+        apply_locks: Optional[SessionLocks] = None,
+    ) -> ConceptGraph:
+        """Build the graph; concurrent builds of the same session state share one extraction.
+
+        Callers holding the session lock leave `apply_locks` unset. Others pass
+        the locks so the result is merged under the session lock, while the
+        extraction itself runs unlocked and is checked for conflicts afterwards.
+        """
         session = self._chat_store.get_session(session_id)
         if not session:
             raise KeyError("session not found")
+        # Locked and unlocked callers never share a flight: a lock holder waiting on
+        # a flight that waits for the lock would deadlock.
+        key = (session_id, "concept-graph-build", mode, len(session.messages), use_cache, apply_locks is None)
+        return await self._flights.do(
+            key,
+            lambda: self._build_graph(session_id, session, mode=mode, use_cache=use_cache, apply_locks=apply_locks),
+        )
 
+    async def _build_graph(
+        self,
+        session_id: str,
+        session: Session,
+        *,
+        mode: BuildMode,
+        use_cache: bool,
+        apply_locks: Optional[SessionLocks] = None,
+    ) -> ConceptGraph:
+        # Everything up to the extraction runs without awaiting, so it is a consistent snapshot.
         messages = session.messages
         if mode == "full":
-            graph = ConceptGraph()
+            graph = self._graphs.new_graph()
+            base = self._graphs.get(session_id)
+            if base is not None:
+                graph.continue_from(base)
             start_index = 0
         else:
-            graph = self._graphs.ensure(session_id)
+            graph = base = self._graphs.ensure(session_id)
             start_index = graph.meta.last_processed_index + 1
+        base_revision = base.meta.revision if base is not None else 0
+        base_index = base.meta.last_processed_index if base is not None else -1
 
         if start_index < 0:
             start_index = 0
@@ -46,25 +145,104 @@ class ConceptGraphService:
 
         slice_messages = messages[start_index:]
         if not slice_messages:
-            self._ensure_intent_links(session_id, graph, session=session)
-            if mode == "full":
-                self._graphs.upsert(session_id, graph)
+            async with self._applying(session_id, apply_locks):
+                if apply_locks is not None:
+                    self._check_unchanged(session_id, base, base_revision, base_index, replacing=mode == "full")
+                self._ensure_intent_links(session_id, graph, session=session, concept_ids=[])
+                if mode == "full":
+                    self._graphs.upsert(session_id, graph)
             return graph
 
+        end_index = len(messages) - 1
         extraction = await self._extractor.extract(
             session_id=session_id,
             messages=slice_messages,
             start_index=start_index,
+            use_cache=use_cache,
         )
-        graph.merge(concepts=extraction.concepts, edges=[])
-        graph.meta.last_processed_index = len(messages) - 1
-        self._ensure_intent_links(session_id, graph, session=session)
-        self._graphs.upsert(session_id, graph)
+        async with self._applying(session_id, apply_locks):
+            self._check_unchanged(session_id, base, base_revision, base_index, replacing=mode == "full")
+            touched = graph.merge(concepts=extraction.concepts, edges=[])
+            graph.meta.last_processed_index = end_index
+            self._ensure_intent_links(session_id, graph, session=session, concept_ids=touched)
+            self._graphs.upsert(session_id, graph)
         return graph
 
-    def export_graph(self, session_id: str) -> Dict[str, object]:
+    def graph_etag(self, session_id: str) -> str:
+        """Validator for GET /concept-graph that changes whenever its response would."""
+        graph = self.get_graph(session_id)
+        meta = graph.meta
+        return f'W/"{meta.revision}-{meta.updated_ts:.6f}-{self.build_status(session_id, graph)}"'
+
+    def export_graph(self, session_id: str, *, since: Optional[int] = None) -> Dict[str, object]:
+        """Latest graph snapshot (or its changes after revision `since`) plus build status."""
+        graph = self.get_graph(session_id)
+        data = graph.to_dict() if since is None else graph.delta_to_dict(since)
+        data["meta"]["status"] = self.build_status(session_id, graph)
+        return data
+
+    def export_graph_json(self, session_id: str, *, since: Optional[int] = None) -> bytes:
+        """`export_graph` as encoded JSON, reusing the graph's cached fragments."""
         graph = self.get_graph(session_id)
-        return graph.to_dict()
+        return graph.to_json(since=since, extra_meta={"status": self.build_status(session_id, graph)})
+
+    def neighborhood_json(
+        self,
+        session_id: str,
+        concept_id: str,
+        *,
+        hops: int = 1,
+        direction: Direction = "both",
+        relations: Optional[Sequence[str]] = None,
+        limit: Optional[int] = None,
+    ) -> bytes:
+        """Concepts within `hops` edges of `concept_id`, walked over the adjacency index."""
+        graph = self.get_graph(session_id)
+        concept = graph.find_concept(concept_id)
+        if not concept:
+            raise KeyError("concept not found")
+        concept_ids, edge_ids, truncated = graph.neighborhood(
+            concept.id,
+            hops=hops,
+            direction=direction,
+            relations=relations,
+            max_concepts=limit,
+        )
+        return graph.subset_to_json(
+            concept_ids,
+            edge_ids,
+            extra_meta={"status": self.build_status(session_id, graph)},
+            extra_fields={"truncated": truncated},
+        )
+
+    def subgraph_json(
+        self,
+        session_id: str,
+        *,
+        concept_ids: Optional[Sequence[str]] = None,
+        types: Optional[Sequence[str]] = None,
+        relations: Optional[Sequence[str]] = None,
+        limit: Optional[int] = None,
+    ) -> bytes:
+        """Selected concepts (by id and/or type) and the edges between them."""
+        graph = self.get_graph(session_id)
+        if concept_ids:
+            nodes = [node for node in (graph.find_concept(cid) for cid in concept_ids) if node]
+        else:
+            nodes = list(graph.ordered_concepts())
+        if types:
+            wanted = set(types)
+            nodes = [node for node in nodes if node.type in wanted]
+        selected = list(dict.fromkeys(node.id for node in nodes))
+        truncated = limit is not None and len(selected) > limit
+        if truncated:
+            selected = selected[:limit]
+        return graph.subset_to_json(
+            selected,
+            graph.induced_edge_ids(selected, relations=relations),
+            extra_meta={"status": self.build_status(session_id, graph)},
+            extra_fields={"truncated": truncated},
+        )
 
     def apply_focus_data(
         self,
@@ -74,7 +252,7 @@ class ConceptGraphService:
         weight: Optional[float] = None,
         expansion: Optional[str] = None,
     ) -> None:
-        if not self._chat_store.get_session(session_id):
+        if not self._chat_store.has_session(session_id):
             raise KeyError("session not found")
         graph = self._graphs.ensure(session_id)
         updated = graph.apply_focus(concept_id, weight=weight, expansion=expansion)
@@ -98,8 +276,7 @@ class ConceptGraphService:
         expansion_indices: Optional[List[int]] = None,
         force_children: bool = False,
     ) -> Dict[str, object]:
-        session = self._chat_store.get_session(session_id)
-        if not session:
+        if not self._chat_store.has_session(session_id):
             raise KeyError("session not found")
         graph = self._graphs.ensure(session_id)
         concept = graph.find_concept(concept_id)
@@ -123,6 +300,7 @@ class ConceptGraphService:
         if summary_addition:
             concept.summary = self._merge_summary(concept.summary, summary_addition)
         concept.expansions = remaining
+        graph.mark_changed(concept_ids=[concept.id])
 
         children, edges = self._spawn_children(
             concept,
@@ -133,12 +311,7 @@ class ConceptGraphService:
         graph.meta.touch()
         child_ids = [child.id for child in children]
         if child_ids:
-            self._ensure_intent_links(
-                session_id,
-                graph,
-                session=session,
-                concept_ids=child_ids,
-            )
+            self._ensure_intent_links(session_id, graph, concept_ids=child_ids)
         self._graphs.upsert(session_id, graph)
 
         return {
@@ -149,6 +322,34 @@ class ConceptGraphService:
         }
 
     # ------------------------------------------------------------------ helpers
+    def _applying(self, session_id: str, locks: Optional[SessionLocks]) -> AsyncContextManager[None]:
+        return locks.hold(session_id) if locks is not None else nullcontext()
+
+    def _check_unchanged(
+        self,
+        session_id: str,
+        base: Optional[ConceptGraph],
+        base_revision: int,
+        base_index: int,
+        *,
+        replacing: bool,
+    ) -> None:
+        """Fail a build whose extraction ran against a graph that has since moved on.
+
+        Incremental merges are additive, so only a replaced graph or an advanced
+        `last_processed_index` conflicts; a full rebuild would also discard any
+        change made to the old graph meanwhile.
+        """
+        current = self._graphs.get(session_id)
+        if current is None:
+            return
+        if current.meta.last_processed_index != base_index:
+            raise RevisionConflict("concept graph was rebuilt concurrently")
+        if base is None:
+            return
+        if (replacing or current is not base) and current.meta.revision != base_revision:
+            raise RevisionConflict("concept graph changed during build")
+
     def _ensure_intent_links(
         self,
         session_id: str,
@@ -157,22 +358,30 @@ class ConceptGraphService:
         session: Optional[Session] = None,
         concept_ids: Optional[Sequence[str]] = None,
     ) -> None:
-        intent_node = self._ensure_intent_node(session_id, graph, session=session)
-        if not intent_node:
-            return
-        targets = concept_ids or [
-            concept_id for concept_id in graph.concepts.keys() if concept_id != intent_node.id
-        ]
+        """Anchor `concept_ids` (all concepts when None) to the intent node.
+
+        The intent node is derived from the first user message, which never
+        changes once written, so the transcript is read only until it exists.
+        Creating it anchors every concept already in the graph.
+        """
+        if graph.intent_id is None:
+            if session is None:
+                session = self._chat_store.get_session(session_id)
+            if not self._ensure_intent_node(session_id, graph, session=session):
+                return
+            concept_ids = None
+        intent_id = graph.intent_id
+        targets = list(graph.concepts.keys()) if concept_ids is None else concept_ids
         for target_id in targets:
-            if target_id == intent_node.id:
+            if target_id == intent_id:
                 continue
-            if graph.has_edge(intent_node.id, target_id, "anchors"):
+            if graph.has_edge(intent_id, target_id, "anchors"):
                 continue
             concept = graph.concepts.get(target_id)
             introduced = concept.first_seen_index if concept else 0
             edge = ConceptEdge(
-                id=generate_edge_id(f"{intent_node.id}->{target_id}:anchors"),
-                from_concept_id=intent_node.id,
+                id=generate_edge_id(f"{intent_id}->{target_id}:anchors"),
+                from_concept_id=intent_id,
                 to_concept_id=target_id,
                 relation="anchors",
                 introduced_index=introduced,
@@ -193,21 +402,22 @@ class ConceptGraphService:
         node_id = f"intent-{session_id}"
         node = graph.concepts.get(node_id)
         if node:
-            if node.label != label:
+            if node.label != label or node.summary != summary:
                 node.label = label
-            if summary:
                 node.summary = summary
-            return node
-        node = ConceptNode(
-            id=node_id,
-            label=label,
-            type="intent",
-            summary=summary,
-            first_seen_index=0,
-            last_seen_index=0,
-            weight=1.0,
-        )
-        graph.add_concept(node)
+                graph.mark_changed(concept_ids=[node.id])
+        else:
+            node = ConceptNode(
+                id=node_id,
+                label=label,
+                type="intent",
+                summary=summary,
+                first_seen_index=0,
+                last_seen_index=0,
+                weight=1.0,
+            )
+            graph.add_concept(node)
+        graph.intent_id = node.id
         return node
 
     def _infer_intent_label(self, session: Optional[Session]) -> str:
@@ -225,10 +435,8 @@ class ConceptGraphService:
     def _first_user_message(self, session: Optional[Session]) -> str:
         if not session:
             return ""
-        for message in session.messages:
-            if message.role == "user" and message.content.strip():
-                return message.content.strip()
-        return ""
+        message = session.messages.first_user_message()
+        return message.content.strip() if message else ""
 
     def _resolve_indices(
         self,
@@ -0,0 +1,207 @@
+import math
+import re
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+_TOKEN_RE = re.compile(r"[A-Za-z0-9]+")
+_CAMEL_RE = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+# Words that never tell two concepts apart ("Effect cleanup" ~ "Effect cleanup functions"). "use" and
+# "hook" stay: useState and State are different concepts.
+_FILLER = frozenset(
+    {"a", "an", "and", "for", "function", "functions", "in", "of", "on", "react", "the", "to", "up", "with"}
+)
+# Each word also counts as this many features, so whole-word overlap outweighs spelling overlap.
+_WORD_WEIGHT = 2
+# Features held by more than this share of the indexed concepts (and at least _COMMON_MIN of them)
+# are not used to find candidates; "concept" in "Concept 12" would otherwise pull in every node.
+_COMMON_SHARE = 0.5
+_COMMON_MIN = 64
+
+
+def _stem(word: str) -> str:
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+# A label is looked up and then indexed, and summaries repeat, so both steps are memoized.
+@lru_cache(maxsize=8192)
+def concept_words(text: str) -> Tuple[str, ...]:
+    """Lowercased, singularized words with camelCase split and filler words dropped."""
+    words: List[str] = []
+    for token in _TOKEN_RE.findall(text or ""):
+        for part in _CAMEL_RE.findall(token):
+            word = _stem(part.lower())
+            if word not in _FILLER and word not in words:
+                words.append(word)
+    return tuple(words)
+
+
+@lru_cache(maxsize=8192)
+def label_features(words: Tuple[str, ...]) -> FrozenSet[str]:
+    """Character trigrams of the normalized label plus weighted whole-word features."""
+    text = f" {' '.join(words)} "
+    features = {text[idx : idx + 3] for idx in range(len(text) - 2)}
+    for word in words:
+        features.update(f"w{copy}:{word}" for copy in range(_WORD_WEIGHT))
+    return frozenset(features)
+
+
+def _jaccard(left: FrozenSet[str], right: FrozenSet[str]) -> float:
+    if not left or not right:
+        return 0.0
+    shared = len(left & right)
+    return shared / (len(left) + len(right) - shared)
+
+
+class SimilarityIndex:
+    """Near-duplicate lookup over concept labels, aliases and summaries.
+
+    A label matches when its trigram/word features reach the threshold and
+    at least `min_word_overlap` of the words are shared, which keeps
+    "Controlled inputs" apart from "Uncontrolled inputs". Candidates come from
+    an inverted feature index with prefix filtering: a set with Jaccard >= t
+    must contain one of the query's |Q| - ceil(t*|Q|) + 1 rarest features, so
+    only those posting lists are read, and a candidate must also share one of
+    the query's words. Features shared by most concepts are skipped while
+    probing, trading exactness on labels matched only through common words
+    for lookups that stay flat as graphs grow.
+    """
+
+    def __init__(self, *, summary_weight: float = 0.15, min_word_overlap: float = 0.5) -> None:
+        self._summary_weight = summary_weight
+        self._min_word_overlap = min_word_overlap
+        # concept id -> [(features, words)] for its label and each alias
+        self._entries: Dict[str, List[Tuple[FrozenSet[str], FrozenSet[str]]]] = {}
+        self._summaries: Dict[str, FrozenSet[str]] = {}
+        # concept id -> (labels, summary) it was indexed under, so re-adding an unchanged concept is free
+        self._signatures: Dict[str, Tuple[Tuple[str, ...], str]] = {}
+        # feature -> concept ids holding it; a dict rather than a set so candidates come back in a stable order
+        self._postings: Dict[str, Dict[str, None]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, concept_id: str, labels: Iterable[str], summary: str = "") -> None:
+        """Index (or re-index) one concept under its label and aliases."""
+        labels = tuple(labels)
+        signature = (labels, summary)
+        if self._signatures.get(concept_id) == signature:
+            return
+        self.remove(concept_id)
+        self._signatures[concept_id] = signature
+        entries = []
+        for label in labels:
+            words = concept_words(label)
+            if not words:
+                continue
+            features = label_features(words)
+            if any(features == existing for existing, _ in entries):
+                continue
+            entries.append((features, frozenset(words)))
+        if not entries:
+            return
+        postings = self._postings
+        for feature in self._features_of(entries):
+            holders = postings.get(feature)
+            if holders is None:
+                postings[feature] = {concept_id: None}
+            else:
+                holders[concept_id] = None
+        self._entries[concept_id] = entries
+        self._summaries[concept_id] = frozenset(concept_words(summary))
+
+    def remove(self, concept_id: str) -> None:
+        entries = self._entries.pop(concept_id, None)
+        if entries:
+            for feature in self._features_of(entries):
+                holders = self._postings.get(feature)
+                if holders is None:
+                    continue
+                holders.pop(concept_id, None)
+                if not holders:
+                    del self._postings[feature]
+        self._summaries.pop(concept_id, None)
+        self._signatures.pop(concept_id, None)
+
+    def best_match(
+        self,
+        labels: Iterable[str],
+        *,
+        summary: str = "",
+        threshold: float,
+    ) -> Optional[Tuple[str, float]]:
+        """Most similar indexed concept scoring at least `threshold`, if any."""
+        if threshold <= 0 or not self._entries:
+            return None
+        summary_words = frozenset(concept_words(summary))
+        weight = self._summary_weight if summary_words else 0.0
+        # Lowest label score that could still reach the threshold with a perfect summary.
+        label_floor = max(0.0, (threshold - weight) / (1.0 - weight))
+        best: Optional[Tuple[str, float]] = None
+        for label in labels:
+            words = concept_words(label)
+            if not words:
+                continue
+            features = label_features(words)
+            word_set = frozenset(words)
+            for concept_id in self._candidates(features, word_set, label_floor):
+                score = self._label_score(concept_id, features, word_set, label_floor)
+                if score <= 0:
+                    continue
+                if weight:
+                    score = (1.0 - weight) * score + weight * _jaccard(summary_words, self._summaries[concept_id])
+                if score >= threshold and (best is None or score > best[1]):
+                    best = (concept_id, score)
+        return best
+
+    # ------------------------------------------------------------------ helpers
+    @staticmethod
+    def _features_of(entries: List[Tuple[FrozenSet[str], FrozenSet[str]]]) -> FrozenSet[str]:
+        if len(entries) == 1:
+            return entries[0][0]
+        return frozenset().union(*(features for features, _ in entries))
+
+    def _candidates(self, features: FrozenSet[str], words: FrozenSet[str], floor: float) -> Iterable[str]:
+        if floor <= 0:
+            return list(self._entries)
+        common = max(_COMMON_MIN, int(len(self._entries) * _COMMON_SHARE))
+        # The word-overlap check rejects anything sharing no word, so only those holders are kept.
+        sharing_word: Set[str] = set()
+        for word in words:
+            holders = self._postings.get(f"w0:{word}", ())
+            if len(holders) <= common:
+                sharing_word.update(holders)
+        if not sharing_word:
+            return ()
+        needed = math.ceil(floor * len(features))
+        probe = len(features) - needed + 1
+        rarest = sorted(features, key=lambda feature: len(self._postings.get(feature, ())))[:probe]
+        found: Dict[str, None] = {}
+        for feature in rarest:
+            holders = self._postings.get(feature, ())
+            if len(holders) > common:
+                continue
+            for concept_id in holders:
+                if concept_id in sharing_word:
+                    found[concept_id] = None
+        return found
+
+    def _label_score(
+        self,
+        concept_id: str,
+        features: FrozenSet[str],
+        words: FrozenSet[str],
+        floor: float,
+    ) -> float:
+        best = 0.0
+        for entry_features, entry_words in self._entries[concept_id]:
+            # Length filter: Jaccard >= floor needs floor*|Q| <= |X| <= |Q|/floor.
+            if floor and not (floor * len(features) <= len(entry_features) <= len(features) / floor):
+                continue
+            if _jaccard(words, entry_words) < self._min_word_overlap:
+                continue
+            best = max(best, _jaccard(features, entry_features))
+        return best
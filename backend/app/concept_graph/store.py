@@ -1,24 +1,57 @@
 from typing import Dict, Optional
 
+from ..bounded_cache import CacheLimits, SpillingLRUCache
+from ..config import CONCEPT_DEDUP_THRESHOLD, CONCEPT_GRAPH_HISTORY_SIZE
 from .models import ConceptGraph
 
 
+def estimate_graph_bytes(graph: ConceptGraph) -> int:
+    total = 256
+    for node in graph.concepts.values():
+        total += 160 + len(node.label) + len(node.summary)
+        total += sum(len(alias) + 40 for alias in node.aliases)
+        total += sum(len(text) + 40 for text in node.expansions)
+    for edge in graph.edges.values():
+        total += 200 + len(edge.relation) + len(edge.evidence_snippet or "")
+    return total
+
+
 class ConceptGraphStore:
     """In-memory storage for per-session concept graphs."""
 
-    def __init__(self) -> None:
-        self._graphs: Dict[str, ConceptGraph] = {}
+    def __init__(
+        self,
+        limits: Optional[CacheLimits] = None,
+        *,
+        history_limit: int = CONCEPT_GRAPH_HISTORY_SIZE,
+        dedup_threshold: float = CONCEPT_DEDUP_THRESHOLD,
+    ) -> None:
+        self._history_limit = history_limit
+        self._dedup_threshold = dedup_threshold
+        self._graphs: SpillingLRUCache[ConceptGraph] = SpillingLRUCache(
+            "concept_graphs",
+            limits=limits,
+            sizer=estimate_graph_bytes,
+        )
 
     def get(self, session_id: str) -> Optional[ConceptGraph]:
         return self._graphs.get(session_id)
 
     def upsert(self, session_id: str, graph: ConceptGraph) -> ConceptGraph:
-        self._graphs[session_id] = graph
-        return graph
+        return self._graphs.put(session_id, graph)
+
+    def new_graph(self) -> ConceptGraph:
+        return ConceptGraph(history_limit=self._history_limit, dedup_threshold=self._dedup_threshold)
 
     def ensure(self, session_id: str) -> ConceptGraph:
         graph = self._graphs.get(session_id)
         if graph is None:
-            graph = ConceptGraph()
-            self._graphs[session_id] = graph
+            graph = self.new_graph()
+            self._graphs.put(session_id, graph)
         return graph
+
+    def stats(self) -> Dict[str, int]:
+        return self._graphs.stats()
+
+    def close(self) -> None:
+        self._graphs.close()
@@ -3,11 +3,67 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
+LLM_STUB = os.getenv("LLM_STUB", "false").strip().lower() in {"1", "true", "yes"}
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "") or ("stub" if LLM_STUB else "")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
 OPENAI_CONCEPT_MODEL = os.getenv("OPENAI_CONCEPT_MODEL") or OPENAI_MODEL
-CHAT_MAX_HISTORY = int(os.getenv("CHAT_MAX_HISTORY", "20"))
+CHAT_MAX_HISTORY = int(os.getenv("CHAT_MAX_HISTORY", "50"))
+CHAT_CONTEXT_TOKEN_BUDGET = int(os.getenv("CHAT_CONTEXT_TOKEN_BUDGET", "6000"))
+CHAT_CONTEXT_MODEL_BUDGETS = {
+    model.strip(): int(budget)
+    for model, _, budget in (
+        item.partition("=") for item in os.getenv("CHAT_CONTEXT_MODEL_BUDGETS", "").split(",") if "=" in item
+    )
+}
+CHAT_SUMMARY_ENABLED = os.getenv("CHAT_SUMMARY_ENABLED", "true").strip().lower() in {"1", "true", "yes"}
+CHAT_SUMMARY_MAX_TOKENS = int(os.getenv("CHAT_SUMMARY_MAX_TOKENS", "400"))
 CHAT_CONTEXT_FILE = os.getenv("CHAT_CONTEXT_FILE", "context.txt")
+CHAT_CONTEXT_POLL_SECONDS = float(os.getenv("CHAT_CONTEXT_POLL_SECONDS", "2"))
+DOCS_SOURCE_DIR = os.getenv("DOCS_SOURCE_DIR", "../react.dev/src/content")
+DOCS_INDEX_PATH = os.getenv("DOCS_INDEX_PATH", "tmp/react_docs")
+DOCS_INDEX_AUTOBUILD = os.getenv("DOCS_INDEX_AUTOBUILD", "true").strip().lower() in {"1", "true", "yes"}
+DOCS_INDEX_RELOAD_SECONDS = float(os.getenv("DOCS_INDEX_RELOAD_SECONDS", "5"))
+DOCS_INDEX_MAX_SEGMENTS = int(os.getenv("DOCS_INDEX_MAX_SEGMENTS", "4"))
+DOCS_TOP_K = int(os.getenv("DOCS_TOP_K", "4"))
+DOCS_TOKEN_BUDGET = int(os.getenv("DOCS_TOKEN_BUDGET", "1200"))
+DOCS_QUERY_CACHE_SIZE = int(os.getenv("DOCS_QUERY_CACHE_SIZE", "256"))
+CONCEPT_GRAPH_AUTO_BUILD = os.getenv("CONCEPT_GRAPH_AUTO_BUILD", "false").strip().lower() in {"1", "true", "yes"}
+CONCEPT_GRAPH_DEBOUNCE_SECONDS = float(os.getenv("CONCEPT_GRAPH_DEBOUNCE_SECONDS", "2"))
+CONCEPT_GRAPH_MAX_DELAY_SECONDS = float(os.getenv("CONCEPT_GRAPH_MAX_DELAY_SECONDS", "10"))
+CONCEPT_GRAPH_HISTORY_SIZE = int(os.getenv("CONCEPT_GRAPH_HISTORY_SIZE", "2000"))
+CONCEPT_DEDUP_THRESHOLD = float(os.getenv("CONCEPT_DEDUP_THRESHOLD", "0.65"))
+CONCEPT_WINDOW_TOKENS = int(os.getenv("CONCEPT_WINDOW_TOKENS", "3000"))
+CONCEPT_WINDOW_OVERLAP_TOKENS = int(os.getenv("CONCEPT_WINDOW_OVERLAP_TOKENS", "300"))
+CONCEPT_WINDOW_CONCURRENCY = int(os.getenv("CONCEPT_WINDOW_CONCURRENCY", "4"))
+GOAL_REFINE_WORKERS = int(os.getenv("GOAL_REFINE_WORKERS", "4"))
+GOAL_REFINE_JOB_HISTORY = int(os.getenv("GOAL_REFINE_JOB_HISTORY", "1000"))
+CHAT_STORE_BACKEND = os.getenv("CHAT_STORE_BACKEND", "memory").strip().lower()
+CHAT_STORE_PATH = os.getenv("CHAT_STORE_PATH", "chat.db")
+STORE_MAX_SESSIONS = int(os.getenv("STORE_MAX_SESSIONS", "0")) or None
+STORE_MAX_BYTES = int(os.getenv("STORE_MAX_BYTES", "0")) or None
+STORE_IDLE_TTL_SECONDS = float(os.getenv("STORE_IDLE_TTL_SECONDS", "0")) or None
+STORE_SPILL_DIR = os.getenv("STORE_SPILL_DIR", "tmp/spill")
+CHAT_LOG_HOT_MESSAGES = int(os.getenv("CHAT_LOG_HOT_MESSAGES", "0"))
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "false").strip().lower() in {"1", "true", "yes"}
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024"))
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "")
+LLM_CACHE_TTL_CONCEPTS = float(os.getenv("LLM_CACHE_TTL_CONCEPTS", "3600"))
+LLM_CACHE_TTL_GOAL = float(os.getenv("LLM_CACHE_TTL_GOAL", "600"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "0"))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "0"))
+LLM_MAX_QUEUE_SECONDS = float(os.getenv("LLM_MAX_QUEUE_SECONDS", "30"))
+LLM_HEDGING = os.getenv("LLM_HEDGING", "false").strip().lower() in {"1", "true", "yes"}
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+LLM_STUB_LATENCY_MS = float(os.getenv("LLM_STUB_LATENCY_MS", "400"))
+LLM_STUB_LATENCY_P95_MS = float(os.getenv("LLM_STUB_LATENCY_P95_MS", "1200"))
+LLM_STUB_TOKENS_PER_SECOND = float(os.getenv("LLM_STUB_TOKENS_PER_SECOND", "80"))
+LLM_STUB_PREFILL_TOKENS_PER_SECOND = float(os.getenv("LLM_STUB_PREFILL_TOKENS_PER_SECOND", "0"))
+LLM_STUB_ERROR_RATE = float(os.getenv("LLM_STUB_ERROR_RATE", "0"))
+LLM_STUB_SEED = int(os.getenv("LLM_STUB_SEED", "0")) or None
+LLM_STUB_SCRIPT = os.getenv("LLM_STUB_SCRIPT", "")
 
 if not OPENAI_API_KEY:
-    raise RuntimeError("Missing OPENAI_API_KEY in environment (.env).")
+    raise RuntimeError("Missing OPENAI_API_KEY in environment (.env); set LLM_STUB=true to run offline.")
@@ -0,0 +1,85 @@
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence
+
+from .message_record import MessageRecord
+from .tokens import MESSAGE_OVERHEAD_TOKENS, count_tokens
+
+
+@lru_cache(maxsize=256)
+def _count_fixed(text: str) -> int:
+    return count_tokens(text) + MESSAGE_OVERHEAD_TOKENS
+
+
+def message_tokens(message: MessageRecord) -> int:
+    """Token cost of one stored message, counted when the record was built."""
+    return message.token_count
+
+
+@dataclass
+class PackedContext:
+    messages: List[dict]
+    tokens: int
+    # Index (into the candidate window) of the oldest message kept verbatim.
+    first_kept: int
+    summary_used: bool
+
+
+class ContextBuilder:
+    """Pack system prompts, a running summary and the newest turns into a per-model token budget."""
+
+    def __init__(self, *, default_budget: int, model_budgets: Optional[Dict[str, int]] = None) -> None:
+        self._default_budget = default_budget
+        self._model_budgets = dict(model_budgets or {})
+
+    def budget_for(self, model: str) -> int:
+        return self._model_budgets.get(model, self._default_budget)
+
+    def pack(
+        self,
+        *,
+        model: str,
+        system_parts: Sequence[str],
+        window: Sequence[MessageRecord],
+        summary: str = "",
+        window_is_complete: bool = True,
+    ) -> PackedContext:
+        """Keep whole turns newest-first until the budget is spent.
+
+        The newest message is always kept. When anything older than the kept
+        turns exists, the running summary (if any) is slotted in after the
+        system prompts and its cost is reserved up front.
+        """
+        budget = self.budget_for(model)
+        head = [{"role": "system", "content": part} for part in system_parts if part]
+        used = sum(_count_fixed(part) for part in system_parts if part)
+
+        summary_text = f"Summary of the earlier conversation:\n{summary}" if summary else ""
+        summary_cost = _count_fixed(summary_text) if summary_text else 0
+
+        first_kept = len(window)
+        kept_cost = 0
+        for idx in range(len(window) - 1, -1, -1):
+            cost = message_tokens(window[idx])
+            dropping_older = idx > 0 or not window_is_complete
+            reserve = summary_cost if dropping_older else 0
+            if first_kept < len(window) and used + kept_cost + cost + reserve > budget:
+                break
+            kept_cost += cost
+            first_kept = idx
+
+        summary_used = bool(summary_text) and (first_kept > 0 or not window_is_complete)
+        if summary_used:
+            head.append({"role": "system", "content": summary_text})
+            used += summary_cost
+        body = [{"role": m.role, "content": m.content} for m in window[first_kept:]]
+        return PackedContext(
+            messages=head + body,
+            tokens=used + kept_cost,
+            first_kept=first_kept,
+            summary_used=summary_used,
+        )
+
+
+def render_transcript(messages: Sequence[MessageRecord]) -> str:
+    return "\n".join(f"{m.role}: {m.content}" for m in messages)
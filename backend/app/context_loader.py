@@ -1,15 +1,284 @@
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
 from functools import lru_cache
 from pathlib import Path
+from typing import Dict, Optional, Tuple
 
-from .config import CHAT_CONTEXT_FILE
+from .config import (
+    CHAT_CONTEXT_FILE,
+    CHAT_CONTEXT_POLL_SECONDS,
+    DOCS_INDEX_AUTOBUILD,
+    DOCS_INDEX_MAX_SEGMENTS,
+    DOCS_INDEX_PATH,
+    DOCS_INDEX_RELOAD_SECONDS,
+    DOCS_QUERY_CACHE_SIZE,
+    DOCS_SOURCE_DIR,
+    DOCS_TOKEN_BUDGET,
+    DOCS_TOP_K,
+)
+from .context_builder import count_tokens
+from .docs_index import MANIFEST_NAME, DocsIndexWriter, SegmentedIndex
+
+# Only the tail of long queries (e.g. whole transcripts) is used for retrieval.
+MAX_QUERY_CHARS = 2000
+
+
+@dataclass(frozen=True)
+class ContextSnapshot:
+    """Immutable documentation context plus the version id recorded in prompts and cache keys."""
+
+    text: str
+    version: str
+    loaded_ts: float
+
+    def render(self) -> str:
+        if not self.text:
+            return ""
+        return f"[documentation context {self.version}]\n{self.text}"
+
+
+_EMPTY_VERSION = "none"
+
+
+class ContextProvider:
+    """Serve `path` as immutable snapshots, swapping in a new one when the file changes.
+
+    The file's mtime and size are polled at most every `poll_interval` seconds
+    on access. Versions are content hashes, so an unchanged file keeps its
+    version (and its cache entries) across reloads and restarts.
+    """
+
+    def __init__(self, path: Path, *, poll_interval: float = CHAT_CONTEXT_POLL_SECONDS) -> None:
+        self._path = Path(path)
+        self._poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._signature: Optional[Tuple[int, int]] = None
+        self._next_check = 0.0
+        self._snapshot = ContextSnapshot(text="", version=_EMPTY_VERSION, loaded_ts=time.time())
+        self.reloads = 0
+        self.reload()
+
+    def current(self) -> ContextSnapshot:
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + self._poll_interval
+            self.reload()
+        return self._snapshot
+
+    def reload(self) -> bool:
+        """Re-read the file if its mtime or size changed; returns True when the version changed."""
+        try:
+            st = self._path.stat()
+            signature: Optional[Tuple[int, int]] = (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            signature = None
+        with self._lock:
+            if signature == self._signature and self.reloads:
+                return False
+            self._signature = signature
+            text = ""
+            if signature is not None:
+                try:
+                    text = self._path.read_text(encoding="utf-8").strip()
+                except FileNotFoundError:
+                    text = ""
+            version = "ctx-" + hashlib.sha1(text.encode("utf-8")).hexdigest()[:12] if text else _EMPTY_VERSION
+            self.reloads += 1
+            if version == self._snapshot.version:
+                return False
+            self._snapshot = ContextSnapshot(text=text, version=version, loaded_ts=time.time())
+            return True
+
+    def stats(self) -> Dict[str, object]:
+        snapshot = self._snapshot
+        return {"version": snapshot.version, "loaded_ts": snapshot.loaded_ts, "reloads": self.reloads}
 
 
 @lru_cache(maxsize=1)
-def load_initial_context() -> str:
-    """Load the optional context snippet from disk once."""
-    path = Path(CHAT_CONTEXT_FILE)
-    try:
-        data = path.read_text(encoding="utf-8")
-    except FileNotFoundError:
-        return ""
-    return data.strip()
+def load_context_provider() -> ContextProvider:
+    return ContextProvider(Path(CHAT_CONTEXT_FILE))
+
+
+class DocsRetriever:
+    """Top-k react.dev chunks for a query, packed into a token budget.
+
+    Falls back to the context file snapshot when no index is available or the
+    query matches nothing. The manifest is re-checked at most every
+    `reload_interval` seconds; a newer generation is opened and swapped in by
+    rebinding one reference, so queries never wait on an index update.
+    Results are kept per (generation, query) in an LRU of `cache_size`
+    entries, and request handlers call `context_for_async`, which searches
+    on a worker thread so BM25 scoring never runs on the event loop.
+    """
+
+    def __init__(
+        self,
+        root: Optional[Path],
+        *,
+        fallback: ContextProvider,
+        top_k: int = DOCS_TOP_K,
+        token_budget: int = DOCS_TOKEN_BUDGET,
+        reload_interval: float = DOCS_INDEX_RELOAD_SECONDS,
+        cache_size: int = DOCS_QUERY_CACHE_SIZE,
+    ) -> None:
+        self._root = root
+        self._index: Optional[SegmentedIndex] = None
+        self._manifest_mtime: Optional[int] = None
+        self._fallback = fallback
+        self._top_k = top_k
+        self._token_budget = token_budget
+        self._reload_interval = reload_interval
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self._cache_size = max(0, cache_size)
+        # (generation, query) -> (rendered excerpts, their token count)
+        self._cache: "OrderedDict[Tuple[int, str], Tuple[str, int]]" = OrderedDict()
+        self.queries = 0
+        self.fallbacks = 0
+        self.cache_hits = 0
+        self.tokens_injected = 0
+        self.reloads = 0
+        self.refresh()
+
+    @property
+    def enabled(self) -> bool:
+        return self._index is not None and self._top_k > 0
+
+    def refresh(self) -> bool:
+        """Swap in the newest published generation; returns True when it changed."""
+        if self._root is None:
+            return False
+        try:
+            mtime = (self._root / MANIFEST_NAME).stat().st_mtime_ns
+        except FileNotFoundError:
+            return False
+        with self._lock:
+            if mtime == self._manifest_mtime:
+                return False
+            index = SegmentedIndex.open(self._root)
+            if index is None:
+                return False
+            # The previous snapshot is left to the garbage collector: a query that
+            # still holds it keeps its mappings valid until it finishes.
+            self._index = index
+            self._manifest_mtime = mtime
+            self._cache.clear()
+            self.reloads += 1
+            return True
+
+    def context_for(self, query: str) -> ContextSnapshot:
+        with self._lock:
+            self.queries += 1
+            now = time.monotonic()
+            reload_due = now >= self._next_check
+            if reload_due:
+                self._next_check = now + self._reload_interval
+        if reload_due:
+            self.refresh()
+        index = self._index
+        if index is not None and self._top_k > 0 and query.strip():
+            text = self._retrieve(index, query[-MAX_QUERY_CHARS:])
+            if text:
+                return ContextSnapshot(text=text, version=f"docs-g{index.generation}", loaded_ts=time.time())
+        with self._lock:
+            self.fallbacks += 1
+        return self._fallback.current()
+
+    async def context_for_async(self, query: str) -> ContextSnapshot:
+        """`context_for` on a worker thread, for callers on the event loop.
+
+        Cached queries are answered inline: the hop to a worker and back costs
+        far more than the lookup once the loop is busy.
+        """
+        snapshot = self._cached_context(query)
+        if snapshot is not None:
+            return snapshot
+        return await asyncio.to_thread(self.context_for, query)
+
+    def _cached_context(self, query: str) -> Optional[ContextSnapshot]:
+        """The snapshot for an already-answered query; None when it needs a search, a reload check or the fallback."""
+        index = self._index
+        if index is None or self._top_k <= 0 or not query.strip():
+            return None
+        key = (index.generation, query[-MAX_QUERY_CHARS:])
+        with self._lock:
+            if time.monotonic() >= self._next_check:
+                return None
+            cached = self._cache.get(key)
+            if cached is None or not cached[0]:
+                return None
+            self._cache.move_to_end(key)
+            self.queries += 1
+            self.cache_hits += 1
+            self.tokens_injected += cached[1]
+        return ContextSnapshot(text=cached[0], version=f"docs-g{index.generation}", loaded_ts=time.time())
+
+    def stats(self) -> Dict[str, object]:
+        out: Dict[str, object] = {
+            "enabled": int(self.enabled),
+            "queries": self.queries,
+            "fallbacks": self.fallbacks,
+            "cache_hits": self.cache_hits,
+            "tokens_injected": self.tokens_injected,
+            "reloads": self.reloads,
+            "context_file": self._fallback.stats(),
+        }
+        if self._index is not None:
+            out.update(self._index.stats())
+        return out
+
+    def _retrieve(self, index: SegmentedIndex, query: str) -> str:
+        key = (index.generation, query)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+        if cached is None:
+            cached = self._search(index, query)
+            with self._lock:
+                if self._cache_size:
+                    self._cache[key] = cached
+                    while len(self._cache) > self._cache_size:
+                        self._cache.popitem(last=False)
+        text, used = cached
+        if text:
+            with self._lock:
+                self.tokens_injected += used
+        return text
+
+    def _search(self, index: SegmentedIndex, query: str) -> Tuple[str, int]:
+        parts = []
+        used = 0
+        for _, key in index.search(query, self._top_k):
+            rendered = index.chunk(key).render()
+            cost = count_tokens(rendered)
+            if used + cost > self._token_budget:
+                continue
+            parts.append(rendered)
+            used += cost
+        if not parts:
+            return "", 0
+        return "Relevant React documentation excerpts:\n\n" + "\n\n".join(parts), used
+
+
+@lru_cache(maxsize=1)
+def load_docs_retriever() -> DocsRetriever:
+    """Open the docs index once, building or syncing it from `DOCS_SOURCE_DIR` first if allowed.
+
+    A missing index is built before serving; an existing one is synced with the
+    pages on a background thread and picked up on the next reload check.
+    """
+    root = Path(DOCS_INDEX_PATH)
+    source = Path(DOCS_SOURCE_DIR)
+    if DOCS_INDEX_AUTOBUILD and source.is_dir():
+        writer = DocsIndexWriter(root, source, max_segments=DOCS_INDEX_MAX_SEGMENTS)
+        if (root / MANIFEST_NAME).exists():
+            writer.sync_in_background()
+        else:
+            writer.sync()
+    return DocsRetriever(root, fallback=load_context_provider())
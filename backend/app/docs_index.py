@@ -0,0 +1,668 @@
+"""Incrementally maintained BM25 index over the react.dev markdown pages.
+
+Build or update it offline with::
+
+    python -m app.docs_index sync --source ../react.dev/src/content --index tmp/react_docs
+
+The index directory holds immutable segment files plus a `manifest.json` that
+lists the live segments, a content hash and doc range per page, and deleted doc
+ranges. Each segment is laid out as fixed sections of native-endian arrays, so
+`DocsIndex` can mmap it and answer lookups without deserializing anything up
+front. A sync writes only the changed pages into a new segment and tombstones
+their old chunks; a merge folds everything into one segment. Both publish by
+atomically replacing the manifest, so readers keep serving the generation they
+opened while the index is updated.
+"""
+import argparse
+import bisect
+import hashlib
+import heapq
+import json
+import logging
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+import time
+from array import array
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-process lock applies
+    fcntl = None
+
+MAGIC = b"BM25IDX1"
+FORMAT_VERSION = 1
+BM25_K1 = 1.2
+BM25_B = 0.75
+CHUNK_MAX_CHARS = 1200
+CHUNK_MIN_CHARS = 80
+MANIFEST_NAME = "manifest.json"
+LOCK_NAME = "writer.lock"
+SEGMENT_DIR = "segments"
+# A term with more postings than this is only looked up in the best documents scored so far.
+MAX_TERM_POSTINGS = 256
+
+logger = logging.getLogger(__name__)
+
+# magic, version, little-endian flag, n_docs, n_terms, n_postings, avg doc length
+_HEADER = struct.Struct("<8sIIIIQd")
+_SECTIONS = (
+    "term_offsets",  # uint32[n_terms + 1] into term_blob
+    "term_blob",  # sorted utf-8 terms, concatenated
+    "postings_start",  # uint32[n_terms + 1] into postings_docs / postings_tf
+    "postings_docs",  # uint32[n_postings]
+    "postings_tf",  # uint16[n_postings]
+    "doc_lens",  # uint32[n_docs]
+    "doc_offsets",  # uint64[n_docs + 1] into doc_blob
+    "doc_blob",  # "source\x1fheading\x1ftext" per chunk
+)
+_SECTION_TABLE = struct.Struct("<" + "QQ" * len(_SECTIONS))
+_SECTION_CODES = {
+    "term_offsets": "I",
+    "postings_start": "I",
+    "postings_docs": "I",
+    "postings_tf": "H",
+    "doc_lens": "I",
+    "doc_offsets": "Q",
+}
+_FIELD_SEP = "\x1f"
+
+_WORD_RE = re.compile(r"[A-Za-z0-9]+")
+_CAMEL_RE = re.compile(r"[A-Z]?[a-z]+|[A-Z]+(?![a-z])|[0-9]+")
+_HEADING_RE = re.compile(r"^(#{1,4})\s+(.*?)\s*(\{/\*.*\*/\})?\s*$")
+_MDX_TAG_RE = re.compile(r"^\s*</?[A-Z][A-Za-z]*[^>]*>\s*$")
+_STOPWORDS = frozenset(
+    """a an and are as at be but by can do does for from has have how i if in into is it its of on or
+    so that the their them then there these this to was we what when where which while will with you your""".split()
+)
+
+
+@dataclass(frozen=True)
+class DocChunk:
+    source: str
+    heading: str
+    text: str
+
+    def render(self) -> str:
+        return f"[{self.source} › {self.heading}]\n{self.text}"
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens; camelCase identifiers also index their parts (useState -> state)."""
+    out: List[str] = []
+    for word in _WORD_RE.findall(text):
+        lowered = word.lower()
+        if lowered not in _STOPWORDS and len(lowered) > 1:
+            out.append(lowered)
+        parts = _CAMEL_RE.findall(word)
+        if len(parts) > 1:
+            out.extend(p.lower() for p in parts if len(p) > 1 and p.lower() not in _STOPWORDS)
+    return out
+
+
+# ---- chunking
+def chunk_markdown(text: str, source: str) -> List[DocChunk]:
+    """Split one page into heading-scoped chunks of prose; fenced code and MDX wrapper tags are dropped."""
+    title, body = _split_frontmatter(text)
+    heading = title or source
+    chunks: List[DocChunk] = []
+    paragraph: List[str] = []
+    section: List[str] = []
+    in_fence = False
+
+    def flush_paragraph() -> None:
+        if paragraph:
+            section.append(" ".join(paragraph))
+            paragraph.clear()
+
+    def flush_section() -> None:
+        flush_paragraph()
+        chunks.extend(_pack_section(source, heading, section))
+        section.clear()
+
+    for line in body.splitlines():
+        stripped = line.strip()
+        if stripped.startswith("```"):
+            in_fence = not in_fence
+            flush_paragraph()
+            continue
+        if in_fence:
+            continue
+        match = _HEADING_RE.match(stripped)
+        if match:
+            flush_section()
+            heading = f"{title} › {match.group(2)}" if title else match.group(2)
+            continue
+        if not stripped or _MDX_TAG_RE.match(stripped):
+            flush_paragraph()
+            continue
+        paragraph.append(stripped)
+    flush_section()
+    return chunks
+
+
+def _split_frontmatter(text: str) -> Tuple[str, str]:
+    if not text.startswith("---"):
+        return "", text
+    end = text.find("\n---", 3)
+    if end == -1:
+        return "", text
+    title = ""
+    for line in text[3:end].splitlines():
+        key, _, value = line.partition(":")
+        if key.strip() == "title":
+            title = value.strip().strip("'\"")
+    return title, text[end + 4 :]
+
+
+def _pack_section(source: str, heading: str, paragraphs: Sequence[str]) -> List[DocChunk]:
+    out: List[DocChunk] = []
+    current = ""
+    for paragraph in paragraphs:
+        while len(paragraph) > CHUNK_MAX_CHARS:
+            cut = paragraph.rfind(" ", 0, CHUNK_MAX_CHARS)
+            cut = cut if cut > 0 else CHUNK_MAX_CHARS
+            if current:
+                out.append(DocChunk(source, heading, current))
+                current = ""
+            out.append(DocChunk(source, heading, paragraph[:cut]))
+            paragraph = paragraph[cut:].lstrip()
+        if current and len(current) + len(paragraph) + 1 > CHUNK_MAX_CHARS:
+            out.append(DocChunk(source, heading, current))
+            current = ""
+        current = f"{current}\n{paragraph}" if current else paragraph
+    if current:
+        out.append(DocChunk(source, heading, current))
+    return [chunk for chunk in out if len(chunk.text) >= CHUNK_MIN_CHARS]
+
+
+# ---- writing
+def write_index(chunks: Sequence[DocChunk], path: Path) -> Dict[str, int]:
+    """Serialize `chunks` into an index file; the file is replaced atomically."""
+    postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+    doc_lens = array("I")
+    for doc_id, chunk in enumerate(chunks):
+        counts = Counter(tokenize(f"{chunk.heading} {chunk.text}"))
+        doc_lens.append(sum(counts.values()))
+        for term, tf in counts.items():
+            postings[term].append((doc_id, min(tf, 0xFFFF)))
+
+    terms = sorted(postings, key=lambda t: t.encode("utf-8"))
+    term_offsets = array("I", [0])
+    term_blob = bytearray()
+    postings_start = array("I", [0])
+    postings_docs = array("I")
+    postings_tf = array("H")
+    for term in terms:
+        term_blob += term.encode("utf-8")
+        term_offsets.append(len(term_blob))
+        for doc_id, tf in postings[term]:
+            postings_docs.append(doc_id)
+            postings_tf.append(tf)
+        postings_start.append(len(postings_docs))
+
+    doc_offsets = array("Q", [0])
+    doc_blob = bytearray()
+    for chunk in chunks:
+        doc_blob += _FIELD_SEP.join((chunk.source, chunk.heading, chunk.text)).encode("utf-8")
+        doc_offsets.append(len(doc_blob))
+
+    payloads = {
+        "term_offsets": term_offsets.tobytes(),
+        "term_blob": bytes(term_blob),
+        "postings_start": postings_start.tobytes(),
+        "postings_docs": postings_docs.tobytes(),
+        "postings_tf": postings_tf.tobytes(),
+        "doc_lens": doc_lens.tobytes(),
+        "doc_offsets": doc_offsets.tobytes(),
+        "doc_blob": bytes(doc_blob),
+    }
+    avgdl = (sum(doc_lens) / len(doc_lens)) if doc_lens else 0.0
+    header = _HEADER.pack(
+        MAGIC,
+        FORMAT_VERSION,
+        1 if sys.byteorder == "little" else 0,
+        len(chunks),
+        len(terms),
+        len(postings_docs),
+        avgdl,
+    )
+    offset = _HEADER.size + _SECTION_TABLE.size
+    table: List[int] = []
+    body = bytearray()
+    for name in _SECTIONS:
+        pad = (-offset) % 8
+        body += b"\0" * pad
+        offset += pad
+        table.extend((offset, len(payloads[name])))
+        body += payloads[name]
+        offset += len(payloads[name])
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as fh:
+        fh.write(header)
+        fh.write(_SECTION_TABLE.pack(*table))
+        fh.write(body)
+    os.replace(tmp, path)
+    return {"chunks": len(chunks), "terms": len(terms), "postings": len(postings_docs), "bytes": offset}
+
+
+# ---- reading
+class DocsIndex:
+    """Read-only, memory-mapped view of one segment file written by `write_index`."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self._file = open(self.path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        self._sections: Dict[str, memoryview] = {}
+        magic, version, little, n_docs, n_terms, n_postings, avgdl = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self.close()
+            raise ValueError(f"{self.path} is not a docs index segment (format {FORMAT_VERSION})")
+        if bool(little) != (sys.byteorder == "little"):
+            self.close()
+            raise ValueError(f"{self.path} was built on a machine with a different byte order")
+        self.n_docs = n_docs
+        self.n_terms = n_terms
+        self.n_postings = n_postings
+        self.avgdl = avgdl
+        table = _SECTION_TABLE.unpack_from(self._mmap, _HEADER.size)
+        for idx, name in enumerate(_SECTIONS):
+            start, length = table[2 * idx], table[2 * idx + 1]
+            view = self._view[start : start + length]
+            code = _SECTION_CODES.get(name)
+            self._sections[name] = view.cast(code) if code else view
+
+    def postings(self, term: str) -> Optional[Tuple[memoryview, memoryview]]:
+        """(doc ids, term frequencies) for `term`, or None when the segment lacks it."""
+        term_id = self._lookup(term)
+        if term_id is None:
+            return None
+        starts = self._sections["postings_start"]
+        lo, hi = starts[term_id], starts[term_id + 1]
+        return self._sections["postings_docs"][lo:hi], self._sections["postings_tf"][lo:hi]
+
+    def doc_lengths(self) -> memoryview:
+        return self._sections["doc_lens"]
+
+    def chunk(self, doc_id: int) -> DocChunk:
+        offsets = self._sections["doc_offsets"]
+        raw = bytes(self._sections["doc_blob"][offsets[doc_id] : offsets[doc_id + 1]])
+        source, heading, text = raw.decode("utf-8").split(_FIELD_SEP, 2)
+        return DocChunk(source, heading, text)
+
+    def close(self) -> None:
+        for view in self._sections.values():
+            view.release()
+        self._sections = {}
+        self._view.release()
+        self._mmap.close()
+        self._file.close()
+
+    def _lookup(self, term: str) -> Optional[int]:
+        needle = term.encode("utf-8")
+        offsets = self._sections["term_offsets"]
+        blob = self._sections["term_blob"]
+        lo, hi = 0, self.n_terms
+        while lo < hi:
+            mid = (lo + hi) // 2
+            candidate = blob[offsets[mid] : offsets[mid + 1]].tobytes()
+            if candidate < needle:
+                lo = mid + 1
+            elif candidate > needle:
+                hi = mid
+            else:
+                return mid
+        return None
+
+
+def _read_manifest(root: Path) -> Optional[dict]:
+    try:
+        return json.loads((root / MANIFEST_NAME).read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+
+
+def _empty_manifest() -> dict:
+    return {"format": FORMAT_VERSION, "generation": 0, "segments": [], "files": {}, "deleted": {}}
+
+
+class SegmentedIndex:
+    """Immutable snapshot of one manifest generation; search keys are (segment, doc id).
+
+    BM25 statistics (doc count, average length, document frequency) are summed
+    over segments and, like Lucene, still count tombstoned docs until a merge.
+    Terms are scored rarest first. Once a term has more than
+    `MAX_TERM_POSTINGS` postings and rarer terms have already matched at least
+    `16 * k` (and 64) documents, it and every more common term are looked up
+    only in the best of those: their low IDF rarely reorders them, and long
+    queries full of common words would otherwise score most of the index.
+    """
+
+    def __init__(self, root: Path, manifest: dict, segments: List[DocsIndex]) -> None:
+        self.root = root
+        self.generation = int(manifest["generation"])
+        self._segments = segments
+        self._deleted: List[frozenset] = []
+        for name in manifest["segments"]:
+            ids = set()
+            for start, end in manifest["deleted"].get(name, []):
+                ids.update(range(start, end))
+            self._deleted.append(frozenset(ids))
+        total_docs = sum(seg.n_docs for seg in segments)
+        self.n_docs = total_docs - sum(len(ids) for ids in self._deleted)
+        self._avgdl = (sum(seg.avgdl * seg.n_docs for seg in segments) / total_docs) if total_docs else 1.0
+        self._stat_docs = max(1, total_docs)
+
+    @classmethod
+    def open(cls, root: Path) -> Optional["SegmentedIndex"]:
+        """Open the current generation, or None when no index has been built yet."""
+        for _ in range(3):
+            manifest = _read_manifest(root)
+            if manifest is None or manifest.get("format") != FORMAT_VERSION:
+                return None
+            segments: List[DocsIndex] = []
+            try:
+                for name in manifest["segments"]:
+                    segments.append(DocsIndex(root / SEGMENT_DIR / name))
+            except BaseException as exc:
+                for segment in segments:
+                    segment.close()
+                if isinstance(exc, FileNotFoundError):
+                    continue  # a merge replaced the manifest while we were opening it
+                raise
+            return cls(root, manifest, segments)
+        return None
+
+    def search(self, query: str, k: int = 4) -> List[Tuple[float, Tuple[int, int]]]:
+        """Return up to `k` (score, key) pairs, best first."""
+        if not self.n_docs:
+            return []
+        terms = set(tokenize(query))
+        df: Dict[str, int] = defaultdict(int)
+        per_term: Dict[str, List[Tuple[int, Tuple[memoryview, memoryview]]]] = defaultdict(list)
+        for seg_idx, segment in enumerate(self._segments):
+            for term in terms:
+                postings = segment.postings(term)
+                if postings is not None:
+                    df[term] += len(postings[0])
+                    per_term[term].append((seg_idx, postings))
+        scores: Dict[Tuple[int, int], float] = defaultdict(float)
+        norm = BM25_K1 / (self._avgdl or 1.0)
+        limit = max(16 * k, 64)
+        candidates: Optional[List[Tuple[int, int]]] = None
+        for term in sorted(per_term, key=df.__getitem__):
+            idf = math.log(1.0 + (self._stat_docs - df[term] + 0.5) / (df[term] + 0.5))
+            if candidates is None and df[term] > MAX_TERM_POSTINGS and len(scores) >= limit:
+                candidates = sorted(heapq.nlargest(limit, scores, key=scores.__getitem__))
+            for seg_idx, (docs, tfs) in per_term[term]:
+                deleted = self._deleted[seg_idx]
+                lens = self._segments[seg_idx].doc_lengths()
+                if candidates is not None:
+                    # Postings are sorted by doc id, so each candidate is a binary search.
+                    hits = []
+                    for key_seg, doc_id in candidates:
+                        if key_seg != seg_idx:
+                            continue
+                        pos = bisect.bisect_left(docs, doc_id)
+                        if pos < len(docs) and docs[pos] == doc_id:
+                            hits.append((doc_id, tfs[pos]))
+                else:
+                    hits = zip(docs, tfs)
+                for doc_id, tf in hits:
+                    if doc_id in deleted:
+                        continue
+                    denom = tf + BM25_K1 * (1 - BM25_B) + BM25_B * norm * lens[doc_id]
+                    scores[(seg_idx, doc_id)] += idf * tf * (BM25_K1 + 1) / denom
+        return heapq.nlargest(k, ((score, key) for key, score in scores.items()))
+
+    def chunk(self, key: Tuple[int, int]) -> DocChunk:
+        seg_idx, doc_id = key
+        return self._segments[seg_idx].chunk(doc_id)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "generation": self.generation,
+            "segments": len(self._segments),
+            "docs": self.n_docs,
+            "deleted_docs": sum(len(ids) for ids in self._deleted),
+            "bytes": sum(seg.path.stat().st_size for seg in self._segments if seg.path.exists()),
+        }
+
+    def close(self) -> None:
+        for segment in self._segments:
+            segment.close()
+        self._segments = []
+
+
+# ---- writing the index directory
+class DocsIndexWriter:
+    """Keep an index directory in sync with a markdown tree.
+
+    Pages are compared by size and mtime first and by content hash second;
+    only new or changed pages are re-chunked. Syncs and merges hold an
+    exclusive lock on `writer.lock` in the index directory, so writers in
+    other processes (e.g. every uvicorn worker syncing at startup) take turns
+    and each starts from the manifest the previous one published.
+    """
+
+    def __init__(self, root: Path, source_dir: Path, *, max_segments: int = 4, max_deleted_ratio: float = 0.3) -> None:
+        self.root = Path(root)
+        self.source_dir = Path(source_dir)
+        self._max_segments = max(1, max_segments)
+        self._max_deleted_ratio = max_deleted_ratio
+        self._lock = threading.Lock()
+
+    def sync(self, *, full: bool = False) -> Dict[str, float]:
+        """Reindex new, changed and removed pages (every page when `full`) and publish a new generation."""
+        started = time.perf_counter()
+        with self._exclusive():
+            current = _read_manifest(self.root)
+            manifest = current or _empty_manifest()
+            replaced: List[str] = []
+            if full and current is not None:
+                replaced = list(current["segments"])
+                manifest = dict(_empty_manifest(), generation=current["generation"])
+            files: Dict[str, dict] = manifest["files"]
+            seen = set()
+            changed: List[Tuple[str, str, str, os.stat_result]] = []
+            touched = False
+            for path in sorted(self.source_dir.rglob("*.md")):
+                rel = path.relative_to(self.source_dir).as_posix()
+                seen.add(rel)
+                st = path.stat()
+                entry = files.get(rel)
+                if entry and entry["mtime_ns"] == st.st_mtime_ns and entry["size"] == st.st_size:
+                    continue
+                data = path.read_bytes()
+                digest = hashlib.sha1(data).hexdigest()
+                if entry and entry["hash"] == digest:
+                    entry["mtime_ns"], entry["size"] = st.st_mtime_ns, st.st_size
+                    touched = True
+                    continue
+                changed.append((rel, data.decode("utf-8"), digest, st))
+            removed = [rel for rel in files if rel not in seen]
+            if not changed and not removed:
+                if touched:
+                    self._publish(manifest)
+                return {"changed": 0, "removed": 0, "seconds": round(time.perf_counter() - started, 4)}
+
+            for rel in removed + [rel for rel, *_ in changed if rel in files]:
+                entry = files.pop(rel)
+                if entry["end"] > entry["start"]:
+                    manifest["deleted"].setdefault(entry["segment"], []).append([entry["start"], entry["end"]])
+            if changed:
+                name = self._next_segment_name(manifest)
+                chunks: List[DocChunk] = []
+                for rel, text, digest, st in changed:
+                    start = len(chunks)
+                    chunks.extend(chunk_markdown(text, rel))
+                    files[rel] = {
+                        "hash": digest,
+                        "mtime_ns": st.st_mtime_ns,
+                        "size": st.st_size,
+                        "segment": name,
+                        "start": start,
+                        "end": len(chunks),
+                    }
+                write_index(chunks, self.root / SEGMENT_DIR / name)
+                manifest["segments"].append(name)
+            dropped = self._drop_empty_segments(manifest)
+            self._publish(manifest)
+            self._unlink_segments(dropped + replaced)
+        return {
+            "changed": len(changed),
+            "removed": len(removed),
+            "seconds": round(time.perf_counter() - started, 4),
+        }
+
+    def rebuild(self) -> Dict[str, float]:
+        """Index every page from scratch into a single fresh segment."""
+        return self.sync(full=True)
+
+    def needs_merge(self) -> bool:
+        manifest = _read_manifest(self.root)
+        if manifest is None or len(manifest["segments"]) <= 1:
+            return False
+        if len(manifest["segments"]) > self._max_segments:
+            return True
+        live = sum(entry["end"] - entry["start"] for entry in manifest["files"].values())
+        deleted = sum(end - start for ranges in manifest["deleted"].values() for start, end in ranges)
+        return deleted > self._max_deleted_ratio * max(1, live + deleted)
+
+    def merge(self) -> bool:
+        """Rewrite every live chunk into one segment and publish it; returns False if nothing to do."""
+        with self._exclusive():
+            manifest = _read_manifest(self.root)
+            if manifest is None or (len(manifest["segments"]) <= 1 and not manifest["deleted"]):
+                return False
+            old_segments = list(manifest["segments"])
+            name = self._next_segment_name(manifest)
+            readers = {seg: DocsIndex(self.root / SEGMENT_DIR / seg) for seg in old_segments}
+            try:
+                chunks: List[DocChunk] = []
+                for rel in sorted(manifest["files"]):
+                    entry = manifest["files"][rel]
+                    start = len(chunks)
+                    # Pages without chunks may name a segment `_drop_empty_segments` already removed.
+                    if entry["end"] > entry["start"]:
+                        reader = readers[entry["segment"]]
+                        chunks.extend(reader.chunk(doc_id) for doc_id in range(entry["start"], entry["end"]))
+                    entry.update(segment=name, start=start, end=len(chunks))
+            finally:
+                for reader in readers.values():
+                    reader.close()
+            write_index(chunks, self.root / SEGMENT_DIR / name)
+            manifest["segments"] = [name]
+            manifest["deleted"] = {}
+            self._publish(manifest)
+            self._unlink_segments(old_segments)
+        return True
+
+    def sync_in_background(self) -> threading.Thread:
+        """Sync, then merge if the segment policy asks for it, on a daemon thread."""
+
+        def run() -> None:
+            try:
+                self.sync()
+                if self.needs_merge():
+                    self.merge()
+            except Exception:
+                logger.exception("docs index sync failed for %s", self.root)
+
+        thread = threading.Thread(target=run, name="docs-index-sync", daemon=True)
+        thread.start()
+        return thread
+
+    # ---- helpers
+    @contextmanager
+    def _exclusive(self) -> Iterator[None]:
+        with self._lock:
+            self.root.mkdir(parents=True, exist_ok=True)
+            with open(self.root / LOCK_NAME, "a+b") as handle:
+                if fcntl is not None:
+                    fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+    def _next_segment_name(self, manifest: dict) -> str:
+        return f"seg-{int(manifest['generation']) + 1:06d}.idx"
+
+    @staticmethod
+    def _drop_empty_segments(manifest: dict) -> List[str]:
+        referenced = {entry["segment"] for entry in manifest["files"].values() if entry["end"] > entry["start"]}
+        dropped = [seg for seg in manifest["segments"] if seg not in referenced]
+        manifest["segments"] = [seg for seg in manifest["segments"] if seg in referenced]
+        manifest["deleted"] = {seg: ranges for seg, ranges in manifest["deleted"].items() if seg in referenced}
+        return dropped
+
+    def _unlink_segments(self, names: Sequence[str]) -> None:
+        for name in names:
+            try:
+                # Readers still holding an older generation keep their mappings alive.
+                (self.root / SEGMENT_DIR / name).unlink()
+            except OSError:
+                pass
+
+    def _publish(self, manifest: dict) -> None:
+        manifest["generation"] = int(manifest["generation"]) + 1
+        self.root.mkdir(parents=True, exist_ok=True)
+        target = self.root / MANIFEST_NAME
+        tmp = target.with_name(target.name + ".tmp")
+        tmp.write_text(json.dumps(manifest, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, target)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Build, update or query the react.dev BM25 index.")
+    parser.add_argument("--index", default="tmp/react_docs")
+    parser.add_argument("--source", default="../react.dev/src/content")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("build", help="reindex every page from scratch")
+    sub.add_parser("sync", help="reindex only new, changed or removed pages")
+    sub.add_parser("merge", help="merge all segments into one")
+    query = sub.add_parser("query")
+    query.add_argument("text")
+    query.add_argument("-k", type=int, default=4)
+    args = parser.parse_args(argv)
+
+    writer = DocsIndexWriter(Path(args.index), Path(args.source))
+    if args.command == "build":
+        print(writer.rebuild())
+        return
+    if args.command == "sync":
+        print(writer.sync())
+        if writer.needs_merge():
+            print({"merged": writer.merge()})
+        return
+    if args.command == "merge":
+        print({"merged": writer.merge()})
+        return
+    index = SegmentedIndex.open(Path(args.index))
+    if index is None:
+        raise SystemExit(f"no index at {args.index}; run the sync command first")
+    try:
+        for score, key in index.search(args.text, args.k):
+            chunk = index.chunk(key)
+            print(f"{score:7.3f}  {chunk.source} › {chunk.heading}")
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Literal, Optional
+
+from ..llm_resilience import LatencyTracker
+from .models import InteractionEvent
+
+JobStatus = Literal["queued", "running", "done", "failed"]
+
+
+@dataclass
+class RefinementJob:
+    """One goal refinement for a session; later requests may fold into it while it is queued."""
+
+    id: str
+    session_id: str
+    status: JobStatus = "queued"
+    # Focus events not yet applied because the session had no goal when they arrived.
+    events: List[InteractionEvent] = field(default_factory=list)
+    concept_ids: List[str] = field(default_factory=list)
+    # Also refine the goal's most uncertain concepts, as `apply_interactions` does.
+    select_focus: bool = False
+    coalesced: int = 0
+    created_ts: float = field(default_factory=lambda: time.time())
+    started_ts: Optional[float] = None
+    finished_ts: Optional[float] = None
+    error: Optional[str] = None
+    goal_revision: Optional[int] = None
+
+    def absorb(
+        self,
+        events: List[InteractionEvent],
+        concept_ids: List[str],
+        select_focus: bool,
+    ) -> None:
+        self.events.extend(events)
+        for concept_id in concept_ids:
+            if concept_id not in self.concept_ids:
+                self.concept_ids.append(concept_id)
+        self.select_focus = self.select_focus or select_focus
+
+
+class RefinementQueue:
+    """Per-session goal-refinement jobs drained by a small worker pool.
+
+    A session has at most one queued job: requests that arrive while it waits
+    fold their events and targets into it and get the same job id, so a burst
+    of clicks costs one LLM call. A job queued while the session's previous
+    job runs starts after it finishes, so one session's refinements apply in
+    order while different sessions run in parallel. Finished jobs are kept
+    for status queries, oldest dropped beyond `history`.
+    """
+
+    def __init__(
+        self,
+        run: Callable[[RefinementJob], Awaitable[Optional[int]]],
+        *,
+        workers: int = 4,
+        history: int = 1000,
+    ) -> None:
+        self._run = run
+        self._worker_count = max(1, workers)
+        self._history = max(1, history)
+        self._ready: Optional[asyncio.Queue] = None
+        self._workers: List["asyncio.Task"] = []
+        self._queued: Dict[str, RefinementJob] = {}
+        self._running: Dict[str, RefinementJob] = {}
+        # job id -> job, for queued and running jobs
+        self._active: Dict[str, RefinementJob] = {}
+        self._finished: "OrderedDict[str, RefinementJob]" = OrderedDict()
+        self._waits = LatencyTracker(window=1000)
+        self._runs = LatencyTracker(window=1000)
+        self.enqueued = 0
+        self.coalesced = 0
+        self.completed = 0
+        self.failed = 0
+
+    def enqueue(
+        self,
+        session_id: str,
+        *,
+        events: Optional[List[InteractionEvent]] = None,
+        concept_ids: Optional[List[str]] = None,
+        select_focus: bool = False,
+    ) -> RefinementJob:
+        self.enqueued += 1
+        job = self._queued.get(session_id)
+        if job is not None:
+            job.coalesced += 1
+            self.coalesced += 1
+        else:
+            job = self._queued[session_id] = RefinementJob(id=uuid.uuid4().hex, session_id=session_id)
+            self._active[job.id] = job
+            if session_id not in self._running:
+                self._start_workers()
+                self._ready.put_nowait(session_id)
+        job.absorb(list(events or []), [cid.strip() for cid in concept_ids or [] if cid.strip()], select_focus)
+        return job
+
+    def get(self, job_id: str) -> Optional[RefinementJob]:
+        return self._active.get(job_id) or self._finished.get(job_id)
+
+    def stats(self) -> Dict[str, float]:
+        wait_p50, wait_p95 = self._waits.percentile(50), self._waits.percentile(95)
+        run_p50, run_p95 = self._runs.percentile(50), self._runs.percentile(95)
+        return {
+            "workers": len(self._workers),
+            "queued": len(self._queued),
+            "running": len(self._running),
+            "enqueued": self.enqueued,
+            "coalesced": self.coalesced,
+            "completed": self.completed,
+            "failed": self.failed,
+            "wait_ms_p50": round((wait_p50 or 0.0) * 1000, 3),
+            "wait_ms_p95": round((wait_p95 or 0.0) * 1000, 3),
+            "run_ms_p50": round((run_p50 or 0.0) * 1000, 3),
+            "run_ms_p95": round((run_p95 or 0.0) * 1000, 3),
+        }
+
+    def close(self) -> None:
+        for task in self._workers:
+            task.cancel()
+        self._workers.clear()
+        self._ready = None
+
+    # ------------------------------------------------------------------ helpers
+    def _start_workers(self) -> None:
+        if self._ready is None:
+            self._ready = asyncio.Queue()
+        while len(self._workers) < self._worker_count:
+            self._workers.append(asyncio.ensure_future(self._work(self._ready)))
+
+    async def _work(self, ready: asyncio.Queue) -> None:
+        while True:
+            session_id = await ready.get()
+            job = self._queued.pop(session_id, None)
+            if job is None:
+                continue
+            self._running[session_id] = job
+            job.status = "running"
+            job.started_ts = time.time()
+            self._waits.record(job.started_ts - job.created_ts)
+            try:
+                job.goal_revision = await self._run(job)
+                job.status = "done"
+                self.completed += 1
+            except asyncio.CancelledError:
+                job.status, job.error = "failed", "cancelled"
+                raise
+            except KeyError:
+                job.status, job.error = "failed", "session not found"
+                self.failed += 1
+            except Exception as exc:
+                job.status, job.error = "failed", str(exc) or type(exc).__name__
+                self.failed += 1
+            finally:
+                job.finished_ts = time.time()
+                self._runs.record(job.finished_ts - job.started_ts)
+                del self._running[session_id]
+                self._retire(job)
+                if session_id in self._queued:
+                    ready.put_nowait(session_id)
+
+    def _retire(self, job: RefinementJob) -> None:
+        # Folded-in events were applied (or failed with the job); drop them.
+        job.events = []
+        self._active.pop(job.id, None)
+        self._finished[job.id] = job
+        while len(self._finished) > self._history:
+            self._finished.popitem(last=False)
@@ -1,8 +1,12 @@
+import itertools
 import time
 import uuid
 from dataclasses import dataclass, field
 from typing import Dict, List, Literal, Optional
 
+# Process-wide, so a re-created goal never reuses an earlier goal's revision.
+_REVISIONS = itertools.count(1)
+
 InteractionEventType = Literal["expand", "revisit", "confused", "mastered", "collapse"]
 
 
@@ -58,6 +62,7 @@ class GoalNodeMeta:
     global_answer_depth: int = 1
     last_updated_ts: float = field(default_factory=lambda: time.time())
     last_refined_concepts: List[str] = field(default_factory=list)
+    revision: int = 0
 
 
 @dataclass
@@ -77,6 +82,7 @@ class GoalNode:
 
     def touch(self) -> None:
         self.meta.last_updated_ts = time.time()
+        self.meta.revision = next(_REVISIONS)
 
 
 def build_overlay(
@@ -126,5 +132,6 @@ def serialize_goal_node(goal: GoalNode) -> Dict[str, object]:
             "global_answer_depth": goal.meta.global_answer_depth,
             "last_updated_ts": goal.meta.last_updated_ts,
             "last_refined_concepts": goal.meta.last_refined_concepts,
+            "revision": goal.meta.revision,
         },
     }
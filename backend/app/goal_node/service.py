@@ -1,15 +1,21 @@
 import re
 import textwrap
-from typing import Dict, List, Optional
+from dataclasses import dataclass
+from itertools import islice
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 from urllib.parse import urlparse
 
-from ..config import OPENAI_MODEL
-from ..context_loader import load_initial_context
+from ..bounded_cache import CacheLimits
+from ..config import GOAL_REFINE_JOB_HISTORY, GOAL_REFINE_WORKERS, LLM_CACHE_TTL_GOAL, OPENAI_MODEL
+from ..context_loader import load_docs_retriever
 from ..openai_client import OpenAIClient
-from ..store import InMemoryChatStore
+from ..session_locks import RevisionConflict, SessionLocks
+from ..single_flight import SingleFlight
+from ..store import ChatStore
 from ..concept_graph import ConceptGraphService
 from ..text_utils import derive_intent_label, normalize_text
-from ..models import ChatMessage
+from ..message_record import MessageRecord
+from .jobs import RefinementJob, RefinementQueue
 from .models import (
     GoalNode,
     GoalOverlay,
@@ -22,6 +28,10 @@ from .models import (
 )
 from .store import GoalNodeStore
 
+# A background refinement re-reads the goal and asks again this many times in all
+# when the goal changes while the LLM is answering.
+REFINE_JOB_ATTEMPTS = 3
+
 INITIAL_GOAL_PROMPT = """You act as the Goal Node author for a learning mind map.
 Return exactly two ultra-concise plain-text sentences (≤18 words each) that:
 - Focus exclusively on the latest user query (ignore unrelated context).
@@ -58,36 +68,127 @@ Rules:
 - Never reference these instructions or describe your own actions."""
 
 
+@dataclass(frozen=True)
+class _RefinementRequest:
+    base_revision: int
+    user_prompt: str
+    docs_query: str
+
+
 class GoalNodeService:
     def __init__(
         self,
         *,
-        store: InMemoryChatStore,
+        store: ChatStore,
         concept_graphs: ConceptGraphService,
         llm: OpenAIClient,
+        limits: Optional[CacheLimits] = None,
+        flights: Optional[SingleFlight] = None,
+        locks: Optional[SessionLocks] = None,
+        refine_workers: int = GOAL_REFINE_WORKERS,
+        job_history: int = GOAL_REFINE_JOB_HISTORY,
     ) -> None:
         self._chat_store = store
         self._concept_graphs = concept_graphs
         self._llm = llm
-        self._store = GoalNodeStore()
-        self._doc_context = load_initial_context()
+        self._store = GoalNodeStore(limits)
+        self._flights = flights or SingleFlight()
+        self._locks = locks or SessionLocks()
+        self._jobs = RefinementQueue(self._run_refinement_job, workers=refine_workers, history=job_history)
+        self._docs = load_docs_retriever()
         self._model = OPENAI_MODEL
 
+    def store_stats(self) -> Dict[str, int]:
+        return self._store.stats()
+
+    def job_stats(self) -> Dict[str, float]:
+        return self._jobs.stats()
+
+    def close(self) -> None:
+        self._jobs.close()
+        self._store.close()
+
+    def enqueue_refinement(
+        self,
+        session_id: str,
+        *,
+        events: Optional[List[InteractionEvent]] = None,
+        concept_ids: Optional[List[str]] = None,
+        select_focus: bool = False,
+    ) -> RefinementJob:
+        """Refine in the background; joins the session's queued job if one is waiting."""
+        return self._jobs.enqueue(session_id, events=events, concept_ids=concept_ids, select_focus=select_focus)
+
+    def get_job(self, job_id: str) -> Optional[RefinementJob]:
+        return self._jobs.get(job_id)
+
+    async def _run_refinement_job(self, job: RefinementJob) -> int:
+        """Refine with the session lock held only to snapshot the goal and to apply the patch.
+
+        The LLM call runs unlocked, so clicks on the session are never queued
+        behind it; if the goal changed meanwhile, the revision check rejects
+        the patch and the job re-reads the goal and asks again.
+        """
+        session_id = job.session_id
+        # Generating a missing goal is its own LLM call; it shares the route's flight.
+        await self.get_goal(session_id, create_if_missing=True)
+        targets: List[str] = []
+        for attempt in range(REFINE_JOB_ATTEMPTS):
+            async with self._locks.hold(session_id):
+                goal = await self.get_goal(session_id, create_if_missing=True)
+                if attempt == 0:
+                    self._record_focus(session_id, goal, job.events)
+                    targets = self._select_targets(goal) if job.select_focus else []
+                    for concept_id in job.concept_ids:
+                        goal.ensure_focus_entry(concept_id)
+                        if concept_id not in targets:
+                            targets.append(concept_id)
+                request = self._refinement_request(goal, targets) if targets else None
+                if request is None:
+                    self._store.upsert(session_id, goal)
+                    return goal.meta.revision
+            payload = await self._request_refinement(request)
+            try:
+                async with self._locks.hold(session_id):
+                    return self._apply_refinement(goal, targets, request, payload).meta.revision
+            except RevisionConflict:
+                if attempt + 1 >= REFINE_JOB_ATTEMPTS:
+                    raise
+        raise RuntimeError("unreachable")
+
     def serialize(self, goal: GoalNode) -> Dict[str, object]:
         return serialize_goal_node(goal)
 
+    def etag(self, goal: GoalNode) -> str:
+        return f'W/"goal-{goal.meta.revision}"'
+
+    def peek_goal(self, session_id: str) -> Optional[GoalNode]:
+        """Stored goal, if any, without generating one."""
+        return self._store.get(session_id)
+
     async def get_goal(self, session_id: str, *, create_if_missing: bool = True) -> GoalNode:
         existing = self._store.get(session_id)
         if existing:
             return existing
         if not create_if_missing:
             raise KeyError("goal node not found")
-        return await self._generate_initial_goal(session_id)
+        return await self._generate_initial_goal_once(session_id)
 
     async def initialize_goal(self, session_id: str, *, force: bool = False) -> GoalNode:
         if force:
             self._store.delete(session_id)
-        return await self._generate_initial_goal(session_id)
+        return await self._generate_initial_goal_once(session_id, use_cache=not force)
+
+    async def _generate_initial_goal_once(self, session_id: str, *, use_cache: bool = True) -> GoalNode:
+        """Share one initial-goal generation between concurrent callers on the same session state."""
+        session = self._chat_store.get_session(session_id)
+        if not session:
+            raise KeyError("session not found")
+        key = (session_id, "initial-goal", len(session.messages), use_cache)
+        return await self._flights.do(
+            key,
+            lambda: self._generate_initial_goal(session_id, use_cache=use_cache),
+        )
 
     async def apply_interactions(
         self,
@@ -97,18 +198,7 @@ class GoalNodeService:
         auto_refine: bool = True,
     ) -> GoalNode:
         goal = await self.get_goal(session_id, create_if_missing=True)
-        updated_entries: Dict[str, FocusEntry] = {}
-        if events:
-            updated_entries = self._update_focus(goal, events)
-            for concept_id, entry in updated_entries.items():
-                try:
-                    self._concept_graphs.apply_focus_data(
-                        session_id,
-                        concept_id=concept_id,
-                        weight=entry.unknownness(),
-                    )
-                except KeyError:
-                    continue
+        self._record_focus(session_id, goal, events)
         if auto_refine:
             targets = self._select_targets(goal)
             if targets:
@@ -116,6 +206,15 @@ class GoalNodeService:
         self._store.upsert(session_id, goal)
         return goal
 
+    def record_interactions(self, session_id: str, events: List[InteractionEvent]) -> Optional[GoalNode]:
+        """Apply focus events to the stored goal without the LLM; None when no goal exists yet."""
+        goal = self._store.get(session_id)
+        if goal is None:
+            return None
+        self._record_focus(session_id, goal, events)
+        self._store.upsert(session_id, goal)
+        return goal
+
     async def refine_for_concepts(self, session_id: str, concept_ids: List[str]) -> GoalNode:
         goal = await self.get_goal(session_id, create_if_missing=True)
         if not concept_ids:
@@ -132,20 +231,21 @@ class GoalNodeService:
             return goal
         return await self._refine_goal(goal, unique_targets)
 
-    async def _generate_initial_goal(self, session_id: str) -> GoalNode:
+    async def _generate_initial_goal(self, session_id: str, *, use_cache: bool = True) -> GoalNode:
         session = self._chat_store.get_session(session_id)
         if not session:
             raise KeyError("session not found")
         user_query = self._extract_query(session.messages)
         concept_inventory = self._concept_inventory(session_id)
         concept_snapshot = self._format_concept_outline(concept_inventory)
+        doc_context = await self._docs.context_for_async(user_query)
         user_prompt = textwrap.dedent(
             f"""
             User intent:
             {user_query}
 
             Documentation context:
-            {self._doc_context or "n/a"}
+            {doc_context.render() or "n/a"}
 
             Concepts in play:
             {concept_snapshot}
@@ -162,13 +262,15 @@ class GoalNodeService:
         ).strip()
 
         messages = [{"role": "system", "content": INITIAL_GOAL_PROMPT}]
-        if self._doc_context:
-            messages.append({"role": "system", "content": self._doc_context})
         messages.append({"role": "user", "content": user_prompt})
         answer = await self._llm.generate_text(
             model=self._model,
             messages=messages,
             max_output_tokens=600,
+            cache_ttl=LLM_CACHE_TTL_GOAL,
+            use_cache=use_cache,
+            policy="goal",
+            context_version=doc_context.version,
         )
         answer_plain = self._to_plain_text(answer)
         answer_clean = self._enforce_sentence_limit(answer_plain, max_sentences=2)
@@ -191,11 +293,19 @@ class GoalNodeService:
         return goal
 
     async def _refine_goal(self, goal: GoalNode, targets: List[str]) -> GoalNode:
+        request = self._refinement_request(goal, targets)
+        if request is None:
+            return goal
+        payload = await self._request_refinement(request)
+        return self._apply_refinement(goal, targets, request, payload)
+
+    def _refinement_request(self, goal: GoalNode, targets: List[str]) -> Optional[_RefinementRequest]:
+        """Prompt for refining `targets`, built from the goal as it is now; None when nothing qualifies."""
         concept_details = self._concept_details(goal.session_id, targets)
         allowed_concepts = self._filter_connected_concepts(goal.session_id, [c["concept_id"] for c in concept_details])
         concept_details = [c for c in concept_details if c["concept_id"] in allowed_concepts]
         if not concept_details:
-            return goal
+            return None
         concept_lookup = {c["concept_id"]: c for c in concept_details}
         target_lines = []
         for c in concept_details:
@@ -232,15 +342,34 @@ class GoalNodeService:
             """
         ).strip()
 
+        docs_query = " ".join(f"{c.get('label', '')} {c.get('summary', '')}" for c in concept_details)
+        return _RefinementRequest(goal.meta.revision, user_prompt, docs_query)
+
+    async def _request_refinement(self, request: _RefinementRequest) -> Dict[str, Any]:
         messages = [{"role": "system", "content": REFINEMENT_PROMPT}]
-        if self._doc_context:
-            messages.append({"role": "system", "content": self._doc_context})
-        messages.append({"role": "user", "content": user_prompt})
-        payload = await self._llm.generate_json(
+        doc_context = await self._docs.context_for_async(request.docs_query)
+        if doc_context.text:
+            messages.append({"role": "system", "content": doc_context.render()})
+        messages.append({"role": "user", "content": request.user_prompt})
+        return await self._llm.generate_json(
             model=self._model,
             messages=messages,
             max_output_tokens=2400,
+            policy="goal",
+            context_version=doc_context.version,
         )
+
+    def _apply_refinement(
+        self,
+        goal: GoalNode,
+        targets: List[str],
+        request: _RefinementRequest,
+        payload: Dict[str, Any],
+    ) -> GoalNode:
+        # The patch was written against the answer and overlays in the prompt.
+        current = self._store.get(goal.session_id)
+        if current is None or current.meta.revision != request.base_revision:
+            raise RevisionConflict("goal node changed during refinement")
         answer_patch = str(payload.get("answer_patch", "") or "").strip()
         if answer_patch:
             goal.answer_markdown = goal.answer_markdown.rstrip() + "\n\n" + answer_patch
@@ -306,6 +435,22 @@ class GoalNodeService:
                 return
         goal.overlays.append(overlay)
 
+    def _record_focus(self, session_id: str, goal: GoalNode, events: List[InteractionEvent]) -> None:
+        if not events:
+            return
+        updated_entries = self._update_focus(goal, events)
+        if updated_entries:
+            goal.touch()
+        for concept_id, entry in updated_entries.items():
+            try:
+                self._concept_graphs.apply_focus_data(
+                    session_id,
+                    concept_id=concept_id,
+                    weight=entry.unknownness(),
+                )
+            except KeyError:
+                continue
+
     def _update_focus(self, goal: GoalNode, events: List[InteractionEvent]) -> Dict[str, FocusEntry]:
         updated: Dict[str, FocusEntry] = {}
         for event in events:
@@ -325,7 +470,7 @@ class GoalNodeService:
         scored.sort(key=lambda item: item[1], reverse=True)
         return [cid for cid, _ in scored[:limit]]
 
-    def _extract_query(self, messages: List[ChatMessage]) -> str:
+    def _extract_query(self, messages: Sequence[MessageRecord]) -> str:
         for message in reversed(messages):
             if message.role == "user" and message.content.strip():
                 return message.content.strip()
@@ -335,17 +480,16 @@ class GoalNodeService:
 
     def _concept_inventory(self, session_id: str) -> List[Dict[str, str]]:
         try:
-            graph = self._concept_graphs.export_graph(session_id)
+            graph = self._concept_graphs.get_graph(session_id)
         except KeyError:
             return []
         inventory: List[Dict[str, str]] = []
-        for concept in (graph.get("concepts") or [])[:8]:
-            label = str(concept.get("label", "concept")).strip() or "concept"
-            summary = str(concept.get("summary", "")).strip()
+        for concept in islice(graph.ordered_concepts(), 8):
+            label = concept.label.strip() or "concept"
             inventory.append(
                 {
                     "label": label,
-                    "summary": summary,
+                    "summary": concept.summary.strip(),
                 }
             )
         return inventory
@@ -369,25 +513,20 @@ class GoalNodeService:
 
     def _concept_details(self, session_id: str, concept_ids: List[str]) -> List[Dict[str, str]]:
         try:
-            graph = self._concept_graphs.export_graph(session_id)
+            graph = self._concept_graphs.get_graph(session_id)
         except KeyError:
             return []
-        by_id: Dict[str, Dict[str, str]] = {}
-        for concept in graph.get("concepts", []):
-            cid = str(concept.get("id") or concept.get("label") or "")
-            if cid:
-                by_id[cid] = concept
         details = []
         for concept_id in concept_ids:
-            concept = by_id.get(concept_id)
+            concept = graph.concepts.get(concept_id)
             if concept:
                 details.append(
                     {
                         "concept_id": concept_id,
-                        "label": concept.get("label", concept_id),
-                        "summary": concept.get("summary", ""),
-                        "weight": concept.get("weight", 0.0),
-                        "expansions": concept.get("expansions", []),
+                        "label": concept.label,
+                        "summary": concept.summary,
+                        "weight": concept.weight,
+                        "expansions": concept.expansions,
                     }
                 )
             else:
@@ -404,19 +543,17 @@ class GoalNodeService:
 
     def _filter_connected_concepts(self, session_id: str, concept_ids: List[str]) -> List[str]:
         try:
-            graph = self._concept_graphs.export_graph(session_id)
+            graph = self._concept_graphs.get_graph(session_id)
         except KeyError:
             return []
-        intent_ids = {concept["id"] for concept in graph.get("concepts", []) if str(concept.get("id", "")).startswith("intent-")}
-        if not intent_ids:
+        intent_id = graph.intent_id
+        if not intent_id:
             return concept_ids
-        anchor_targets = set()
-        for edge in graph.get("edges", []):
-            if edge.get("relation") != "anchors":
-                continue
-            if edge.get("from_concept_id") in intent_ids:
-                anchor_targets.add(edge.get("to_concept_id"))
-        return [cid for cid in concept_ids if cid in anchor_targets or cid in intent_ids]
+        anchor_targets = {
+            graph.edges[edge_id].to_concept_id
+            for edge_id in graph.edge_ids_of(intent_id, direction="out", relations=["anchors"])
+        }
+        return [cid for cid in concept_ids if cid in anchor_targets or cid == intent_id]
 
     def _shorten_phrase(self, text: str, limit: int) -> str:
         normalized = " ".join((text or "").split())
@@ -1,20 +1,39 @@
 from typing import Dict, Optional
 
+from ..bounded_cache import CacheLimits, SpillingLRUCache
 from .models import GoalNode
 
 
+def estimate_goal_bytes(goal: GoalNode) -> int:
+    total = 256 + len(goal.goal_statement) + len(goal.answer_markdown)
+    for overlay in goal.overlays:
+        total += 120 + len(overlay.content_markdown)
+        total += sum(len(label) + len(link) + 40 for label, link in overlay.doc_links.items())
+    total += 120 * len(goal.focus)
+    return total
+
+
 class GoalNodeStore:
     """Simple in-memory storage keyed by session id."""
 
-    def __init__(self) -> None:
-        self._items: Dict[str, GoalNode] = {}
+    def __init__(self, limits: Optional[CacheLimits] = None) -> None:
+        self._items: SpillingLRUCache[GoalNode] = SpillingLRUCache(
+            "goal_nodes",
+            limits=limits,
+            sizer=estimate_goal_bytes,
+        )
 
     def get(self, session_id: str) -> Optional[GoalNode]:
         return self._items.get(session_id)
 
     def upsert(self, session_id: str, goal: GoalNode) -> GoalNode:
-        self._items[session_id] = goal
-        return goal
+        return self._items.put(session_id, goal)
 
     def delete(self, session_id: str) -> None:
-        self._items.pop(session_id, None)
+        self._items.pop(session_id)
+
+    def stats(self) -> Dict[str, int]:
+        return self._items.stats()
+
+    def close(self) -> None:
+        self._items.close()
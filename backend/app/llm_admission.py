@@ -0,0 +1,173 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional
+
+
+class AdmissionRejected(RuntimeError):
+    """Raised when a request waited longer than the admission queue allows."""
+
+    def __init__(self, waited: float) -> None:
+        super().__init__(f"LLM request queue wait exceeded ({waited:.1f}s)")
+        self.waited = waited
+
+
+def estimate_request_tokens(messages: List[Dict[str, Any]], max_output_tokens: Optional[int]) -> int:
+    """Cheap token estimate (~4 chars per token) plus the reserved output budget."""
+    chars = sum(len(str(message.get("content", ""))) for message in messages)
+    return chars // 4 + (max_output_tokens or 512)
+
+
+class _TokenBucket:
+    def __init__(self, per_minute: int) -> None:
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self._rate = per_minute / 60.0
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self._updated) * self._rate)
+        self._updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self._rate
+
+    def consume(self, amount: float) -> None:
+        self.level -= min(amount, self.capacity)
+
+
+@dataclass
+class _Ticket:
+    model: str
+    tokens: int
+    wakeup: asyncio.Event = field(default_factory=asyncio.Event)
+
+
+class AdmissionController:
+    """FIFO admission queue enforcing a concurrency cap and per-model RPM/TPM budgets.
+
+    A limit of 0 disables that bound. Requests are admitted strictly in arrival
+    order; a request that cannot be admitted within `max_queue_seconds` raises
+    `AdmissionRejected`.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_concurrency: int = 0,
+        requests_per_minute: int = 0,
+        tokens_per_minute: int = 0,
+        max_queue_seconds: float = 30.0,
+    ) -> None:
+        self._max_concurrency = max_concurrency
+        self._rpm = requests_per_minute
+        self._tpm = tokens_per_minute
+        self._max_queue_seconds = max_queue_seconds
+        self._queue: Deque[_Ticket] = deque()
+        self._in_flight = 0
+        self._request_buckets: Dict[str, _TokenBucket] = {}
+        self._token_buckets: Dict[str, _TokenBucket] = {}
+        self._recent_waits: Deque[float] = deque(maxlen=512)
+        self.admitted = 0
+        self.rejected = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    @asynccontextmanager
+    async def admit(self, model: str, estimated_tokens: int) -> AsyncIterator[None]:
+        await self._acquire(model, estimated_tokens)
+        try:
+            yield
+        finally:
+            self._in_flight -= 1
+            self._wake_head()
+
+    def stats(self) -> Dict[str, float]:
+        waits = sorted(self._recent_waits)
+        p95 = waits[min(len(waits) - 1, int(len(waits) * 0.95))] if waits else 0.0
+        return {
+            "queue_depth": len(self._queue),
+            "in_flight": self._in_flight,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "wait_seconds_total": round(self.wait_seconds_total, 4),
+            "wait_seconds_max": round(self.wait_seconds_max, 4),
+            "wait_seconds_p95": round(p95, 4),
+        }
+
+    # ------------------------------------------------------------------ helpers
+    async def _acquire(self, model: str, tokens: int) -> None:
+        ticket = _Ticket(model=model, tokens=tokens)
+        self._queue.append(ticket)
+        enqueued = time.monotonic()
+        deadline = enqueued + self._max_queue_seconds
+        try:
+            while True:
+                now = time.monotonic()
+                budget_wait: Optional[float] = None
+                if self._queue[0] is ticket and self._has_slot():
+                    budget_wait = self._budget_wait(ticket, now)
+                    if budget_wait <= 0:
+                        self._consume(ticket)
+                        self._queue.popleft()
+                        self._in_flight += 1
+                        self._record_wait(now - enqueued)
+                        self._wake_head()
+                        return
+                remaining = deadline - now
+                if remaining <= 0:
+                    self.rejected += 1
+                    raise AdmissionRejected(now - enqueued)
+                timeout = remaining if budget_wait is None else min(budget_wait, remaining)
+                ticket.wakeup.clear()
+                try:
+                    await asyncio.wait_for(ticket.wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            if ticket in self._queue:
+                self._queue.remove(ticket)
+                self._wake_head()
+            raise
+
+    def _has_slot(self) -> bool:
+        return self._max_concurrency <= 0 or self._in_flight < self._max_concurrency
+
+    def _budget_wait(self, ticket: _Ticket, now: float) -> float:
+        wait = 0.0
+        if self._rpm > 0:
+            wait = max(wait, self._bucket(self._request_buckets, ticket.model, self._rpm).wait_time(1, now))
+        if self._tpm > 0:
+            bucket = self._bucket(self._token_buckets, ticket.model, self._tpm)
+            wait = max(wait, bucket.wait_time(ticket.tokens, now))
+        return wait
+
+    def _consume(self, ticket: _Ticket) -> None:
+        if self._rpm > 0:
+            self._request_buckets[ticket.model].consume(1)
+        if self._tpm > 0:
+            self._token_buckets[ticket.model].consume(ticket.tokens)
+
+    @staticmethod
+    def _bucket(buckets: Dict[str, _TokenBucket], model: str, per_minute: int) -> _TokenBucket:
+        bucket = buckets.get(model)
+        if bucket is None:
+            bucket = _TokenBucket(per_minute)
+            buckets[model] = bucket
+        return bucket
+
+    def _wake_head(self) -> None:
+        if self._queue:
+            self._queue[0].wakeup.set()
+
+    def _record_wait(self, waited: float) -> None:
+        self.admitted += 1
+        self.wait_seconds_total += waited
+        self.wait_seconds_max = max(self.wait_seconds_max, waited)
+        self._recent_waits.append(waited)
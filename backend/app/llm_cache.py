@@ -0,0 +1,139 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    expires_at REAL NOT NULL
+)
+"""
+_SELECT = "SELECT value, expires_at FROM llm_cache WHERE key = ?"
+_UPSERT = "INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)"
+_DELETE = "DELETE FROM llm_cache WHERE key = ?"
+_PURGE = "DELETE FROM llm_cache WHERE expires_at < ?"
+
+
+def _normalize_content(content: Any) -> Any:
+    if isinstance(content, str):
+        return " ".join(content.split())
+    return content
+
+
+class ResponseCache:
+    """Two-tier cache for LLM responses keyed by a hash of the normalized request.
+
+    The in-process tier is an LRU bounded by `max_entries`; when `disk_path` is
+    set, entries are also written to a small SQLite file so they survive
+    restarts. Every entry carries its own TTL chosen by the call site. Both
+    tiers hold the serialized JSON, so every hit is a fresh object that
+    callers may rewrite in place without touching the cached entry.
+    """
+
+    def __init__(self, *, max_entries: int = 1024, disk_path: Optional[str] = None) -> None:
+        self._max_entries = max(1, max_entries)
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk: Optional[sqlite3.Connection] = None
+        if disk_path:
+            self._disk = sqlite3.connect(disk_path, check_same_thread=False, isolation_level=None)
+            self._disk.execute("PRAGMA journal_mode=WAL")
+            self._disk.execute(_SCHEMA)
+            self._disk.execute(_PURGE, (time.time(),))
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.bypasses = 0
+
+    @staticmethod
+    def make_key(
+        *,
+        kind: str,
+        model: str,
+        messages: List[Dict[str, Any]],
+        temperature: Optional[float],
+        max_output_tokens: Optional[int],
+        context_version: str = "",
+    ) -> str:
+        normalized = [
+            {"role": message.get("role"), "content": _normalize_content(message.get("content"))}
+            for message in messages
+        ]
+        canonical = json.dumps(
+            {
+                "kind": kind,
+                "model": model,
+                "messages": normalized,
+                "temperature": temperature,
+                "max_output_tokens": max_output_tokens,
+                "context_version": context_version,
+            },
+            sort_keys=True,
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is not None:
+                expires_at, raw = cached
+                if expires_at >= now:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return json.loads(raw)
+                del self._memory[key]
+            if self._disk is not None:
+                row = self._disk.execute(_SELECT, (key,)).fetchone()
+                if row is not None:
+                    raw, expires_at = row
+                    if expires_at >= now:
+                        self._remember(key, raw, expires_at)
+                        self.disk_hits += 1
+                        return json.loads(raw)
+                    self._disk.execute(_DELETE, (key,))
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: Any, *, ttl: float) -> None:
+        expires_at = time.time() + ttl
+        raw = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._remember(key, raw, expires_at)
+            if self._disk is not None:
+                self._disk.execute(_UPSERT, (key, raw, expires_at))
+            self.stores += 1
+
+    def record_bypass(self) -> None:
+        with self._lock:
+            self.bypasses += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._memory),
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "stores": self.stores,
+                "bypasses": self.bypasses,
+            }
+
+    def close(self) -> None:
+        if self._disk is not None:
+            self._disk.close()
+            self._disk = None
+
+    def _remember(self, key: str, raw: str, expires_at: float) -> None:
+        self._memory[key] = (expires_at, raw)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self._max_entries:
+            self._memory.popitem(last=False)
@@ -0,0 +1,144 @@
+import asyncio
+import random
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, Optional
+
+import openai
+
+
+@dataclass(frozen=True)
+class CallPolicy:
+    """Timeout, retry and hedging settings for one LLM call site."""
+
+    timeout: float = 60.0
+    max_attempts: int = 1
+    base_delay: float = 0.5
+    max_delay: float = 8.0
+    retry_nondeterministic: bool = False
+    hedge: bool = False
+    hedge_min_samples: int = 20
+
+
+def default_policies(*, hedging: bool = False) -> Dict[str, CallPolicy]:
+    """Per-call-site policies; only temperature-0 calls retry unless a site opts in."""
+    return {
+        "default": CallPolicy(),
+        # A failed reply was never shown or stored, so asking again is safe.
+        "chat": CallPolicy(timeout=60.0, max_attempts=2, retry_nondeterministic=True),
+        "summary": CallPolicy(timeout=60.0, max_attempts=2),
+        "concepts": CallPolicy(timeout=45.0, max_attempts=3, hedge=hedging),
+        # Refinement output is merged idempotently, so re-sending it is safe.
+        "goal": CallPolicy(timeout=45.0, max_attempts=3, retry_nondeterministic=True, hedge=hedging),
+    }
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised while the circuit breaker is failing fast."""
+
+    def __init__(self, retry_after: float) -> None:
+        super().__init__("LLM upstream is degraded; failing fast")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Open after `failure_threshold` consecutive upstream failures.
+
+    While open every call fails fast; after `reset_timeout` one probe call is let
+    through (half-open) and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, *, failure_threshold: int = 5, reset_timeout: float = 30.0) -> None:
+        self._failure_threshold = max(1, failure_threshold)
+        self._reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self.opens = 0
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if self._probing or time.monotonic() - self._opened_at >= self._reset_timeout:
+            return "half_open"
+        return "open"
+
+    def before_call(self) -> None:
+        if self._opened_at is None:
+            return
+        elapsed = time.monotonic() - self._opened_at
+        if elapsed < self._reset_timeout or self._probing:
+            raise CircuitOpenError(max(0.0, self._reset_timeout - elapsed))
+        self._probing = True
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._probing or self._failures >= self._failure_threshold:
+            if self._opened_at is None or self._probing:
+                self.opens += 1
+            self._opened_at = time.monotonic()
+            self._probing = False
+
+    def release_probe(self) -> None:
+        """Let another probe through when the current one ended without a verdict."""
+        self._probing = False
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies."""
+
+    def __init__(self, window: int = 200) -> None:
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, pct: float, *, min_samples: int = 1) -> Optional[float]:
+        if len(self._samples) < max(1, min_samples):
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100.0))]
+
+
+def is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, (openai.APITimeoutError, openai.APIConnectionError, asyncio.TimeoutError)):
+        return True
+    if isinstance(exc, openai.APIStatusError):
+        return exc.status_code == 429 or exc.status_code >= 500
+    return False
+
+
+def retry_after_seconds(exc: BaseException) -> Optional[float]:
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    raw_ms = headers.get("retry-after-ms")
+    if raw_ms:
+        try:
+            return float(raw_ms) / 1000.0
+        except ValueError:
+            pass
+    raw = headers.get("retry-after")
+    if raw:
+        try:
+            return float(raw)
+        except ValueError:
+            return None
+    return None
+
+
+def backoff_delay(attempt: int, policy: CallPolicy, retry_after: Optional[float]) -> float:
+    """Full-jitter exponential backoff that never undercuts an upstream Retry-After."""
+    ceiling = min(policy.max_delay, policy.base_delay * (2 ** attempt))
+    delay = random.uniform(0, ceiling)
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, policy.max_delay * 4))
+    return delay
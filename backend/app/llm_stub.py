@@ -0,0 +1,369 @@
+"""Deterministic stand-in for the OpenAI Responses API.
+
+Use it in-process by handing `StubTransport` to the `httpx.AsyncClient` behind
+`AsyncOpenAI` (set `LLM_STUB=true`), or run it as a standalone server and point
+`OPENAI_BASE_URL` at it:
+
+    python -m app.llm_stub --port 8100
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+
+_REACT_TERMS = [
+    "Components",
+    "Props",
+    "State",
+    "useState",
+    "useEffect",
+    "useReducer",
+    "useContext",
+    "useMemo",
+    "useRef",
+    "Context",
+    "Reducers",
+    "Effects",
+    "Custom Hooks",
+    "Forms",
+    "Lists and Keys",
+    "Conditional Rendering",
+    "Lifting State Up",
+    "Suspense",
+    "Server Components",
+    "Data Fetching",
+]
+
+_FILLER = (
+    "Split the screen into small components that own clear responsibilities. "
+    "Keep state in the closest common parent and pass data down through props. "
+    "Derive values during render instead of syncing them with effects. "
+    "Reach for context only when many distant components need the same data. "
+    "Use a reducer once several event handlers update the same state. "
+)
+
+
+@dataclass
+class StubSettings:
+    """Timing, failure and payload knobs for the stub."""
+
+    latency_ms: float = 400.0
+    latency_p95_ms: float = 1200.0
+    tokens_per_second: float = 80.0
+    # Input tokens processed per second before the first token (0 = prompt size is free).
+    prefill_tokens_per_second: float = 0.0
+    text_tokens: int = 120
+    error_rate: float = 0.0
+    error_status: int = 429
+    seed: Optional[int] = None
+    scripts: Dict[str, Any] = field(default_factory=dict)
+
+    @staticmethod
+    def load_scripts(path: str) -> Dict[str, Any]:
+        """Read scripted payloads: {"extraction": {...}, "refinement": {...}, "text": "..."}."""
+        if not path:
+            return {}
+        return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+class StubResponder:
+    """Builds Responses API payloads and timing for a request body."""
+
+    def __init__(self, settings: StubSettings) -> None:
+        self.settings = settings
+        self._rng = random.Random(settings.seed)
+        self.requests = 0
+
+    # ------------------------------------------------------------------ timing
+    def first_token_delay(self) -> float:
+        median = max(self.settings.latency_ms, 0.0) / 1000.0
+        if median <= 0:
+            return 0.0
+        p95 = max(self.settings.latency_p95_ms / 1000.0, median)
+        sigma = math.log(p95 / median) / 1.645 if p95 > median else 0.0
+        return self._rng.lognormvariate(math.log(median), sigma)
+
+    def prefill_delay(self, body: Dict[str, Any]) -> float:
+        rate = self.settings.prefill_tokens_per_second
+        if rate <= 0:
+            return 0.0
+        messages = body.get("input") or []
+        if isinstance(messages, str):
+            return _approx_tokens(messages) / rate
+        return sum(_approx_tokens(str(m.get("content", ""))) for m in messages) / rate
+
+    def token_delay(self, tokens: int) -> float:
+        rate = self.settings.tokens_per_second
+        return tokens / rate if rate > 0 else 0.0
+
+    def should_fail(self) -> bool:
+        return self.settings.error_rate > 0 and self._rng.random() < self.settings.error_rate
+
+    # ------------------------------------------------------------------ payloads
+    def reply_text(self, body: Dict[str, Any]) -> str:
+        self.requests += 1
+        messages = body.get("input") or []
+        if isinstance(messages, str):
+            messages = [{"role": "user", "content": messages}]
+        system = " ".join(str(m.get("content", "")) for m in messages if m.get("role") == "system")
+        user = "\n".join(str(m.get("content", "")) for m in messages if m.get("role") == "user")
+        scripts = self.settings.scripts
+        if "concept graph builder" in system:
+            payload = scripts.get("extraction") or self._extraction_payload(user)
+            return json.dumps(payload)
+        if "refine an existing Goal Node" in system:
+            payload = scripts.get("refinement") or self._refinement_payload(user)
+            return json.dumps(payload)
+        if scripts.get("text"):
+            return str(scripts["text"])
+        return self._text_payload(user, body.get("max_output_tokens"))
+
+    def _seeded(self, text: str) -> random.Random:
+        digest = hashlib.sha256(f"{self.settings.seed}:{text}".encode("utf-8")).digest()
+        return random.Random(int.from_bytes(digest[:8], "big"))
+
+    def _extraction_payload(self, prompt: str) -> Dict[str, Any]:
+        transcript = prompt.split("Transcript:", 1)[-1]
+        indices = [int(m) for m in re.findall(r"^\[(\d+)\]", transcript, flags=re.MULTILINE)] or [0]
+        lowered = transcript.lower()
+        found = [term for term in _REACT_TERMS if term.lower() in lowered]
+        rng = self._seeded(transcript)
+        extra = [term for term in _REACT_TERMS if term not in found]
+        rng.shuffle(extra)
+        labels = (found + extra)[: rng.randint(4, 8)]
+        concepts = []
+        for label in labels:
+            first = rng.choice(indices)
+            concepts.append(
+                {
+                    "id": f"c_{label.lower().replace(' ', '_')}",
+                    "label": label,
+                    "type": rng.choice(["entity", "feature", "decision"]),
+                    "aliases": [],
+                    "summary": f"{label} shape how the React UI holds and shares data.",
+                    "first_seen_index": first,
+                    "last_seen_index": max(first, rng.choice(indices)),
+                }
+            )
+        edges = []
+        for src, dst in zip(concepts, concepts[1:]):
+            edges.append(
+                {
+                    "id": f"e_{src['id']}_{dst['id']}",
+                    "from_concept_id": src["id"],
+                    "to_concept_id": dst["id"],
+                    "relation": "enables",
+                    "introduced_index": min(src["first_seen_index"], dst["first_seen_index"]),
+                }
+            )
+        return {"concepts": concepts, "edges": edges}
+
+    def _refinement_payload(self, prompt: str) -> Dict[str, Any]:
+        focus = prompt.split("Focus concepts to deepen:", 1)[-1]
+        concept_ids = re.findall(r"^\s*-\s+(\S+)\s+\[", focus, flags=re.MULTILINE)
+        overlays = [
+            {
+                "concept_id": concept_id,
+                "depth": 2,
+                "content_markdown": f"Key idea: {concept_id} keeps component data predictable across renders.",
+                "doc_links": {"Managing State": "https://react.dev/learn/managing-state"},
+            }
+            for concept_id in concept_ids
+        ]
+        return {"answer_patch": "Deepen the focus areas before wiring effects.", "overlays": overlays}
+
+    def _text_payload(self, prompt: str, max_output_tokens: Optional[int]) -> str:
+        budget = self.settings.text_tokens
+        if max_output_tokens:
+            budget = min(budget, int(max_output_tokens))
+        sentences = [s.strip() + "." for s in _FILLER.split(".") if s.strip()]
+        rng = self._seeded(prompt)
+        words: List[str] = []
+        while len(words) * 4 // 3 < budget:
+            words.extend(rng.choice(sentences).split())
+        return " ".join(words)
+
+
+def _approx_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _response_object(body: Dict[str, Any], text: str, status: str = "completed") -> Dict[str, Any]:
+    message_id = f"msg_{uuid.uuid4().hex[:24]}"
+    output_tokens = _approx_tokens(text)
+    input_chars = sum(len(str(m.get("content", ""))) for m in body.get("input") or [] if isinstance(m, dict))
+    return {
+        "id": f"resp_{uuid.uuid4().hex[:24]}",
+        "object": "response",
+        "created_at": int(time.time()),
+        "status": status,
+        "model": body.get("model", "stub"),
+        "output": [
+            {
+                "type": "message",
+                "id": message_id,
+                "status": "completed",
+                "role": "assistant",
+                "content": [{"type": "output_text", "text": text, "annotations": []}],
+            }
+        ],
+        "incomplete_details": None,
+        "error": None,
+        "parallel_tool_calls": True,
+        "tool_choice": "auto",
+        "tools": [],
+        "temperature": body.get("temperature"),
+        "max_output_tokens": body.get("max_output_tokens"),
+        "usage": {
+            "input_tokens": input_chars // 4,
+            "output_tokens": output_tokens,
+            "total_tokens": input_chars // 4 + output_tokens,
+            "input_tokens_details": {"cached_tokens": 0},
+            "output_tokens_details": {"reasoning_tokens": 0},
+        },
+    }
+
+
+def _sse(event: Dict[str, Any]) -> bytes:
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n".encode("utf-8")
+
+
+async def _stream_events(
+    responder: StubResponder,
+    body: Dict[str, Any],
+    text: str,
+) -> AsyncIterator[bytes]:
+    await asyncio.sleep(responder.first_token_delay() + responder.prefill_delay(body))
+    response = _response_object(body, text, status="in_progress")
+    item_id = response["output"][0]["id"]
+    seq = 0
+    yield _sse({"type": "response.created", "sequence_number": seq, "response": response})
+    for chunk in re.findall(r"\S+\s*", text):
+        seq += 1
+        await asyncio.sleep(responder.token_delay(_approx_tokens(chunk)))
+        yield _sse(
+            {
+                "type": "response.output_text.delta",
+                "sequence_number": seq,
+                "item_id": item_id,
+                "output_index": 0,
+                "content_index": 0,
+                "delta": chunk,
+                "logprobs": [],
+            }
+        )
+    response["status"] = "completed"
+    yield _sse({"type": "response.completed", "sequence_number": seq + 1, "response": response})
+
+
+def _error_body(status: int) -> Dict[str, Any]:
+    kind = "rate_limit_exceeded" if status == 429 else "server_error"
+    return {"error": {"message": f"stub injected {status}", "type": kind, "code": kind}}
+
+
+async def handle_responses(
+    responder: StubResponder,
+    body: Dict[str, Any],
+) -> Tuple[int, Dict[str, str], Any]:
+    """Return (status, headers, payload) where payload is a dict or an async byte iterator."""
+    if responder.should_fail():
+        await asyncio.sleep(responder.first_token_delay() / 4)
+        status = responder.settings.error_status
+        headers = {"retry-after-ms": "200"} if status == 429 else {}
+        return status, headers, _error_body(status)
+    text = responder.reply_text(body)
+    if body.get("stream"):
+        return 200, {"content-type": "text/event-stream"}, _stream_events(responder, body, text)
+    await asyncio.sleep(
+        responder.first_token_delay() + responder.prefill_delay(body) + responder.token_delay(_approx_tokens(text))
+    )
+    return 200, {"content-type": "application/json"}, _response_object(body, text)
+
+
+class _AsyncBytes(httpx.AsyncByteStream):
+    def __init__(self, chunks: AsyncIterator[bytes]) -> None:
+        self._chunks = chunks
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._chunks:
+            yield chunk
+
+    async def aclose(self) -> None:
+        await self._chunks.aclose()
+
+
+class StubTransport(httpx.AsyncBaseTransport):
+    """In-process httpx transport that answers `POST /responses` like the real API."""
+
+    def __init__(self, settings: Optional[StubSettings] = None) -> None:
+        self.responder = StubResponder(settings or StubSettings())
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if request.method != "POST" or not request.url.path.endswith("/responses"):
+            return httpx.Response(404, json={"error": {"message": "not found"}}, request=request)
+        body = json.loads((await request.aread()) or b"{}")
+        status, headers, payload = await handle_responses(self.responder, body)
+        if isinstance(payload, dict):
+            return httpx.Response(status, json=payload, headers=headers, request=request)
+        return httpx.Response(status, headers=headers, stream=_AsyncBytes(payload), request=request)
+
+
+def build_stub_app(settings: StubSettings):
+    """FastAPI app exposing the stub over HTTP for out-of-process load tests."""
+    from fastapi import FastAPI, Request
+    from fastapi.responses import JSONResponse, StreamingResponse
+
+    responder = StubResponder(settings)
+    app = FastAPI(title="LLM stub")
+
+    @app.post("/v1/responses")
+    async def responses(request: Request):
+        status, headers, payload = await handle_responses(responder, await request.json())
+        if isinstance(payload, dict):
+            return JSONResponse(payload, status_code=status, headers=headers)
+        return StreamingResponse(payload, status_code=status, headers=headers, media_type="text/event-stream")
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the OpenAI Responses API stub.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=float, default=400.0)
+    parser.add_argument("--latency-p95-ms", type=float, default=1200.0)
+    parser.add_argument("--tokens-per-second", type=float, default=80.0)
+    parser.add_argument("--prefill-tokens-per-second", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=429)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--script", default="", help="JSON file with scripted payloads")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    settings = StubSettings(
+        latency_ms=args.latency_ms,
+        latency_p95_ms=args.latency_p95_ms,
+        tokens_per_second=args.tokens_per_second,
+        prefill_tokens_per_second=args.prefill_tokens_per_second,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        seed=args.seed,
+        scripts=StubSettings.load_scripts(args.script),
+    )
+    uvicorn.run(build_stub_app(settings), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
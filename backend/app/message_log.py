@@ -0,0 +1,206 @@
+import struct
+import uuid
+from array import array
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+from .message_record import MessageRecord
+from .models import Role
+
+ROLES: Tuple[Role, ...] = ("system", "user", "assistant")
+_ROLE_CODES = {role: code for code, role in enumerate(ROLES)}
+# Cold segment entry: uid, role code, ts, token count, UTF-8 length, then the text.
+_COLD_HEADER = struct.Struct("<16sBdiI")
+_UID_SIZE = 16
+
+
+class MessageView(Sequence):
+    """Read-only window `[start, stop)` over a `MessageLog`; creating or slicing one copies nothing."""
+
+    __slots__ = ("_log", "_start", "_stop")
+
+    def __init__(self, log: "MessageLog", start: int, stop: int) -> None:
+        self._log = log
+        self._start = start
+        self._stop = max(start, stop)
+
+    def __len__(self) -> int:
+        return self._stop - self._start
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[MessageRecord, "MessageView"]:
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return [self[idx] for idx in range(start, stop, step)]
+            return MessageView(self._log, self._start + start, self._start + stop)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("message index out of range")
+        return self._log.record(self._start + index)
+
+    def __iter__(self) -> Iterator[MessageRecord]:
+        return iter(self._log.records(self._start, self._stop))
+
+    def __reversed__(self) -> Iterator[MessageRecord]:
+        for index in range(self._stop - 1, self._start - 1, -1):
+            yield self._log.record(index)
+
+    def __repr__(self) -> str:
+        return f"MessageView(start={self._start}, stop={self._stop})"
+
+
+class MessageLog(Sequence):
+    """Append-only, column-oriented transcript of one session.
+
+    Roles, timestamps and token costs live in typed arrays, ids in one
+    bytearray and contents in a single UTF-8 buffer indexed by end offsets,
+    so a message costs its text plus ~40 bytes. Records are built only when
+    read; `tail()` and slices return `MessageView`s in O(1).
+
+    With a `segment_dir` and `hot_limit`, messages older than the newest
+    `hot_limit` are moved in batches to an append-only segment file. They
+    keep their indices and are read back from disk on demand.
+    """
+
+    def __init__(self, *, hot_limit: int = 0, segment_dir: Optional[Path] = None) -> None:
+        self._hot_limit = max(0, hot_limit) if segment_dir is not None else 0
+        self._segment: Optional[Path] = None
+        if self._hot_limit:
+            self._segment = Path(segment_dir) / f"{uuid.uuid4().hex}.seg"
+        # Absolute index of the first message still held in memory.
+        self._base = 0
+        self._uids = bytearray()
+        self._roles = array("B")
+        self._ts = array("d")
+        self._tokens = array("i")
+        self._ends = array("Q")
+        self._text = bytearray()
+        # Byte offset of each cold message in the segment file.
+        self._cold_offsets = array("Q")
+        self._first_user = -1
+
+    @classmethod
+    def from_records(cls, records: Iterable[MessageRecord]) -> "MessageLog":
+        log = cls()
+        for record in records:
+            log.append(record)
+        return log
+
+    def __len__(self) -> int:
+        return self._base + len(self._roles)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[MessageRecord, MessageView]:
+        return MessageView(self, 0, len(self))[index]
+
+    def __iter__(self) -> Iterator[MessageRecord]:
+        return iter(self.records(0, len(self)))
+
+    def __reversed__(self) -> Iterator[MessageRecord]:
+        return reversed(MessageView(self, 0, len(self)))
+
+    def __repr__(self) -> str:
+        return f"MessageLog(messages={len(self)}, cold={self._base})"
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate resident size of the columns and text buffer."""
+        columns = (self._roles, self._ts, self._tokens, self._ends, self._cold_offsets)
+        return len(self._uids) + len(self._text) + sum(len(col) * col.itemsize for col in columns)
+
+    @property
+    def cold_count(self) -> int:
+        return self._base
+
+    def append(self, record: MessageRecord) -> None:
+        if record.role == "user" and self._first_user < 0 and record.content.strip():
+            self._first_user = len(self)
+        self._uids += record.uid
+        self._roles.append(_ROLE_CODES[record.role])
+        self._ts.append(record.ts)
+        self._tokens.append(record.token_count)
+        self._text += record.content.encode("utf-8")
+        self._ends.append(len(self._text))
+        if self._hot_limit and len(self._roles) >= self._hot_limit + max(16, self._hot_limit // 4):
+            self._spill(len(self._roles) - self._hot_limit)
+
+    def tail(self, limit: int) -> MessageView:
+        total = len(self)
+        return MessageView(self, max(0, total - max(0, limit)), total)
+
+    def first_user_message(self) -> Optional[MessageRecord]:
+        """The first non-blank user message, from a cached index."""
+        return self.record(self._first_user) if self._first_user >= 0 else None
+
+    def record(self, index: int) -> MessageRecord:
+        if index < self._base:
+            return self._read_cold(index, index + 1)[0]
+        return self._hot_records(index - self._base, index - self._base + 1)[0]
+
+    def records(self, start: int, stop: int) -> List[MessageRecord]:
+        cold_stop = min(stop, self._base)
+        found = self._read_cold(start, cold_stop) if start < cold_stop else []
+        if stop > self._base:
+            found.extend(self._hot_records(max(start, self._base) - self._base, stop - self._base))
+        return found
+
+    def discard(self) -> None:
+        """Delete the cold segment; call when the session is dropped for good."""
+        if self._segment is not None:
+            self._segment.unlink(missing_ok=True)
+
+    # ------------------------------------------------------------------ helpers
+    def _hot_records(self, first: int, stop: int) -> List[MessageRecord]:
+        ends, uids, roles, stamps, tokens, text = self._ends, self._uids, self._roles, self._ts, self._tokens, self._text
+        start = ends[first - 1] if first else 0
+        found = []
+        for offset in range(first, stop):
+            end = ends[offset]
+            found.append(
+                MessageRecord(
+                    bytes(uids[offset * _UID_SIZE : (offset + 1) * _UID_SIZE]),
+                    ROLES[roles[offset]],
+                    text[start:end].decode("utf-8"),
+                    stamps[offset],
+                    tokens[offset],
+                )
+            )
+            start = end
+        return found
+
+    def _spill(self, count: int) -> None:
+        self._segment.parent.mkdir(parents=True, exist_ok=True)
+        with self._segment.open("ab") as handle:
+            for offset in range(count):
+                start = self._ends[offset - 1] if offset else 0
+                text = self._text[start : self._ends[offset]]
+                self._cold_offsets.append(handle.tell())
+                handle.write(
+                    _COLD_HEADER.pack(
+                        bytes(self._uids[offset * _UID_SIZE : (offset + 1) * _UID_SIZE]),
+                        self._roles[offset],
+                        self._ts[offset],
+                        self._tokens[offset],
+                        len(text),
+                    )
+                )
+                handle.write(text)
+        cut = self._ends[count - 1]
+        del self._uids[: count * _UID_SIZE]
+        del self._roles[:count]
+        del self._ts[:count]
+        del self._tokens[:count]
+        del self._text[:cut]
+        self._ends = array("Q", (end - cut for end in self._ends[count:]))
+        self._base += count
+
+    def _read_cold(self, start: int, stop: int) -> List[MessageRecord]:
+        found: List[MessageRecord] = []
+        with self._segment.open("rb") as handle:
+            handle.seek(self._cold_offsets[start])
+            for _ in range(start, stop):
+                uid, role, ts, tokens, size = _COLD_HEADER.unpack(handle.read(_COLD_HEADER.size))
+                content = handle.read(size).decode("utf-8")
+                found.append(MessageRecord(uid, ROLES[role], content, ts, tokens))
+        return found
@@ -0,0 +1,55 @@
+import sys
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Optional
+
+from .models import ChatMessage, Role
+from .tokens import MESSAGE_OVERHEAD_TOKENS, count_tokens
+
+
+def message_token_count(content: str) -> int:
+    """Prompt cost of a message with this content, framing included."""
+    return count_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+
+
+@dataclass(frozen=True, slots=True)
+class MessageRecord:
+    """One stored chat message, kept compact for long in-memory transcripts.
+
+    The id is held as the UUID's 16 raw bytes and the role is interned, so a
+    record costs a fraction of a `ChatMessage`; routes convert with
+    `to_model()` only when a message leaves the process. The token cost is
+    counted once by `create`/`from_row` and stored like any other field.
+    """
+
+    uid: bytes
+    role: Role
+    content: str
+    ts: float
+    token_count: int
+
+    @classmethod
+    def create(cls, role: Role, content: str, ts: Optional[float] = None) -> "MessageRecord":
+        return cls(
+            uuid.uuid4().bytes,
+            sys.intern(role),
+            content,
+            time.time() if ts is None else ts,
+            message_token_count(content),
+        )
+
+    @classmethod
+    def from_row(
+        cls, message_id: str, role: str, content: str, ts: float, token_count: Optional[int] = None
+    ) -> "MessageRecord":
+        if token_count is None:  # rows written before the column existed
+            token_count = message_token_count(content)
+        return cls(uuid.UUID(message_id).bytes, sys.intern(role), content, ts, token_count)
+
+    @property
+    def id(self) -> str:
+        return str(uuid.UUID(bytes=self.uid))
+
+    def to_model(self) -> ChatMessage:
+        return ChatMessage(id=self.id, role=self.role, content=self.content, ts=self.ts)
@@ -37,6 +37,7 @@ class GenerateResponse(BaseModel):
 
 class ConceptGraphBuildRequest(BaseModel):
     mode: Literal["full", "incremental"] = "incremental"
+    use_cache: bool = True
 
 
 class ConceptNodeModel(BaseModel):
@@ -65,7 +66,9 @@ class ConceptEdgeModel(BaseModel):
 class ConceptGraphMetaModel(BaseModel):
     last_processed_index: int
     graph_version: str
+    revision: int = 0
     updated_ts: float
+    status: Literal["fresh", "building", "stale"] = "fresh"
 
 
 class ConceptGraphResponse(BaseModel):
@@ -74,6 +77,19 @@ class ConceptGraphResponse(BaseModel):
     meta: ConceptGraphMetaModel
 
 
+class ConceptSubgraphResponse(ConceptGraphResponse):
+    """Part of the graph; `truncated` means the node limit cut the selection short."""
+
+    truncated: bool = False
+
+
+class ConceptGraphDeltaResponse(ConceptGraphResponse):
+    """Concepts and edges changed after `since`; `full` means replace the client copy."""
+
+    since: int
+    full: bool
+
+
 class GoalOverlayModel(BaseModel):
     id: str
     concept_id: str
@@ -93,6 +109,7 @@ class GoalNodeMetaModel(BaseModel):
     global_answer_depth: int
     last_updated_ts: float
     last_refined_concepts: List[str] = Field(default_factory=list)
+    revision: int = 0
 
 
 class GoalNodeResponse(BaseModel):
@@ -114,12 +131,15 @@ class ConceptExpandRequest(BaseModel):
     weight: Optional[float] = None
     strength: float = Field(default=1.0, ge=0)
     auto_refine: bool = True
+    # Refine the goal in a background job instead of before responding.
+    refine_in_background: bool = True
 
 
 class ConceptDeclutterRequest(BaseModel):
     expansion_indices: Optional[List[int]] = None
     force_children: bool = False
     auto_refine: bool = True
+    refine_in_background: bool = True
 
 
 class ConceptDeclutterResponse(BaseModel):
@@ -127,9 +147,26 @@ class ConceptDeclutterResponse(BaseModel):
     children: List[ConceptNodeModel] = Field(default_factory=list)
     edges: List[ConceptEdgeModel] = Field(default_factory=list)
     skipped_expansions: List[int] = Field(default_factory=list)
+    refine_job_id: Optional[str] = None
 
 
 class ConceptExpandResponse(BaseModel):
     concept: ConceptNodeModel
     new_children: List[ConceptNodeModel] = Field(default_factory=list)
     new_edges: List[ConceptEdgeModel] = Field(default_factory=list)
+    refine_job_id: Optional[str] = None
+
+
+class GoalRefinementJobResponse(BaseModel):
+    """Status of a background refinement; `goal` is the refined goal once the job is done."""
+
+    id: str
+    session_id: str
+    status: Literal["queued", "running", "done", "failed"]
+    concept_ids: List[str] = Field(default_factory=list)
+    coalesced: int = 0
+    created_ts: float
+    started_ts: Optional[float] = None
+    finished_ts: Optional[float] = None
+    error: Optional[str] = None
+    goal: Optional[GoalNodeResponse] = None
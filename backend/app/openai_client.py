@@ -1,15 +1,89 @@
+import asyncio
 import json
-from typing import Any, Dict, List, Optional
+import time
+from contextlib import nullcontext
+from typing import Any, AsyncContextManager, AsyncIterator, Dict, List, Optional
 
+import httpx
 from openai import AsyncOpenAI
 from openai.types.responses import Response as OpenAIResponse
 
-from .config import OPENAI_API_KEY
+from .config import OPENAI_API_KEY, OPENAI_BASE_URL
+from .llm_admission import AdmissionController, estimate_request_tokens
+from .llm_cache import ResponseCache
+from .llm_resilience import (
+    CallPolicy,
+    CircuitBreaker,
+    LatencyTracker,
+    backoff_delay,
+    default_policies,
+    is_retryable,
+    retry_after_seconds,
+)
 
 
 class OpenAIClient:
-    def __init__(self) -> None:
-        self._client = AsyncOpenAI(api_key=OPENAI_API_KEY)
+    def __init__(
+        self,
+        *,
+        cache: Optional[ResponseCache] = None,
+        admission: Optional[AdmissionController] = None,
+        policies: Optional[Dict[str, CallPolicy]] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        http_client: Optional[httpx.AsyncClient] = None,
+    ) -> None:
+        # Retries are driven by our per-call-site policies, not the SDK's defaults.
+        self._client = AsyncOpenAI(
+            api_key=OPENAI_API_KEY,
+            base_url=OPENAI_BASE_URL,
+            max_retries=0,
+            http_client=http_client,
+        )
+        self._cache = cache
+        self._admission = admission
+        self._policies = policies or default_policies()
+        self._breaker = breaker or CircuitBreaker()
+        self._latency: Dict[str, LatencyTracker] = {}
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._warm_sdk()
+
+    def _warm_sdk(self) -> None:
+        """Pay the SDK's lazy setup now rather than on the event loop under the first requests.
+
+        `responses` imports its resource modules on first access and response
+        parsing builds its validators on first use; together that is over a
+        second of blocking work that would otherwise stall every request in
+        flight when the first LLM call lands.
+        """
+        self._client.responses
+        OpenAIResponse.construct(
+            output=[
+                {
+                    "type": "message",
+                    "id": "",
+                    "status": "completed",
+                    "role": "assistant",
+                    "content": [{"type": "output_text", "text": "", "annotations": []}],
+                }
+            ]
+        )
+
+    def cache_stats(self) -> Dict[str, int]:
+        return self._cache.stats() if self._cache else {}
+
+    def admission_stats(self) -> Dict[str, float]:
+        return self._admission.stats() if self._admission else {}
+
+    def resilience_stats(self) -> Dict[str, object]:
+        return {
+            "circuit": self._breaker.state,
+            "circuit_opens": self._breaker.opens,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+        }
 
     async def generate_text(
         self,
@@ -18,15 +92,35 @@ class OpenAIClient:
         messages: List[Dict[str, Any]],
         temperature: Optional[float] = None,
         max_output_tokens: Optional[int] = None,
+        cache_ttl: Optional[float] = None,
+        use_cache: bool = True,
+        policy: str = "default",
+        context_version: str = "",
     ) -> str:
-        """Request a response from OpenAI and return the aggregated text output."""
+        """Request a response from OpenAI and return the aggregated text output.
+
+        Responses are cached for `cache_ttl` seconds when a cache is configured;
+        pass `use_cache=False` to force a fresh call. `context_version` ties the
+        cache entry to the documentation snapshot the prompt was built from.
+        """
+        cache_key = self._cache_key(
+            "text", model, messages, temperature, max_output_tokens, cache_ttl, use_cache, context_version
+        )
+        if cache_key:
+            cached = self._cache.get(cache_key)
+            if isinstance(cached, str):
+                return cached
         response = await self._create_response(
             model=model,
             messages=messages,
             temperature=temperature,
             max_output_tokens=max_output_tokens,
+            policy=policy,
         )
-        return self._extract_plain_text(response)
+        text = self._extract_plain_text(response)
+        if cache_key and text:
+            self._cache.put(cache_key, text, ttl=cache_ttl)
+        return text
 
     async def generate_json(
         self,
@@ -35,24 +129,115 @@ class OpenAIClient:
         messages: List[Dict[str, Any]],
         temperature: float = None,
         max_output_tokens: Optional[int] = None,
+        cache_ttl: Optional[float] = None,
+        use_cache: bool = True,
+        policy: str = "default",
+        context_version: str = "",
     ) -> Dict[str, Any]:
-        """Call OpenAI and parse the response body as JSON."""
+        """Call OpenAI and parse the response body as JSON (cached like `generate_text`)."""
+        cache_key = self._cache_key(
+            "json", model, messages, temperature, max_output_tokens, cache_ttl, use_cache, context_version
+        )
+        if cache_key:
+            cached = self._cache.get(cache_key)
+            if isinstance(cached, dict):
+                return cached
         response = await self._create_response(
             model=model,
             messages=messages,
             temperature=temperature,
             max_output_tokens=max_output_tokens,
+            policy=policy,
         )
         raw_text = self._extract_plain_text(response)
         try:
-            return self._coerce_json(raw_text)
+            payload = self._coerce_json(raw_text)
         except ValueError:
-            repaired = None
+            payload = None
             if max_output_tokens is not None and self._was_cut_off(response):
-                repaired = self._repair_cutoff_json(raw_text)
-            if repaired is not None:
-                return repaired
-            raise
+                payload = self._repair_cutoff_json(raw_text)
+            if payload is None:
+                raise
+        if cache_key and payload:
+            self._cache.put(cache_key, payload, ttl=cache_ttl)
+        return payload
+
+    def _cache_key(
+        self,
+        kind: str,
+        model: str,
+        messages: List[Dict[str, Any]],
+        temperature: Optional[float],
+        max_output_tokens: Optional[int],
+        cache_ttl: Optional[float],
+        use_cache: bool,
+        context_version: str,
+    ) -> Optional[str]:
+        if self._cache is None or not cache_ttl or cache_ttl <= 0:
+            return None
+        if not use_cache:
+            self._cache.record_bypass()
+            return None
+        return ResponseCache.make_key(
+            kind=kind,
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_output_tokens=max_output_tokens,
+            context_version=context_version,
+        )
+
+    async def stream_text(
+        self,
+        *,
+        model: str,
+        messages: List[Dict[str, Any]],
+        temperature: Optional[float] = None,
+        max_output_tokens: Optional[int] = None,
+        policy: str = "default",
+    ) -> AsyncIterator[str]:
+        """Stream text deltas as they arrive; closing the iterator aborts the upstream call.
+
+        Streams are never retried, but they respect the circuit breaker: success
+        is recorded once the stream completes and a failure when reading it
+        raises, while a consumer that stops early gives no verdict.
+        """
+        call_policy = self._policy(policy)
+        extra = self._request_options(
+            temperature=temperature,
+            max_output_tokens=max_output_tokens,
+            timeout=call_policy.timeout,
+        )
+        async with self._admit(model, messages, max_output_tokens):
+            self._breaker.before_call()
+            try:
+                # `input` goes in extra_body: passed as a keyword, the SDK walks every
+                # message against its TypedDict schema on the event loop, which costs
+                # more than the rest of the request build combined.
+                stream = await self._client.responses.create(
+                    model=model, stream=True, extra_body={"input": messages}, **extra
+                )
+            except BaseException as exc:
+                self._record_outcome(exc)
+                raise
+            try:
+                async with stream:
+                    async for event in stream:
+                        event_type = getattr(event, "type", None)
+                        if event_type == "response.output_text.delta":
+                            delta = getattr(event, "delta", "") or ""
+                            if delta:
+                                yield delta
+                        elif event_type in {"response.failed", "error"}:
+                            raise RuntimeError("OpenAI stream failed")
+            except (GeneratorExit, asyncio.CancelledError):
+                self._breaker.release_probe()
+                raise
+            except Exception:
+                # Everything raised while reading comes from upstream, mid-stream.
+                self._breaker.record_failure()
+                raise
+            self._breaker.record_success()
 
     @staticmethod
     def _coerce_json(raw: str) -> Dict[str, Any]:
@@ -148,13 +333,126 @@ class OpenAIClient:
         messages: List[Dict[str, Any]],
         temperature: Optional[float],
         max_output_tokens: Optional[int],
+        policy: str = "default",
+    ) -> OpenAIResponse:
+        """Run one logical call: circuit breaker, jittered retries, then optional hedging."""
+        call_policy = self._policy(policy)
+        extra = self._request_options(
+            temperature=temperature,
+            max_output_tokens=max_output_tokens,
+            timeout=call_policy.timeout,
+        )
+        deterministic = temperature is not None and temperature == 0
+        attempts = call_policy.max_attempts
+        if not (deterministic or call_policy.retry_nondeterministic):
+            attempts = 1
+
+        for attempt in range(max(1, attempts)):
+            self._breaker.before_call()
+            try:
+                response = await self._hedged_call(policy, call_policy, model, messages, extra)
+            except Exception as exc:
+                self._record_outcome(exc)
+                if not is_retryable(exc) or attempt + 1 >= attempts:
+                    raise
+                self.retries += 1
+                await asyncio.sleep(backoff_delay(attempt, call_policy, retry_after_seconds(exc)))
+                continue
+            except BaseException as exc:
+                # Cancellation must still release a half-open probe, or the breaker stays wedged.
+                self._record_outcome(exc)
+                raise
+            self._breaker.record_success()
+            return response
+        raise RuntimeError("unreachable")
+
+    async def _hedged_call(
+        self,
+        policy_name: str,
+        policy: CallPolicy,
+        model: str,
+        messages: List[Dict[str, Any]],
+        extra: Dict[str, Any],
     ) -> OpenAIResponse:
-        extra: Dict[str, Any] = {"timeout": 60}
+        """Send the request; past the site's p95 latency, race a duplicate and keep the first success."""
+        tracker = self._latency.setdefault(policy_name, LatencyTracker())
+
+        async def attempt() -> OpenAIResponse:
+            started = time.monotonic()
+            async with self._admit(model, messages, extra.get("max_output_tokens")):
+                # extra_body skips the SDK's schema walk over `input`; see stream_text.
+                response = await self._client.responses.create(
+                    model=model, extra_body={"input": messages}, **extra
+                )
+            tracker.record(time.monotonic() - started)
+            return response
+
+        hedge_after = tracker.percentile(95, min_samples=policy.hedge_min_samples) if policy.hedge else None
+        if hedge_after is None:
+            return await attempt()
+
+        primary = asyncio.ensure_future(attempt())
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=hedge_after)
+        except BaseException:
+            # The caller went away; don't leave the request holding its admission slot.
+            primary.cancel()
+            raise
+        if done:
+            return primary.result()
+
+        self.hedges += 1
+        secondary = asyncio.ensure_future(attempt())
+        pending = {primary, secondary}
+        last_error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is secondary:
+                            self.hedge_wins += 1
+                        return task.result()
+                    last_error = task.exception()
+            assert last_error is not None
+            raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def _policy(self, name: str) -> CallPolicy:
+        return self._policies.get(name) or self._policies.get("default") or CallPolicy()
+
+    def _record_outcome(self, exc: BaseException) -> None:
+        if is_retryable(exc):
+            self._breaker.record_failure()
+        else:
+            # Client-side errors and cancellations say nothing about upstream health.
+            self._breaker.release_probe()
+
+    def _admit(
+        self,
+        model: str,
+        messages: List[Dict[str, Any]],
+        max_output_tokens: Optional[int],
+    ) -> AsyncContextManager[None]:
+        if self._admission is None:
+            return nullcontext()
+        return self._admission.admit(model, estimate_request_tokens(messages, max_output_tokens))
+
+    @staticmethod
+    def _request_options(
+        *,
+        temperature: Optional[float],
+        max_output_tokens: Optional[int],
+        timeout: float = 60.0,
+    ) -> Dict[str, Any]:
+        extra: Dict[str, Any] = {"timeout": timeout}
         if temperature is not None:
             extra["temperature"] = temperature
         if max_output_tokens is not None:
             extra["max_output_tokens"] = max_output_tokens
-        return await self._client.responses.create(model=model, input=messages, **extra)
+        return extra
 
     @staticmethod
     def _was_cut_off(response: OpenAIResponse) -> bool:
@@ -0,0 +1,75 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List
+
+from .llm_resilience import LatencyTracker
+
+
+class RevisionConflict(RuntimeError):
+    """A graph or goal changed underneath a write that awaited the LLM."""
+
+
+class SessionLocks:
+    """One asyncio lock per session: writes to a session run one at a time.
+
+    Locks exist only while someone holds or waits for them, so idle sessions
+    cost nothing; unrelated sessions never wait on each other. Locks are not
+    reentrant, so take them at the entry points (routes, background jobs) and
+    never inside service methods those entry points call.
+    """
+
+    def __init__(self) -> None:
+        # session id -> [lock, holders + waiters]
+        self._locks: Dict[str, List] = {}
+        self._waits = LatencyTracker(window=1000)
+        self.acquired = 0
+        self.contended = 0
+        self.conflicts = 0
+        self._max_wait = 0.0
+
+    @asynccontextmanager
+    async def hold(self, session_id: str) -> AsyncIterator[None]:
+        entry = self._locks.get(session_id)
+        if entry is None:
+            entry = self._locks[session_id] = [asyncio.Lock(), 0]
+        lock: asyncio.Lock = entry[0]
+        entry[1] += 1
+        started = time.perf_counter()
+        try:
+            if lock.locked():
+                self.contended += 1
+            await lock.acquire()
+        except BaseException:
+            self._release_entry(session_id, entry)
+            raise
+        waited = time.perf_counter() - started
+        self._waits.record(waited)
+        self._max_wait = max(self._max_wait, waited)
+        self.acquired += 1
+        try:
+            yield
+        except RevisionConflict:
+            self.conflicts += 1
+            raise
+        finally:
+            lock.release()
+            self._release_entry(session_id, entry)
+
+    def stats(self) -> Dict[str, float]:
+        p50 = self._waits.percentile(50)
+        p95 = self._waits.percentile(95)
+        return {
+            "active_sessions": len(self._locks),
+            "acquired": self.acquired,
+            "contended": self.contended,
+            "conflicts": self.conflicts,
+            "wait_ms_p50": round((p50 or 0.0) * 1000, 3),
+            "wait_ms_p95": round((p95 or 0.0) * 1000, 3),
+            "wait_ms_max": round(self._max_wait * 1000, 3),
+        }
+
+    def _release_entry(self, session_id: str, entry: List) -> None:
+        entry[1] -= 1
+        if entry[1] == 0 and self._locks.get(session_id) is entry:
+            del self._locks[session_id]
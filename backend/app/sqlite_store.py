@@ -0,0 +1,246 @@
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Set, Tuple
+
+from .message_log import MessageLog
+from .message_record import MessageRecord
+from .store import ChatStore, Session
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    created_ts REAL NOT NULL,
+    first_user_ts REAL
+);
+CREATE TABLE IF NOT EXISTS messages (
+    session_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    id TEXT NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    ts REAL NOT NULL,
+    token_count INTEGER,
+    PRIMARY KEY (session_id, seq)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS summaries (
+    session_id TEXT PRIMARY KEY,
+    content TEXT NOT NULL,
+    upto INTEGER NOT NULL
+);
+"""
+
+# Statements are module constants so sqlite3's per-connection statement cache
+# keeps them prepared across calls.
+_INSERT_SESSION = "INSERT INTO sessions (id, created_ts) VALUES (?, ?)"
+_SELECT_SESSION = "SELECT created_ts, first_user_ts FROM sessions WHERE id = ?"
+_INSERT_MESSAGE = """
+INSERT INTO messages (session_id, seq, id, role, content, ts, token_count)
+SELECT ?, COALESCE(MAX(seq), -1) + 1, ?, ?, ?, ?, ? FROM messages WHERE session_id = ?
+"""
+_MARK_FIRST_USER = "UPDATE sessions SET first_user_ts = ? WHERE id = ? AND first_user_ts IS NULL"
+_SELECT_MESSAGES = "SELECT id, role, content, ts, token_count FROM messages WHERE session_id = ? ORDER BY seq"
+_SELECT_TAIL = """
+SELECT id, role, content, ts, token_count FROM (
+    SELECT seq, id, role, content, ts, token_count FROM messages WHERE session_id = ? ORDER BY seq DESC LIMIT ?
+) ORDER BY seq
+"""
+# seq counts from 0 per session, so a range of message indices is a primary-key range scan.
+_MAX_SEQ = 2**62
+_SELECT_RANGE = """
+SELECT id, role, content, ts, token_count FROM (
+    SELECT seq, id, role, content, ts, token_count FROM messages
+    WHERE session_id = ? AND seq >= ? AND seq < ? ORDER BY seq DESC LIMIT ?
+) ORDER BY seq
+"""
+_COUNT_MESSAGES = "SELECT COUNT(*) FROM messages WHERE session_id = ?"
+_SELECT_SUMMARY = "SELECT content, upto FROM summaries WHERE session_id = ?"
+_UPSERT_SUMMARY = """
+INSERT INTO summaries (session_id, content, upto) VALUES (?, ?, ?)
+ON CONFLICT(session_id) DO UPDATE SET content = excluded.content, upto = excluded.upto
+"""
+
+_PendingRow = Tuple[str, MessageRecord]
+
+logger = logging.getLogger(__name__)
+
+
+class SqliteChatStore(ChatStore):
+    """Durable chat store backed by SQLite in WAL mode.
+
+    Appends are buffered and group-committed: a batch is written in one
+    transaction once `batch_size` messages are pending or `commit_interval`
+    seconds have passed, whichever comes first. Reads flush pending appends
+    first so callers always see their own writes.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        batch_size: int = 64,
+        commit_interval: float = 0.005,
+    ) -> None:
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(messages)")}
+        if "token_count" not in columns:
+            # Databases created before token counts were persisted.
+            self._conn.execute("ALTER TABLE messages ADD COLUMN token_count INTEGER")
+        self._lock = threading.RLock()
+        self._pending: List[_PendingRow] = []
+        self._known: Set[str] = set()
+        self._batch_size = max(1, batch_size)
+        self._commit_interval = max(0.0, commit_interval)
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._flusher = threading.Thread(target=self._flush_loop, name="sqlite-chat-store", daemon=True)
+        self._flusher.start()
+
+    def create_session(self) -> str:
+        sid = str(uuid.uuid4())
+        with self._lock:
+            self._conn.execute(_INSERT_SESSION, (sid, time.time()))
+            self._known.add(sid)
+        return sid
+
+    def get_session(self, session_id: str) -> Optional[Session]:
+        with self._lock:
+            self._flush_locked()
+            row = self._conn.execute(_SELECT_SESSION, (session_id,)).fetchone()
+            if row is None:
+                return None
+            self._known.add(session_id)
+            messages = self._fetch(_SELECT_MESSAGES, (session_id,))
+            summary = self._conn.execute(_SELECT_SUMMARY, (session_id,)).fetchone() or ("", 0)
+        return Session(
+            created_ts=row[0],
+            messages=MessageLog.from_records(messages),
+            first_user_ts=row[1],
+            summary=summary[0],
+            summary_upto=summary[1],
+        )
+
+    def has_session(self, session_id: str) -> bool:
+        with self._lock:
+            if session_id in self._known:
+                return True
+            row = self._conn.execute(_SELECT_SESSION, (session_id,)).fetchone()
+            if row is None:
+                return False
+            self._known.add(session_id)
+            return True
+
+    def append(self, session_id: str, msg: MessageRecord) -> None:
+        if not self.has_session(session_id):
+            raise KeyError("session not found")
+        with self._lock:
+            self._pending.append((session_id, msg))
+            if len(self._pending) >= self._batch_size:
+                self._flush_locked()
+                return
+        self._wakeup.set()
+
+    def list_messages(
+        self,
+        session_id: str,
+        limit: Optional[int] = None,
+        *,
+        start: int = 0,
+        stop: Optional[int] = None,
+    ) -> List[MessageRecord]:
+        if not self.has_session(session_id):
+            raise KeyError("session not found")
+        if limit is not None and limit <= 0:
+            return []
+        with self._lock:
+            self._flush_locked()
+            if start > 0 or stop is not None:
+                upper = _MAX_SEQ if stop is None else stop
+                return self._fetch(_SELECT_RANGE, (session_id, start, upper, -1 if limit is None else limit))
+            if limit is None:
+                return self._fetch(_SELECT_MESSAGES, (session_id,))
+            return self._fetch(_SELECT_TAIL, (session_id, limit))
+
+    def count_messages(self, session_id: str) -> int:
+        if not self.has_session(session_id):
+            raise KeyError("session not found")
+        with self._lock:
+            self._flush_locked()
+            return self._conn.execute(_COUNT_MESSAGES, (session_id,)).fetchone()[0]
+
+    def get_summary(self, session_id: str) -> Tuple[str, int]:
+        if not self.has_session(session_id):
+            raise KeyError("session not found")
+        with self._lock:
+            row = self._conn.execute(_SELECT_SUMMARY, (session_id,)).fetchone()
+        return (row[0], row[1]) if row else ("", 0)
+
+    def set_summary(self, session_id: str, summary: str, upto: int) -> None:
+        if not self.has_session(session_id):
+            raise KeyError("session not found")
+        with self._lock:
+            self._conn.execute(_UPSERT_SUMMARY, (session_id, summary, upto))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"pending_appends": len(self._pending), "known_sessions": len(self._known)}
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._flush_locked()
+            self._closed = True
+        self._wakeup.set()
+        self._flusher.join(timeout=1.0)
+        self._conn.close()
+
+    # ------------------------------------------------------------------ helpers
+    def _fetch(self, sql: str, params: tuple) -> List[MessageRecord]:
+        rows = self._conn.execute(sql, params).fetchall()
+        return [MessageRecord.from_row(*row) for row in rows]
+
+    def _flush_locked(self) -> None:
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.executemany(
+                _INSERT_MESSAGE,
+                [(sid, m.id, m.role, m.content, m.ts, m.token_count, sid) for sid, m in batch],
+            )
+            self._conn.executemany(
+                _MARK_FIRST_USER,
+                [(m.ts, sid) for sid, m in batch if m.role == "user"],
+            )
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            self._pending = batch + self._pending
+            raise
+        self._conn.execute("COMMIT")
+
+    def _flush_loop(self) -> None:
+        while True:
+            self._wakeup.wait()
+            if self._closed:
+                return
+            time.sleep(self._commit_interval)
+            self._wakeup.clear()
+            with self._lock:
+                if self._closed:
+                    return
+                try:
+                    self._flush_locked()
+                except Exception:
+                    # The batch was put back; the next append or read retries it.
+                    logger.exception("sqlite chat store: group commit failed")
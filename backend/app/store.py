@@ -1,38 +1,156 @@
+import shutil
 import time
 import uuid
+from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Tuple
 
-from .models import ChatMessage
+from .bounded_cache import CacheLimits, SpillingLRUCache, process_spill_dir
+from .config import CHAT_LOG_HOT_MESSAGES
+from .message_log import MessageLog
+from .message_record import MessageRecord
 
 @dataclass
 class Session:
     created_ts: float = field(default_factory=lambda: time.time())
-    messages: List[ChatMessage] = field(default_factory=list)
+    messages: MessageLog = field(default_factory=MessageLog)
     first_user_ts: Optional[float] = None
+    # Running summary of messages[:summary_upto], maintained by ChatService.
+    summary: str = ""
+    summary_upto: int = 0
 
-class InMemoryChatStore:
-    def __init__(self) -> None:
-        self._sessions: Dict[str, Session] = {}
+
+class ChatStore(ABC):
+    """Storage contract shared by every chat session backend."""
+
+    @abstractmethod
+    def create_session(self) -> str: ...
+
+    @abstractmethod
+    def get_session(self, session_id: str) -> Optional[Session]: ...
+
+    @abstractmethod
+    def has_session(self, session_id: str) -> bool: ...
+
+    @abstractmethod
+    def append(self, session_id: str, msg: MessageRecord) -> None: ...
+
+    @abstractmethod
+    def list_messages(
+        self,
+        session_id: str,
+        limit: Optional[int] = None,
+        *,
+        start: int = 0,
+        stop: Optional[int] = None,
+    ) -> Sequence[MessageRecord]:
+        """Return messages `[start, stop)` of the session (all by default), or only the newest `limit` of them.
+
+        `start` and `stop` are non-negative message indices; `stop=None` means the end.
+        """
+
+    @abstractmethod
+    def count_messages(self, session_id: str) -> int: ...
+
+    @abstractmethod
+    def get_summary(self, session_id: str) -> Tuple[str, int]:
+        """Return the running summary and how many leading messages it covers."""
+
+    @abstractmethod
+    def set_summary(self, session_id: str, summary: str, upto: int) -> None: ...
+
+    def stats(self) -> Dict[str, int]:
+        return {}
+
+    def close(self) -> None:
+        return None
+
+
+def estimate_session_bytes(session: Session) -> int:
+    return 128 + len(session.summary) + session.messages.nbytes
+
+
+class InMemoryChatStore(ChatStore):
+    def __init__(self, limits: Optional[CacheLimits] = None, *, hot_messages: int = CHAT_LOG_HOT_MESSAGES) -> None:
+        self._sessions: SpillingLRUCache[Session] = SpillingLRUCache(
+            "sessions",
+            limits=limits,
+            sizer=estimate_session_bytes,
+            # A spilled session that is replaced takes its cold history with it.
+            on_drop=lambda session: session.messages.discard(),
+        )
+        # Messages beyond the newest `hot_messages` per session move to segment files
+        # in this process's own spill directory, so workers never touch each other's.
+        self._hot_messages = hot_messages
+        self._segment_dir: Optional[Path] = None
+        if limits is not None and limits.spill_dir and hot_messages > 0:
+            self._segment_dir = process_spill_dir(limits.spill_dir) / "message_log"
+            self._segment_dir.mkdir(parents=True, exist_ok=True)
 
     def create_session(self) -> str:
         sid = str(uuid.uuid4())
-        self._sessions[sid] = Session()
+        log = MessageLog(hot_limit=self._hot_messages, segment_dir=self._segment_dir)
+        self._sessions.put(sid, Session(messages=log))
         return sid
 
     def get_session(self, session_id: str):
         return self._sessions.get(session_id)
 
-    def append(self, session_id: str, msg: ChatMessage) -> None:
+    def has_session(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def append(self, session_id: str, msg: MessageRecord) -> None:
         s = self.get_session(session_id)
         if not s:
             raise KeyError("session not found")
         s.messages.append(msg)
         if msg.role == "user" and s.first_user_ts is None:
             s.first_user_ts = msg.ts
+        self._sessions.touch(session_id)
+
+    def list_messages(
+        self,
+        session_id: str,
+        limit: Optional[int] = None,
+        *,
+        start: int = 0,
+        stop: Optional[int] = None,
+    ) -> Sequence[MessageRecord]:
+        s = self.get_session(session_id)
+        if not s:
+            raise KeyError("session not found")
+        if limit is not None and start == 0 and stop is None:
+            return s.messages.tail(limit)
+        window = s.messages[start:stop]
+        if limit is not None:
+            return window[max(0, len(window) - max(0, limit)) :]
+        return window
 
-    def list_messages(self, session_id: str) -> List[ChatMessage]:
+    def count_messages(self, session_id: str) -> int:
         s = self.get_session(session_id)
         if not s:
             raise KeyError("session not found")
-        return s.messages
+        return len(s.messages)
+
+    def get_summary(self, session_id: str) -> Tuple[str, int]:
+        s = self.get_session(session_id)
+        if not s:
+            raise KeyError("session not found")
+        return s.summary, s.summary_upto
+
+    def set_summary(self, session_id: str, summary: str, upto: int) -> None:
+        s = self.get_session(session_id)
+        if not s:
+            raise KeyError("session not found")
+        s.summary = summary
+        s.summary_upto = upto
+        self._sessions.touch(session_id)
+
+    def stats(self) -> Dict[str, int]:
+        return self._sessions.stats()
+
+    def close(self) -> None:
+        self._sessions.close()
+        if self._segment_dir is not None:
+            shutil.rmtree(self._segment_dir, ignore_errors=True)
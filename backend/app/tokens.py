@@ -0,0 +1,17 @@
+try:  # tiktoken is optional; fall back to the ~4 chars/token heuristic.
+    import tiktoken
+
+    _ENCODING = tiktoken.get_encoding("o200k_base")
+except Exception:  # pragma: no cover - depends on the environment
+    _ENCODING = None
+
+# Chat-format framing the API adds around every message.
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
@@ -0,0 +1,103 @@
+"""Measure fuzzy concept-dedup lookups as graphs grow.
+
+Builds graphs of synthetic multi-word concept labels (a React-flavoured
+vocabulary, so common words like "state" recur across many concepts) and
+times `SimilarityIndex.best_match` for near-duplicate and unrelated probes,
+against a brute-force scan that scores every indexed concept.
+
+Usage (from backend/):
+    python benchmarks/dedup_bench.py --sizes 250 1000 5000
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("LLM_STUB", "true")  # app.config insists on a key otherwise
+
+from app.concept_graph.similarity import SimilarityIndex, _jaccard, concept_words, label_features  # noqa: E402
+
+VOCABULARY = (
+    "state props effect context reducer ref memo callback component render list key filter form input "
+    "event handler hook server client suspense transition query cache route layout error boundary portal "
+    "fragment children tree update batch snapshot store subscription cleanup dependency identity purity"
+).split()
+
+
+def _labels(count: int, rng: random.Random) -> List[str]:
+    vocabulary = VOCABULARY + [f"term{idx}" for idx in range(count // 2)]
+    labels = set()
+    while len(labels) < count:
+        labels.add(" ".join(rng.sample(vocabulary, rng.choice((2, 2, 3)))).title())
+    return sorted(labels)
+
+
+def _brute_force(index: SimilarityIndex, label: str, threshold: float) -> float:
+    words = concept_words(label)
+    features = label_features(words)
+    best = 0.0
+    for entries in index._entries.values():
+        for entry_features, entry_words in entries:
+            if _jaccard(frozenset(words), entry_words) >= 0.5:
+                best = max(best, _jaccard(features, entry_features))
+    return best if best >= threshold else 0.0
+
+
+def _time(fn, probes: List[str]) -> Dict[str, float]:
+    samples = []
+    for probe in probes:
+        started = time.perf_counter()
+        fn(probe)
+        samples.append(time.perf_counter() - started)
+    ordered = sorted(samples)
+    return {
+        "p50_us": round(statistics.median(samples) * 1e6, 1),
+        "p95_us": round(ordered[int(0.95 * (len(ordered) - 1))] * 1e6, 1),
+    }
+
+
+def run(size: int, probes: int, threshold: float, seed: int) -> Dict[str, object]:
+    rng = random.Random(seed)
+    labels = _labels(size, rng)
+    index = SimilarityIndex()
+    for idx, label in enumerate(labels):
+        index.add(f"c{idx}", [label])
+    # Near duplicates: pluralize or reorder an indexed label; unrelated: unseen word pairs.
+    near = [" ".join(reversed(label.split())) + "s" for label in rng.sample(labels, min(probes, len(labels)))]
+    unrelated = [f"Novel{idx} Concept{idx}" for idx in range(probes)]
+    matched = sum(1 for probe in near if index.best_match([probe], threshold=threshold))
+    # Prefix filtering must not lose matches: the best score equals a full scan's.
+    agree = sum(
+        1
+        for probe in near + unrelated
+        if abs((index.best_match([probe], threshold=threshold) or ("", 0.0))[1] - _brute_force(index, probe, threshold))
+        < 1e-9
+    )
+    return {
+        "concepts": size,
+        "near_duplicates_matched": f"{matched}/{len(near)}",
+        "agrees_with_brute_force": f"{agree}/{len(near) + len(unrelated)}",
+        "index_near": _time(lambda probe: index.best_match([probe], threshold=threshold), near),
+        "index_unrelated": _time(lambda probe: index.best_match([probe], threshold=threshold), unrelated),
+        "brute_force_near": _time(lambda probe: _brute_force(index, probe, threshold), near),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[250, 1000, 5000])
+    parser.add_argument("--probes", type=int, default=200)
+    parser.add_argument("--threshold", type=float, default=0.65)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    print(json.dumps([run(size, args.probes, args.threshold, args.seed) for size in args.sizes], indent=2))
+
+
+if __name__ == "__main__":
+    main()
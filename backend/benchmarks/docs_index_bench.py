@@ -0,0 +1,115 @@
+"""Measure the react.dev BM25 index: build and reindex time, query latency and prompt size.
+
+Reindexing edits one page in a scratch copy of the docs tree and times the
+incremental sync against a full rebuild. Prompt size compares the static
+`context.txt` blob that used to be pasted into every prompt with the top-k
+chunks retrieved for a set of typical questions.
+
+Usage (from backend/):
+    python benchmarks/docs_index_bench.py --repeat 50
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("LLM_STUB", "true")  # app.config insists on a key otherwise
+
+from app.context_builder import count_tokens  # noqa: E402
+from app.context_loader import DocsRetriever, load_context_provider  # noqa: E402
+from app.docs_index import DocsIndexWriter, SegmentedIndex  # noqa: E402
+
+QUERIES = [
+    "How do I share state between sibling components?",
+    "When should I use useReducer instead of useState?",
+    "How do I clean up a subscription in useEffect?",
+    "Why does my component render twice in Strict Mode?",
+    "How do I pass data deeply without prop drilling?",
+    "What is the difference between controlled and uncontrolled inputs?",
+    "How do I avoid recreating objects on every render with useMemo?",
+    "How do I reset state when a prop changes?",
+    "How can I fetch data on the server with Server Components?",
+    "Why should list items have a key?",
+]
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", default="../react.dev/src/content")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("-k", type=int, default=4)
+    parser.add_argument("--token-budget", type=int, default=1200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / "content"
+        shutil.copytree(args.source, source)
+        root = Path(tmp) / "index"
+        writer = DocsIndexWriter(root, source)
+        build = writer.rebuild()
+
+        edited = source / "learn" / "managing-state.md"
+        edited.write_text(edited.read_text(encoding="utf-8") + "\n\nOne more paragraph about lifting state up.\n")
+        reindex = writer.sync()
+        started = time.perf_counter()
+        writer.merge()
+        merge_seconds = time.perf_counter() - started
+        noop = writer.sync()
+
+        started = time.perf_counter()
+        index = SegmentedIndex.open(root)
+        open_ms = (time.perf_counter() - started) * 1000
+        index_stats = index.stats()
+
+        samples: List[float] = []
+        for _ in range(args.repeat):
+            for query in QUERIES:
+                started = time.perf_counter()
+                for _, key in index.search(query, args.k):
+                    index.chunk(key)
+                samples.append(time.perf_counter() - started)
+        index.close()
+
+        provider = load_context_provider()
+        static = provider.current().text
+        retriever = DocsRetriever(root, fallback=provider, top_k=args.k, token_budget=args.token_budget)
+        retrieved_tokens = [count_tokens(retriever.context_for(q).text) for q in QUERIES]
+
+    static_tokens = count_tokens(static)
+    mean_retrieved = statistics.fmean(retrieved_tokens)
+    report: Dict[str, object] = {
+        "index": index_stats,
+        "full_build_seconds": build["seconds"],
+        "one_file_reindex_seconds": reindex["seconds"],
+        "noop_sync_seconds": noop["seconds"],
+        "merge_seconds": round(merge_seconds, 4),
+        "open_ms": round(open_ms, 3),
+        "query_ms": {
+            "p50": round(_percentile(samples, 50) * 1000, 3),
+            "p95": round(_percentile(samples, 95) * 1000, 3),
+            "p99": round(_percentile(samples, 99) * 1000, 3),
+        },
+        "prompt_tokens": {
+            "static_context": static_tokens,
+            "retrieved_mean": round(mean_retrieved, 1),
+            "retrieved_max": max(retrieved_tokens),
+            "change": f"{(mean_retrieved - static_tokens) / static_tokens:+.1%}" if static_tokens else "n/a",
+        },
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Wall-clock time of a full concept extraction over a long transcript, single call vs map-reduce.
+
+Runs `ConceptExtractor.extract` against the in-process LLM stub. Each stub
+call pays time-to-first-token, prompt prefill at `--stub-prefill-tokens-per-second`
+and output at `--stub-tokens-per-second`, so a single call over the whole
+transcript pays the full prefill serially while windows overlap it under the
+concurrency cap.
+
+Usage (from backend/):
+    python benchmarks/extraction_bench.py --messages 200 --concurrency 1 4 8
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("LLM_STUB", "true")  # app.config insists on a key otherwise
+
+_TURNS = [
+    "How should I split this dashboard into components so each widget owns its own state?",
+    "Lift the shared filter state to the closest common parent and pass it down as props; each widget keeps "
+    "only local UI state such as whether its menu is open. Derive totals during render instead of storing them.",
+    "When I fetch data in an effect, how do I avoid race conditions when the filter changes quickly?",
+    "Track an ignore flag in the effect cleanup so stale responses are dropped, or move fetching into a "
+    "framework data loader. Keep the request keyed by the filter value so React can reset state when it changes.",
+]
+
+
+def _transcript(count: int):
+    from app.message_record import MessageRecord
+
+    return [
+        MessageRecord.create("user" if idx % 2 == 0 else "assistant", _TURNS[idx % len(_TURNS)] * 2)
+        for idx in range(count)
+    ]
+
+
+async def _timed(extractor, messages) -> Dict[str, Any]:
+    started = time.perf_counter()
+    result = await extractor.extract(session_id="bench", messages=messages, start_index=0, use_cache=False)
+    return {
+        "seconds": round(time.perf_counter() - started, 3),
+        "windows": len(extractor._windows(messages, 0)),
+        "concepts": len(result.concepts),
+    }
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    import httpx
+
+    from app.concept_graph.extractor import ConceptExtractor
+    from app.llm_stub import StubSettings, StubTransport
+    from app.openai_client import OpenAIClient
+
+    settings = StubSettings(
+        latency_ms=args.stub_latency_ms,
+        latency_p95_ms=args.stub_latency_ms * 1.2,
+        tokens_per_second=args.stub_tokens_per_second,
+        prefill_tokens_per_second=args.stub_prefill_tokens_per_second,
+        seed=3,
+    )
+    llm = OpenAIClient(http_client=httpx.AsyncClient(transport=StubTransport(settings)))
+    messages = _transcript(args.messages)
+    report: Dict[str, Any] = {
+        "messages": len(messages),
+        "single_call": await _timed(ConceptExtractor(llm, window_tokens=10**9), messages),
+    }
+    for concurrency in args.concurrency:
+        extractor = ConceptExtractor(
+            llm,
+            window_tokens=args.window_tokens,
+            overlap_tokens=args.overlap_tokens,
+            window_concurrency=concurrency,
+        )
+        report[f"windowed_concurrency_{concurrency}"] = await _timed(extractor, messages)
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--window-tokens", type=int, default=3000)
+    parser.add_argument("--overlap-tokens", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--stub-latency-ms", type=float, default=400.0)
+    parser.add_argument("--stub-tokens-per-second", type=float, default=80.0)
+    parser.add_argument("--stub-prefill-tokens-per-second", type=float, default=1000.0)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
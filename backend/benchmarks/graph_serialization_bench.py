@@ -0,0 +1,118 @@
+"""Measure GET /concept-graph serialization on large synthetic graphs.
+
+`legacy` is the previous response path: sort every concept and edge, build
+the dicts, validate them into `ConceptGraphResponse` and encode the model.
+`to_json` encodes from the graph's cached per-item fragments, either
+unchanged since the last call (`warm`), after one concept changed
+(`one_change`), or as a `since=` delta covering that change.
+
+Usage (from backend/):
+    python benchmarks/graph_serialization_bench.py --sizes 1000 5000 10000
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("LLM_STUB", "true")  # app.config insists on a key otherwise
+
+from app.concept_graph.models import ConceptGraph  # noqa: E402
+from app.models import ConceptGraphResponse  # noqa: E402
+
+
+def _build_graph(size: int) -> ConceptGraph:
+    graph = ConceptGraph()
+    graph.merge(
+        concepts=[
+            {
+                "label": f"Concept {idx}",
+                "type": "concept",
+                "aliases": [f"alias {idx}"],
+                "summary": "A short learner-facing summary of the idea.",
+                "first_seen_index": (idx * 37) % 500,
+                "last_seen_index": (idx * 37) % 500 + 1,
+                "expansions": ["Parents own the state and pass callbacks down to children."],
+            }
+            for idx in range(size)
+        ],
+        edges=[],
+    )
+    ids = list(graph.concepts)
+    graph.merge(
+        concepts=[],
+        edges=[
+            {
+                "from_concept_id": ids[idx % size],
+                "to_concept_id": ids[(idx * 7 + idx // size + 1) % size],
+                "relation": "enables" if idx % 2 else "refines",
+                "introduced_index": (idx * 13) % 500,
+            }
+            for idx in range(size * 2)
+        ],
+    )
+    return graph
+
+
+def _legacy(graph: ConceptGraph) -> bytes:
+    concepts = sorted(graph.concepts.values(), key=lambda c: (c.first_seen_index, c.label))
+    edges = sorted(graph.edges.values(), key=lambda e: (e.introduced_index, e.id))
+    data = {
+        "concepts": [node.to_dict() for node in concepts],
+        "edges": [edge.to_dict() for edge in edges],
+        "meta": graph.meta.to_dict(),
+    }
+    return ConceptGraphResponse(**data).model_dump_json().encode("utf-8")
+
+
+def _time(fn: Callable[[], object], repeat: int, setup: Callable[[], None] = lambda: None) -> Dict[str, float]:
+    samples: List[float] = []
+    for _ in range(repeat):
+        setup()
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return {
+        "p50_ms": round(statistics.median(samples) * 1000, 3),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 3),
+    }
+
+
+def run(size: int, repeat: int) -> Dict[str, object]:
+    graph = _build_graph(size)
+    target = next(iter(graph.concepts))
+    since = graph.meta.revision
+
+    def change_one() -> None:
+        nonlocal since
+        since = graph.meta.revision
+        graph.apply_focus(target, weight=None, expansion=f"Detail {time.perf_counter_ns()} about ownership")
+
+    graph.to_json()
+    return {
+        "concepts": len(graph.concepts),
+        "edges": len(graph.edges),
+        "bytes": len(graph.to_json()),
+        "legacy": _time(lambda: _legacy(graph), repeat),
+        "to_dict": _time(graph.to_dict, repeat),
+        "to_json_warm": _time(graph.to_json, repeat),
+        "to_json_one_change": _time(graph.to_json, repeat, setup=change_one),
+        "to_json_delta": _time(lambda: graph.to_json(since=since), repeat, setup=change_one),
+        "delta_bytes": len(graph.to_json(since=since)),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 10000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    print(json.dumps({str(size): run(size, args.repeat) for size in args.sizes}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+"""End-to-end load test of the /v1/chat API against the in-process LLM stub.
+
+Drives `main.app` through full session lifecycles (create, chat turns, concept
+graph build, expand, declutter, goal init/refine) and reports throughput,
+per-route latency percentiles, event-loop lag and memory per session, plus
+micro-benchmarks of the graph and goal hot paths.
+
+Usage (from backend/):
+    python benchmarks/load_test.py --sessions 200 --concurrency 20
+    python benchmarks/load_test.py --save-baseline benchmarks/baselines/load_test.json
+    python benchmarks/load_test.py --compare benchmarks/baselines/load_test.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+_LIFECYCLE_PROMPTS = [
+    "I want to build a todo list where items can be filtered and edited inline.",
+    "How should I keep the filter state and the list state in sync?",
+    "When would useReducer be better than several useState calls here?",
+    "How do I persist the todos with an effect without causing extra renders?",
+]
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def _latency_summary(samples: List[float]) -> Dict[str, float]:
+    return {
+        "count": len(samples),
+        "p50_ms": round(_percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(_percentile(samples, 95) * 1000, 3),
+        "p99_ms": round(_percentile(samples, 99) * 1000, 3),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 3) if samples else 0.0,
+    }
+
+
+class _Recorder:
+    def __init__(self) -> None:
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    async def call(self, client, route: str, method: str, url: str, **kwargs: Any):
+        started = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        self.latencies[route].append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            self.errors[route] += 1
+        return response
+
+
+async def _session_lifecycle(client, recorder: _Recorder, turns: int) -> None:
+    created = await recorder.call(client, "POST /sessions", "POST", "/v1/chat/sessions")
+    sid = created.json()["session_id"]
+    base = f"/v1/chat/sessions/{sid}"
+    for idx in range(turns):
+        prompt = _LIFECYCLE_PROMPTS[idx % len(_LIFECYCLE_PROMPTS)]
+        await recorder.call(client, "POST generate", "POST", f"{base}/generate", json={"content": prompt})
+    graph = await recorder.call(
+        client, "POST concept-graph/build", "POST", f"{base}/concept-graph/build", json={"mode": "incremental"}
+    )
+    await recorder.call(client, "POST goal", "POST", f"{base}/goal", json={"force": False})
+    concepts = [c for c in graph.json().get("concepts", []) if c.get("type") != "intent"]
+    for concept in concepts[:2]:
+        expand_url = f"{base}/concept-graph/{concept['id']}/expand"
+        for text in (
+            "Explain how the parent owns this state: children only receive props and callbacks",
+            "Show where the effect synchronises with storage - and why it must clean up",
+        ):
+            await recorder.call(
+                client, "POST expand", "POST", expand_url, json={"expansion": text, "auto_refine": True}
+            )
+    if concepts:
+        await recorder.call(
+            client,
+            "POST declutter",
+            "POST",
+            f"{base}/concept-graph/{concepts[0]['id']}/declutter",
+            json={"force_children": True},
+        )
+    await recorder.call(client, "GET concept-graph", "GET", f"{base}/concept-graph")
+    await recorder.call(client, "GET goal", "GET", f"{base}/goal")
+
+
+async def _measure_loop_lag(stop: asyncio.Event, samples: List[float], interval: float = 0.01) -> None:
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, loop.time() - expected))
+
+
+async def run_load(args: argparse.Namespace) -> Dict[str, Any]:
+    import httpx
+
+    import main
+
+    recorder = _Recorder()
+    lag_samples: List[float] = []
+    stop = asyncio.Event()
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def bounded(client) -> None:
+        async with semaphore:
+            await _session_lifecycle(client, recorder, args.turns)
+
+    tracemalloc.start()
+    baseline_mem, _ = tracemalloc.get_traced_memory()
+    lag_task = asyncio.ensure_future(_measure_loop_lag(stop, lag_samples))
+    transport = httpx.ASGITransport(app=main.app)
+    started = time.perf_counter()
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        await asyncio.gather(*(bounded(client) for _ in range(args.sessions)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await lag_task
+    current_mem, peak_mem = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    total_requests = sum(len(samples) for samples in recorder.latencies.values())
+    return {
+        "sessions": args.sessions,
+        "wall_seconds": round(elapsed, 3),
+        "requests": total_requests,
+        "throughput_rps": round(total_requests / elapsed, 2) if elapsed else 0.0,
+        "routes": {route: _latency_summary(samples) for route, samples in sorted(recorder.latencies.items())},
+        "errors": dict(recorder.errors),
+        "event_loop_lag": _latency_summary(lag_samples),
+        "memory": {
+            "retained_bytes_per_session": int((current_mem - baseline_mem) / max(1, args.sessions)),
+            "peak_bytes": peak_mem,
+        },
+        "llm_stub_requests": main.llm_http_client._transport.responder.requests,
+    }
+
+
+def _time_call(fn, repeat: int) -> Dict[str, float]:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return _latency_summary(samples)
+
+
+def _synthetic_concepts(count: int, offset: int = 0) -> List[Dict[str, object]]:
+    return [
+        {
+            "label": f"Concept {offset + idx}",
+            "type": "concept",
+            "aliases": [f"alias {offset + idx}"],
+            "summary": "A short learner-facing summary of the idea.",
+            "first_seen_index": idx % 50,
+            "last_seen_index": idx % 50 + 1,
+        }
+        for idx in range(count)
+    ]
+
+
+def run_micro(args: argparse.Namespace) -> Dict[str, Any]:
+    import httpx
+
+    from app.concept_graph import ConceptGraphService
+    from app.concept_graph.models import ConceptGraph
+    from app.goal_node import GoalNodeService
+    from app.goal_node.models import GoalNode
+    from app.llm_stub import StubSettings, StubTransport
+    from app.message_record import MessageRecord
+    from app.openai_client import OpenAIClient
+    from app.store import InMemoryChatStore
+
+    results: Dict[str, Any] = {}
+    size = args.graph_size
+    batch = _synthetic_concepts(size)
+
+    def merge_fresh() -> None:
+        ConceptGraph().merge(concepts=batch, edges=[])
+
+    results[f"ConceptGraph.merge[{size}]"] = _time_call(merge_fresh, args.repeat)
+
+    graph = ConceptGraph()
+    graph.merge(concepts=batch, edges=[])
+    ids = list(graph.concepts)
+    edges = [
+        {"from_concept_id": ids[i], "to_concept_id": ids[(i * 7 + 1) % size], "relation": "enables"}
+        for i in range(size)
+    ]
+    graph.merge(concepts=[], edges=edges)
+    results[f"ConceptGraph.to_dict[{size}]"] = _time_call(graph.to_dict, args.repeat)
+
+    llm = OpenAIClient(
+        http_client=httpx.AsyncClient(
+            transport=StubTransport(StubSettings(latency_ms=0, tokens_per_second=0, seed=1))
+        )
+    )
+    store = InMemoryChatStore()
+    graphs = ConceptGraphService(store=store, llm=llm)
+    goals = GoalNodeService(store=store, concept_graphs=graphs, llm=llm)
+    sid = store.create_session()
+    store.append(sid, MessageRecord.create("user", _LIFECYCLE_PROMPTS[0]))
+    graphs._graphs.upsert(sid, graph)
+    targets = ids[:2]
+
+    async def refine_many() -> List[float]:
+        samples = []
+        for _ in range(args.repeat):
+            goal = GoalNode(session_id=sid, goal_statement="Plan", answer_markdown="Plan the UI.")
+            # Refinement checks the stored goal's revision before applying its patch.
+            goals._store.upsert(sid, goal)
+            started = time.perf_counter()
+            await goals._refine_goal(goal, targets)
+            samples.append(time.perf_counter() - started)
+        return samples
+
+    results[f"GoalNodeService._refine_goal[{size}]"] = _latency_summary(asyncio.run(refine_many()))
+    return results
+
+
+def _compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    lines: List[str] = []
+
+    def walk(cur: Any, base: Any, path: str) -> None:
+        if isinstance(cur, dict) and isinstance(base, dict):
+            for key in sorted(set(cur) & set(base)):
+                walk(cur[key], base[key], f"{path}.{key}" if path else key)
+            return
+        if not isinstance(cur, (int, float)) or not isinstance(base, (int, float)):
+            return
+        if not (path.endswith("_ms") or path.endswith("bytes_per_session") or path.endswith("throughput_rps")):
+            return
+        if base == 0:
+            return
+        change = (cur - base) / base
+        worse = -change if path.endswith("throughput_rps") else change
+        marker = "REGRESSION" if worse > threshold else ""
+        lines.append(f"{path:<70} {base:>12.3f} -> {cur:>12.3f} {change:+8.1%} {marker}")
+
+    walk(current, baseline, "")
+    return lines
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--stub-latency-ms", type=float, default=50.0)
+    parser.add_argument("--stub-latency-p95-ms", type=float, default=150.0)
+    parser.add_argument("--stub-tokens-per-second", type=float, default=2000.0)
+    parser.add_argument("--graph-size", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--save-baseline", default="")
+    parser.add_argument("--compare", default="")
+    parser.add_argument("--threshold", type=float, default=0.15, help="relative change flagged as regression")
+    args = parser.parse_args()
+
+    os.environ["LLM_STUB"] = "true"
+    os.environ["LLM_STUB_SEED"] = "7"
+    os.environ["LLM_STUB_LATENCY_MS"] = str(args.stub_latency_ms)
+    os.environ["LLM_STUB_LATENCY_P95_MS"] = str(args.stub_latency_p95_ms)
+    os.environ["LLM_STUB_TOKENS_PER_SECOND"] = str(args.stub_tokens_per_second)
+    os.environ.setdefault("STORE_SPILL_DIR", "")
+
+    report = {
+        "python": platform.python_version(),
+        "load": asyncio.run(run_load(args)),
+        "micro": run_micro(args),
+    }
+    print(json.dumps(report, indent=2))
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        print("\nDiff against", args.compare)
+        for line in _compare(report, baseline, args.threshold):
+            print(line)
+    if args.save_baseline:
+        target = Path(args.save_baseline)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Measure resident bytes per stored message, concept and edge.
+
+`before` rebuilds the previous representations: pydantic `ChatMessage`
+objects with a UUID string id, and `__dict__`-backed concept/edge
+dataclasses whose type/relation strings arrive as separate copies (as
+they do from parsed LLM JSON). `after` uses `MessageRecord` and the
+slotted, interned `ConceptNode`/`ConceptEdge`. Message contents and labels
+are allocated up front, so the numbers are per-object overhead.
+
+Usage (from backend/):
+    python benchmarks/memory_bench.py --count 20000
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from pydantic import PrivateAttr
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("LLM_STUB", "true")  # app.config insists on a key otherwise
+
+from app.concept_graph.models import ConceptEdge, ConceptNode  # noqa: E402
+from app.message_record import MessageRecord  # noqa: E402
+from app.models import ChatMessage  # noqa: E402
+
+
+class _LegacyChatMessage(ChatMessage):
+    _token_count: Optional[int] = PrivateAttr(default=None)
+
+
+@dataclass
+class _LegacyConceptNode:
+    id: str
+    label: str
+    type: str
+    aliases: List[str] = field(default_factory=list)
+    summary: str = ""
+    first_seen_index: int = 0
+    last_seen_index: int = 0
+    weight: float = 0.0
+    expansions: List[str] = field(default_factory=list)
+
+
+@dataclass
+class _LegacyConceptEdge:
+    id: str
+    from_concept_id: str
+    to_concept_id: str
+    relation: str
+    introduced_index: int
+    evidence_msg_id: Optional[str] = None
+    evidence_snippet: Optional[str] = None
+    last_referenced_index: int = 0
+
+
+def _fresh(text: str) -> str:
+    # A new string object with the same value, like a field decoded from JSON.
+    return json.loads(json.dumps(text))
+
+
+def _measure(build: Callable[[], list]) -> int:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return after - before
+
+
+def _legacy_messages(contents: List[str]) -> list:
+    messages = []
+    for idx, text in enumerate(contents):
+        msg = _LegacyChatMessage(role="user" if idx % 2 == 0 else "assistant", content=text)
+        msg._token_count = len(text) // 4
+        messages.append(msg)
+    return messages
+
+
+def _records(contents: List[str]) -> list:
+    records = []
+    for idx, text in enumerate(contents):
+        records.append(MessageRecord.create(_fresh("user" if idx % 2 == 0 else "assistant"), text))
+    return records
+
+
+def _nodes(cls, ids: List[str], labels: List[str]) -> list:
+    return [cls(id=cid, label=label, type=_fresh("concept"), summary=label) for cid, label in zip(ids, labels)]
+
+
+def _edges(cls, ids: List[str]) -> list:
+    size = len(ids)
+    return [
+        cls(
+            id=cid,
+            from_concept_id=cid,
+            to_concept_id=ids[(idx * 7 + 1) % size],
+            relation=_fresh("enables" if idx % 2 else "refines"),
+            introduced_index=idx % 500,
+        )
+        for idx, cid in enumerate(ids)
+    ]
+
+
+def run(count: int) -> Dict[str, Dict[str, float]]:
+    contents = [f"Message {idx}: how do I lift state up between siblings?" for idx in range(count)]
+    ids = [f"concept-{uuid.uuid4().hex[:12]}" for _ in range(count)]
+    labels = [f"Concept {idx}" for idx in range(count)]
+    rows = {
+        "message": (lambda: _legacy_messages(contents), lambda: _records(contents)),
+        "concept": (lambda: _nodes(_LegacyConceptNode, ids, labels), lambda: _nodes(ConceptNode, ids, labels)),
+        "edge": (lambda: _edges(_LegacyConceptEdge, ids), lambda: _edges(ConceptEdge, ids)),
+    }
+    results: Dict[str, Dict[str, float]] = {}
+    for name, (legacy, current) in rows.items():
+        before = _measure(legacy) / count
+        after = _measure(current) / count
+        results[f"bytes_per_{name}"] = {
+            "before": round(before, 1),
+            "after": round(after, 1),
+            "saved_pct": round(100 * (1 - after / before), 1),
+        }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=20000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.count), indent=2))
+
+
+if __name__ == "__main__":
+    main()
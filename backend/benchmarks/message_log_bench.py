@@ -0,0 +1,112 @@
+"""Compare the columnar `MessageLog` with the previous list-of-records transcript.
+
+For transcripts of several lengths it reports resident bytes per message
+(excluding the text itself), the time to take and read a 50-message tail
+(the chat context window), and the time to find the first user message,
+which the list scanned for from the head on every graph build. `--hot`
+additionally spills messages beyond that many to a temporary segment file
+and times a read of the cold head.
+
+Usage (from backend/):
+    python benchmarks/message_log_bench.py --lengths 100 1000 10000 --hot 500
+"""
+import argparse
+import gc
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("LLM_STUB", "true")  # app.config insists on a key otherwise
+
+from app.message_log import MessageLog  # noqa: E402
+from app.message_record import MessageRecord  # noqa: E402
+
+TAIL = 50
+
+
+def _time_us(fn: Callable[[], object], repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return round(statistics.median(samples) * 1e6, 2)
+
+
+def _bytes_per_message(build: Callable[[], object], count: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    held = build()
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del held
+    return round(used / count, 1)
+
+
+def _first_user_scan(messages: List[MessageRecord]) -> Optional[MessageRecord]:
+    return next((m for m in messages if m.role == "user" and m.content.strip()), None)
+
+
+def run(length: int, hot: int, repeat: int) -> Dict[str, object]:
+    # The first half is assistant/system output (e.g. seeded lessons), so the old head scan walks it all.
+    records = [
+        MessageRecord.create("user" if idx >= length // 2 and idx % 2 else "assistant", f"turn {idx} " * 20)
+        for idx in range(length)
+    ]
+    texts = sum(len(r.content.encode("utf-8")) for r in records)
+
+    def build_log(hot_limit: int = 0, segment_dir: Optional[Path] = None) -> MessageLog:
+        log = MessageLog(hot_limit=hot_limit, segment_dir=segment_dir)
+        for record in records:
+            log.append(record)
+        return log
+
+    def copy_list() -> List[MessageRecord]:
+        # Fresh records so the measurement includes what each stored message costs.
+        return [MessageRecord(r.uid, r.role, "".join(r.content), r.ts, r.token_count) for r in records]
+
+    log = build_log()
+    result: Dict[str, object] = {
+        "messages": length,
+        "list_bytes_per_message": round(_bytes_per_message(copy_list, length) - texts / length, 1),
+        "log_bytes_per_message": round(_bytes_per_message(build_log, length) - texts / length, 1),
+        "tail_read_us": {
+            "list": _time_us(lambda: [m.content for m in records[-TAIL:]], repeat),
+            "log": _time_us(lambda: [m.content for m in log.tail(TAIL)], repeat),
+        },
+        "first_user_us": {
+            "list": _time_us(lambda: _first_user_scan(records), repeat),
+            "log": _time_us(log.first_user_message, repeat),
+        },
+    }
+    if hot and length > hot:
+        with tempfile.TemporaryDirectory() as segment_dir:
+            spilled = build_log(hot, Path(segment_dir))
+            result["spilled"] = {
+                "cold_messages": spilled.cold_count,
+                "resident_bytes": spilled.nbytes,
+                "all_in_memory_bytes": log.nbytes,
+                "tail_read_us": _time_us(lambda: [m.content for m in spilled.tail(TAIL)], repeat),
+                "cold_head_read_us": _time_us(lambda: [m.content for m in spilled[:TAIL]], repeat),
+            }
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lengths", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--hot", type=int, default=500, help="hot window for the spill run (0 skips it)")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    print(json.dumps([run(length, args.hot, args.repeat) for length in args.lengths], indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Compare append / tail-read latency of the chat store backends.
+
+Usage (from backend/):
+    python benchmarks/store_bench.py --sessions 10000 --turns 6
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("LLM_STUB", "true")  # app.config insists on a key otherwise
+
+from app.message_record import MessageRecord  # noqa: E402
+from app.sqlite_store import SqliteChatStore  # noqa: E402
+from app.store import ChatStore, InMemoryChatStore  # noqa: E402
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def _summarize(samples: List[float]) -> Dict[str, float]:
+    return {
+        "p50_us": _percentile(samples, 50) * 1e6,
+        "p95_us": _percentile(samples, 95) * 1e6,
+        "p99_us": _percentile(samples, 99) * 1e6,
+        "mean_us": statistics.fmean(samples) * 1e6,
+    }
+
+
+def run(store: ChatStore, *, sessions: int, turns: int, tail: int) -> Dict[str, Dict[str, float]]:
+    session_ids = [store.create_session() for _ in range(sessions)]
+    text = "How do I lift state up between sibling components? " * 4
+
+    append_samples: List[float] = []
+    for turn in range(turns):
+        role = "user" if turn % 2 == 0 else "assistant"
+        for sid in session_ids:
+            msg = MessageRecord.create(role, text)
+            start = time.perf_counter()
+            store.append(sid, msg)
+            append_samples.append(time.perf_counter() - start)
+
+    list_samples: List[float] = []
+    for sid in session_ids:
+        start = time.perf_counter()
+        list(store.list_messages(sid, limit=tail))
+        list_samples.append(time.perf_counter() - start)
+
+    return {"append": _summarize(append_samples), "list_tail": _summarize(list_samples)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=10_000)
+    parser.add_argument("--turns", type=int, default=6)
+    parser.add_argument("--tail", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        backends: Dict[str, Callable[[], ChatStore]] = {
+            "memory": InMemoryChatStore,
+            "sqlite": lambda: SqliteChatStore(os.path.join(tmp, "bench.db")),
+        }
+        for name, factory in backends.items():
+            store = factory()
+            try:
+                result = run(store, sessions=args.sessions, turns=args.turns, tail=args.tail)
+            finally:
+                store.close()
+            for op, stats in result.items():
+                line = " ".join(f"{key}={value:8.1f}" for key, value in stats.items())
+                print(f"{name:<7} {op:<10} {line}")
+
+
+if __name__ == "__main__":
+    main()
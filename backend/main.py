@@ -1,14 +1,56 @@
+import math
+
+import httpx
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 from app.api import build_router
 from app.chat_service import ChatService
+from app.context_loader import load_docs_retriever
 from app.concept_graph import ConceptGraphService
 from app.goal_node import GoalNodeService
 from app.dev_pages import build_dev_router
+from app.llm_admission import AdmissionController, AdmissionRejected
+from app.llm_cache import ResponseCache
+from app.llm_resilience import CircuitBreaker, CircuitOpenError, default_policies
+from app.llm_stub import StubSettings, StubTransport
 from app.openai_client import OpenAIClient
-from app.store import InMemoryChatStore
+from app.session_locks import RevisionConflict, SessionLocks
+from app.single_flight import SingleFlight
+from app.bounded_cache import CacheLimits
+from app.config import (
+    CHAT_STORE_BACKEND,
+    CHAT_STORE_PATH,
+    CONCEPT_GRAPH_AUTO_BUILD,
+    CONCEPT_GRAPH_DEBOUNCE_SECONDS,
+    CONCEPT_GRAPH_MAX_DELAY_SECONDS,
+    LLM_BREAKER_FAILURES,
+    LLM_BREAKER_RESET_SECONDS,
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_MAX_ENTRIES,
+    LLM_CACHE_PATH,
+    LLM_HEDGING,
+    LLM_MAX_CONCURRENCY,
+    LLM_MAX_QUEUE_SECONDS,
+    LLM_REQUESTS_PER_MINUTE,
+    LLM_STUB,
+    LLM_STUB_ERROR_RATE,
+    LLM_STUB_LATENCY_MS,
+    LLM_STUB_LATENCY_P95_MS,
+    LLM_STUB_PREFILL_TOKENS_PER_SECOND,
+    LLM_STUB_SCRIPT,
+    LLM_STUB_SEED,
+    LLM_STUB_TOKENS_PER_SECOND,
+    LLM_TOKENS_PER_MINUTE,
+    STORE_IDLE_TTL_SECONDS,
+    STORE_MAX_BYTES,
+    STORE_MAX_SESSIONS,
+    STORE_SPILL_DIR,
+)
+from app.sqlite_store import SqliteChatStore
+from app.store import ChatStore, InMemoryChatStore
 
 app = FastAPI(title="Chat Backend API", version="1.0.0")
 
@@ -25,18 +67,125 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-store = InMemoryChatStore()
-llm = OpenAIClient()
+limits = CacheLimits(
+    max_items=STORE_MAX_SESSIONS,
+    max_bytes=STORE_MAX_BYTES,
+    idle_ttl=STORE_IDLE_TTL_SECONDS,
+    spill_dir=STORE_SPILL_DIR or None,
+)
+
+store: ChatStore
+if CHAT_STORE_BACKEND == "sqlite":
+    store = SqliteChatStore(CHAT_STORE_PATH)
+else:
+    store = InMemoryChatStore(limits)
+response_cache = None
+if LLM_CACHE_ENABLED:
+    response_cache = ResponseCache(max_entries=LLM_CACHE_MAX_ENTRIES, disk_path=LLM_CACHE_PATH or None)
+admission = AdmissionController(
+    max_concurrency=LLM_MAX_CONCURRENCY,
+    requests_per_minute=LLM_REQUESTS_PER_MINUTE,
+    tokens_per_minute=LLM_TOKENS_PER_MINUTE,
+    max_queue_seconds=LLM_MAX_QUEUE_SECONDS,
+)
+llm_http_client = None
+if LLM_STUB:
+    stub_settings = StubSettings(
+        latency_ms=LLM_STUB_LATENCY_MS,
+        latency_p95_ms=LLM_STUB_LATENCY_P95_MS,
+        tokens_per_second=LLM_STUB_TOKENS_PER_SECOND,
+        prefill_tokens_per_second=LLM_STUB_PREFILL_TOKENS_PER_SECOND,
+        error_rate=LLM_STUB_ERROR_RATE,
+        seed=LLM_STUB_SEED,
+        scripts=StubSettings.load_scripts(LLM_STUB_SCRIPT),
+    )
+    llm_http_client = httpx.AsyncClient(transport=StubTransport(stub_settings))
+llm = OpenAIClient(
+    cache=response_cache,
+    admission=admission,
+    policies=default_policies(hedging=LLM_HEDGING),
+    breaker=CircuitBreaker(
+        failure_threshold=LLM_BREAKER_FAILURES,
+        reset_timeout=LLM_BREAKER_RESET_SECONDS,
+    ),
+    http_client=llm_http_client,
+)
+flights = SingleFlight()
+session_locks = SessionLocks()
 chat = ChatService(store=store, llm=llm)
-concept_graphs = ConceptGraphService(store=store, llm=llm)
-goal_nodes = GoalNodeService(store=store, concept_graphs=concept_graphs, llm=llm)
+concept_graphs = ConceptGraphService(
+    store=store,
+    llm=llm,
+    limits=limits,
+    flights=flights,
+    locks=session_locks,
+)
+if CONCEPT_GRAPH_AUTO_BUILD:
+    concept_graphs.enable_auto_build(
+        debounce=CONCEPT_GRAPH_DEBOUNCE_SECONDS,
+        max_delay=CONCEPT_GRAPH_MAX_DELAY_SECONDS,
+    )
+    chat.add_message_listener(concept_graphs.schedule_build)
+goal_nodes = GoalNodeService(
+    store=store,
+    concept_graphs=concept_graphs,
+    llm=llm,
+    limits=limits,
+    flights=flights,
+    locks=session_locks,
+)
 
-app.include_router(build_router(chat, concept_graphs, goal_nodes))
+app.include_router(build_router(chat, concept_graphs, goal_nodes, session_locks))
 app.include_router(build_dev_router())
 
+def _llm_unavailable(detail: str, retry_after: float) -> JSONResponse:
+    return JSONResponse(
+        status_code=503,
+        content={"detail": detail},
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+@app.exception_handler(AdmissionRejected)
+async def llm_overloaded(request: Request, exc: AdmissionRejected):
+    return _llm_unavailable("LLM capacity exhausted, retry later", exc.waited)
+
+@app.exception_handler(CircuitOpenError)
+async def llm_circuit_open(request: Request, exc: CircuitOpenError):
+    return _llm_unavailable("LLM upstream degraded, retry later", exc.retry_after)
+
+@app.exception_handler(RevisionConflict)
+async def revision_conflict(request: Request, exc: RevisionConflict):
+    return JSONResponse(status_code=409, content={"detail": str(exc)})
+
+@app.on_event("shutdown")
+def close_store():
+    chat.close()
+    concept_graphs.close()
+    goal_nodes.close()
+    store.close()
+    if response_cache is not None:
+        response_cache.close()
+
 @app.get("/health")
 def health():
     return {"ok": True}
 
+@app.get("/metrics")
+def metrics():
+    return {
+        "chat_store": store.stats(),
+        "chat_context": chat.context_stats(),
+        "docs_index": load_docs_retriever().stats(),
+        "concept_graph_store": concept_graphs.store_stats(),
+        "concept_graph_builds": concept_graphs.scheduler_stats(),
+        "goal_node_store": goal_nodes.store_stats(),
+        "goal_refinement_jobs": goal_nodes.job_stats(),
+        "llm_cache": llm.cache_stats(),
+        "llm_admission": llm.admission_stats(),
+        "llm_resilience": llm.resilience_stats(),
+        "single_flight": flights.stats(),
+        "session_locks": session_locks.stats(),
+    }
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
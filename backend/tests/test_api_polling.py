@@ -0,0 +1,55 @@
+import httpx
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import build_router
+from app.chat_service import ChatService
+from app.concept_graph import ConceptGraphService
+from app.goal_node import GoalNodeService
+from app.llm_stub import StubSettings, StubTransport
+from app.message_record import MessageRecord
+from app.openai_client import OpenAIClient
+from app.session_locks import SessionLocks
+from app.store import InMemoryChatStore
+
+
+def _client():
+    settings = StubSettings(latency_ms=0, latency_p95_ms=0, tokens_per_second=0, seed=1)
+    llm = OpenAIClient(http_client=httpx.AsyncClient(transport=StubTransport(settings)))
+    store = InMemoryChatStore()
+    locks = SessionLocks()
+    graphs = ConceptGraphService(store=store, llm=llm, locks=locks)
+    goals = GoalNodeService(store=store, concept_graphs=graphs, llm=llm, locks=locks)
+    app = FastAPI()
+    app.include_router(build_router(ChatService(store=store, llm=llm), graphs, goals, locks))
+    session_id = store.create_session()
+    store.append(session_id, MessageRecord.create("user", "How do useState and props work together?"))
+    return TestClient(app), f"/v1/chat/sessions/{session_id}"
+
+
+def test_graph_polls_get_304_until_a_build_changes_the_graph():
+    client, base = _client()
+    first = client.get(f"{base}/concept-graph")
+    etag = first.headers["etag"]
+    assert first.status_code == 200 and first.headers["cache-control"] == "no-cache"
+
+    unchanged = client.get(f"{base}/concept-graph", headers={"If-None-Match": etag})
+    assert unchanged.status_code == 304 and unchanged.headers["etag"] == etag and not unchanged.content
+    strong = etag.removeprefix("W/")
+    assert client.get(f"{base}/concept-graph", headers={"If-None-Match": f'"other", {strong}'}).status_code == 304
+
+    assert client.post(f"{base}/concept-graph/build", json={"mode": "full"}).status_code == 200
+    changed = client.get(f"{base}/concept-graph", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
+    assert changed.json()["concepts"]
+
+
+def test_goal_polls_get_304_while_the_goal_is_unchanged():
+    client, base = _client()
+    first = client.get(f"{base}/goal")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+
+    assert client.get(f"{base}/goal", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get(f"{base}/goal", headers={"If-None-Match": "*"}).status_code == 304
+    assert client.get(f"{base}/goal", headers={"If-None-Match": 'W/"goal-stale"'}).status_code == 200
@@ -0,0 +1,55 @@
+import time
+
+from app.bounded_cache import CacheLimits, SpillingLRUCache
+
+
+def _cache(tmp_path, **limits) -> SpillingLRUCache:
+    return SpillingLRUCache("test", limits=CacheLimits(spill_dir=str(tmp_path), **limits))
+
+
+def _wait_for_writes(cache: SpillingLRUCache) -> None:
+    deadline = time.monotonic() + 5
+    while cache.stats()["pending_writes"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_evicted_values_reload_from_disk(tmp_path):
+    cache = _cache(tmp_path, max_items=2)
+    for idx in range(5):
+        cache.put(f"k{idx}", {"idx": idx, "payload": "x" * 100})
+    _wait_for_writes(cache)
+
+    assert cache.stats()["resident"] == 2 and cache.stats()["spilled"] == 3
+    assert cache.stats()["pending_writes"] == 0  # served from disk from here on
+    assert list(cache._spill_root.glob("*.bin"))
+
+    assert cache.get("k0") == {"idx": 0, "payload": "x" * 100}
+    assert cache.reloads == 1 and len(cache) == 5
+    cache.close()
+    assert not cache._spill_root.exists()
+
+
+def test_replacing_a_spilled_key_never_resurrects_the_old_value(tmp_path):
+    cache = _cache(tmp_path, max_items=1)
+    cache.put("a", "old")
+    cache.put("b", "filler")  # spills "a"
+    cache.put("a", "new")
+
+    assert cache.get("a") == "new"
+    cache.put("c", "filler")
+    cache.put("d", "filler")  # spills "a" again, then reads it back
+    assert cache.get("a") == "new"
+    cache.close()
+
+
+def test_idle_entries_expire_to_disk(tmp_path, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("app.bounded_cache.time.time", lambda: clock[0])
+    cache = _cache(tmp_path, idle_ttl=10)
+    cache.put("idle", [1, 2, 3])
+    clock[0] += 60
+    cache.put("fresh", [4])
+
+    assert cache.stats()["spilled"] == 1
+    assert cache.get("idle") == [1, 2, 3]
+    cache.close()
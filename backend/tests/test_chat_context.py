@@ -0,0 +1,53 @@
+import pytest
+
+from app.context_builder import ContextBuilder, message_tokens
+from app.message_record import MessageRecord
+from app.sqlite_store import SqliteChatStore
+from app.store import InMemoryChatStore
+
+
+def _turns(count: int):
+    return [MessageRecord.create("user" if idx % 2 == 0 else "assistant", f"turn {idx} " * 20) for idx in range(count)]
+
+
+def test_pack_keeps_the_newest_turns_within_budget():
+    window = _turns(20)
+    per_turn = message_tokens(window[0])
+    builder = ContextBuilder(default_budget=per_turn * 5 + 40)
+
+    packed = builder.pack(model="any", system_parts=["You are a tutor."], window=window, summary="Earlier: props.")
+
+    assert packed.tokens <= builder.budget_for("any")
+    assert packed.summary_used and packed.first_kept > 0
+    assert [m["content"] for m in packed.messages[2:]] == [m.content for m in window[packed.first_kept :]]
+    assert packed.messages[1]["content"].endswith("Earlier: props.")
+
+
+def test_pack_always_keeps_the_newest_message():
+    window = _turns(3)
+    packed = ContextBuilder(default_budget=1).pack(model="any", system_parts=[], window=window)
+
+    assert packed.first_kept == 2 and len(packed.messages) == 1
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    store = InMemoryChatStore() if request.param == "memory" else SqliteChatStore(str(tmp_path / "chat.db"))
+    yield store
+    store.close()
+
+
+def test_ranged_reads_match_slices(store):
+    session_id = store.create_session()
+    turns = _turns(12)
+    for turn in turns:
+        store.append(session_id, turn)
+
+    def contents(messages):
+        return [m.content for m in messages]
+
+    assert contents(store.list_messages(session_id, start=3, stop=7)) == contents(turns[3:7])
+    assert contents(store.list_messages(session_id, start=9)) == contents(turns[9:])
+    assert contents(store.list_messages(session_id, 2, start=2, stop=8)) == contents(turns[6:8])
+    assert contents(store.list_messages(session_id, 3)) == contents(turns[-3:])
+    assert [m.token_count for m in store.list_messages(session_id, start=5, stop=6)] == [turns[5].token_count]
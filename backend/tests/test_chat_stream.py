@@ -0,0 +1,76 @@
+import asyncio
+
+import httpx
+
+from app.api import _sse_events
+from app.chat_service import ChatService
+from app.llm_admission import AdmissionController
+from app.llm_stub import StubSettings, StubTransport
+from app.openai_client import OpenAIClient
+from app.store import InMemoryChatStore
+
+
+class _TrackingTransport(StubTransport):
+    """Stub transport that remembers whether each response body was closed."""
+
+    def __init__(self, settings: StubSettings) -> None:
+        super().__init__(settings)
+        self.closed = []
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        response = await super().handle_async_request(request)
+        stream = response.stream
+        close = stream.aclose
+        index = len(self.closed)
+        self.closed.append(False)
+
+        async def aclose() -> None:
+            self.closed[index] = True
+            await close()
+
+        stream.aclose = aclose
+        return response
+
+
+def _chat(tokens_per_second: float):
+    settings = StubSettings(latency_ms=0, latency_p95_ms=0, tokens_per_second=tokens_per_second, seed=1)
+    transport = _TrackingTransport(settings)
+    admission = AdmissionController(max_concurrency=1)
+    llm = OpenAIClient(http_client=httpx.AsyncClient(transport=transport), admission=admission)
+    store = InMemoryChatStore()
+    return ChatService(store=store, llm=llm), store, transport, admission
+
+
+def _stream(chat: ChatService, session_id: str):
+    return chat.generate_stream(
+        session_id=session_id, user_text="Explain props.", system_prompt=None, persist=True, model="stub"
+    )
+
+
+def test_disconnect_closes_upstream_and_persists_nothing():
+    async def scenario():
+        chat, store, transport, admission = _chat(tokens_per_second=20)
+        session_id = store.create_session()
+        events = _sse_events(_stream(chat, session_id))
+        first = await events.__anext__()
+        assert first.startswith("event: delta")
+
+        await events.aclose()  # what Starlette does when the client goes away
+        assert transport.closed == [True]
+        assert admission.stats()["in_flight"] == 0
+        assert [m.role for m in store.list_messages(session_id)] == ["user"]
+
+    asyncio.run(scenario())
+
+
+def test_completed_stream_ends_with_done_and_persists_the_reply():
+    async def scenario():
+        chat, store, _, _ = _chat(tokens_per_second=0)
+        session_id = store.create_session()
+        frames = [frame async for frame in _sse_events(_stream(chat, session_id))]
+        assert frames[-1].startswith("event: done")
+        messages = store.list_messages(session_id)
+        assert [m.role for m in messages] == ["user", "assistant"]
+        assert f'"content": "{messages[-1].content}"' in frames[-1]
+
+    asyncio.run(scenario())
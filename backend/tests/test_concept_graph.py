@@ -0,0 +1,182 @@
+import asyncio
+import json
+import pickle
+
+import httpx
+
+from app.concept_graph import ConceptGraphService
+from app.concept_graph.models import ConceptGraph
+from app.concept_graph.similarity import SimilarityIndex, concept_words, label_features
+from app.llm_stub import StubSettings, StubTransport
+from app.message_record import MessageRecord
+from app.openai_client import OpenAIClient
+from app.store import InMemoryChatStore
+
+
+def _service():
+    settings = StubSettings(latency_ms=0, latency_p95_ms=0, tokens_per_second=0, seed=1)
+    llm = OpenAIClient(http_client=httpx.AsyncClient(transport=StubTransport(settings)))
+    store = InMemoryChatStore()
+    session_id = store.create_session()
+    store.append(session_id, MessageRecord.create("user", "How do I lift state up between sibling components?"))
+    return ConceptGraphService(store=store, llm=llm), session_id
+
+
+def _labels(graph: ConceptGraph):
+    return sorted(node.label for node in graph.concepts.values())
+
+
+def test_hooks_stay_apart_from_their_nouns():
+    graph = ConceptGraph()
+    pairs = ["useState", "State", "useEffect", "Effects", "useRef", "Refs", "useMemo", "Memo"]
+    graph.merge(concepts=[{"label": label} for label in pairs], edges=[])
+
+    assert _labels(graph) == sorted(pairs)
+
+
+def test_near_duplicates_merge_into_one_node():
+    graph = ConceptGraph()
+    graph.merge(concepts=[{"label": "Controlled inputs"}, {"label": "Uncontrolled inputs"}], edges=[])
+    graph.merge(concepts=[{"label": "Controlled input"}, {"label": "useState hook"}, {"label": "useState"}], edges=[])
+
+    assert _labels(graph) == ["Controlled inputs", "Uncontrolled inputs", "useState hook"]
+    assert "Controlled input" in graph.find_concept("Controlled inputs").aliases
+
+
+def test_common_words_do_not_make_every_concept_a_candidate():
+    index = SimilarityIndex()
+    for idx in range(500):
+        index.add(f"c{idx}", [f"Concept {idx}", f"alias {idx}"])
+    index.add("c7", ["Concept 7", "alias 7"])  # unchanged: re-adding is a no-op
+
+    words = concept_words("Concept 7")
+    assert len(index._candidates(label_features(words), frozenset(words), 0.65)) <= 2
+    assert index.best_match(["Concept 7"], threshold=0.65)[0] == "c7"
+
+
+def test_reads_neither_store_nor_change_the_graph():
+    graphs, session_id = _service()
+    etag = graphs.graph_etag(session_id)
+    graphs.export_graph_json(session_id)
+
+    assert graphs.graph_etag(session_id) == etag
+    assert graphs._graphs.get(session_id) is None
+
+    # A stored graph without its intent node yet is left alone by reads too.
+    graphs._graphs.upsert(session_id, graphs._graphs.new_graph())
+    revision = graphs.get_graph(session_id).meta.revision
+    graphs.export_graph(session_id)
+    assert graphs.get_graph(session_id).meta.revision == revision
+    assert graphs.get_graph(session_id).intent_id is None
+
+
+def test_builds_anchor_concepts_to_the_intent_node():
+    graphs, session_id = _service()
+    graph = asyncio.run(graphs.build_graph(session_id, mode="full"))
+
+    assert graph.intent_id is not None
+    revision = graph.meta.revision
+    graphs.export_graph(session_id)
+    assert graphs.get_graph(session_id).meta.revision == revision
+
+
+def _concept(label: str, index: int = 0):
+    return {"id": label.lower(), "label": label, "first_seen_index": index, "summary": f"About {label}."}
+
+
+def _edge(src: str, dst: str, relation: str = "enables", index: int = 0):
+    return {"from_concept_id": src, "to_concept_id": dst, "relation": relation, "introduced_index": index}
+
+
+def test_delta_feed_returns_only_what_changed_since_a_revision():
+    graph = ConceptGraph()
+    graph.merge(concepts=[_concept("Props"), _concept("State")], edges=[_edge("props", "state")])
+    seen = graph.meta.revision
+    graph.merge(concepts=[_concept("Context", 2)], edges=[_edge("state", "context", index=2)])
+
+    delta = graph.delta_to_dict(seen)
+    assert not delta["full"] and delta["since"] == seen
+    assert [concept["label"] for concept in delta["concepts"]] == ["Context"]
+    assert len(delta["edges"]) == 1 and delta["meta"]["revision"] == graph.meta.revision
+    assert graph.delta_to_dict(graph.meta.revision)["concepts"] == []
+    assert json.loads(graph.to_json(since=seen)) == delta
+
+
+def test_delta_feed_asks_for_a_resync_once_history_is_trimmed():
+    graph = ConceptGraph(history_limit=2)
+    for idx in range(4):
+        graph.merge(concepts=[_concept(f"Topic {idx}", idx)], edges=[])
+
+    assert graph.delta_to_dict(0)["full"]
+    assert len(graph.delta_to_dict(0)["concepts"]) == 4
+    assert not graph.delta_to_dict(graph.meta.revision - 1)["full"]
+    assert graph.delta_to_dict(graph.meta.revision + 5)["full"]  # a revision from before a restart
+
+    rebuilt = ConceptGraph()
+    rebuilt.continue_from(graph)
+    assert rebuilt.meta.revision > graph.meta.revision
+    assert rebuilt.delta_to_dict(graph.meta.revision)["full"]
+
+
+def test_encoded_graph_tracks_updates_and_survives_a_spill():
+    graph = ConceptGraph()
+    graph.merge(concepts=[_concept("State", 4), _concept("Props", 1)], edges=[_edge("props", "state", index=4)])
+    assert json.loads(graph.to_json()) == graph.to_dict()
+
+    # Re-seen earlier: State must move ahead of Props and its cached encoding must be dropped.
+    graph.merge(concepts=[{**_concept("State", 0), "summary": "Data a component remembers."}], edges=[])
+    encoded = json.loads(graph.to_json())
+    assert encoded == graph.to_dict()
+    assert [concept["label"] for concept in encoded["concepts"]] == ["State", "Props"]
+
+    restored = pickle.loads(pickle.dumps(graph))
+    assert json.loads(restored.to_json()) == graph.to_dict()
+    restored.merge(concepts=[_concept("Context", 2)], edges=[])
+    assert json.loads(restored.to_json()) == restored.to_dict()
+
+
+def _chain_graph() -> ConceptGraph:
+    graph = ConceptGraph()
+    labels = ["Components", "Props", "State", "Reducers", "Context"]
+    graph.merge(
+        concepts=[_concept(label, idx) for idx, label in enumerate(labels)],
+        edges=[
+            _edge("components", "props", "uses"),
+            _edge("props", "state", "enables"),
+            _edge("state", "reducers", "refines"),
+            _edge("reducers", "context", "enables"),
+        ],
+    )
+    return graph
+
+
+def _labels_of(graph: ConceptGraph, concept_ids) -> set:
+    return {graph.concepts[cid].label for cid in concept_ids}
+
+
+def test_neighborhood_walks_hops_directions_and_relations():
+    graph = _chain_graph()
+    state = graph.find_concept("State").id
+
+    concepts, edges, truncated = graph.neighborhood(state)
+    assert _labels_of(graph, concepts) == {"Props", "State", "Reducers"} and len(edges) == 2 and not truncated
+    concepts, _, _ = graph.neighborhood(state, hops=2, direction="out")
+    assert _labels_of(graph, concepts) == {"State", "Reducers", "Context"}
+    concepts, _, _ = graph.neighborhood(state, hops=3, relations=["Enables"])
+    assert _labels_of(graph, concepts) == {"State", "Props"}
+    concepts, _, truncated = graph.neighborhood(state, hops=5, max_concepts=2)
+    assert len(concepts) == 2 and truncated
+
+
+def test_adjacency_follows_edge_changes_and_subgraphs_keep_response_order():
+    graph = _chain_graph()
+    props, state = graph.find_concept("Props").id, graph.find_concept("State").id
+    graph.merge(concepts=[], edges=[_edge("props", "context", "uses", index=4)])
+
+    concepts, _, _ = graph.neighborhood(props, direction="out")
+    assert _labels_of(graph, concepts) == {"Props", "State", "Context"}
+    assert len(graph.edge_ids_of(state, direction="in")) == 1
+
+    subset = json.loads(graph.subset_to_json([state, props], graph.induced_edge_ids([state, props])))
+    assert [concept["label"] for concept in subset["concepts"]] == ["Props", "State"]
+    assert [(edge["from_concept_id"], edge["to_concept_id"]) for edge in subset["edges"]] == [(props, state)]
@@ -0,0 +1,157 @@
+import asyncio
+import multiprocessing
+import os
+from pathlib import Path
+
+import app.docs_index as docs_index
+from app.context_loader import ContextProvider, DocsRetriever
+from app.docs_index import DocsIndexWriter, SegmentedIndex, _read_manifest
+
+PROSE = "State lets a component remember information between renders, such as what the user typed. " * 3
+
+
+def _page(source: Path, rel: str, body: str) -> None:
+    path = source / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(f"---\ntitle: {rel}\n---\n\n## Section\n\n{body}\n", encoding="utf-8")
+
+
+def _search(root: Path, query: str, k: int = 10):
+    index = SegmentedIndex.open(root)
+    try:
+        return {index.chunk(key).source for _, key in index.search(query, k=k)}
+    finally:
+        index.close()
+
+
+def test_sync_indexes_only_changed_pages(tmp_path):
+    source, root = tmp_path / "src", tmp_path / "index"
+    _page(source, "a.md", PROSE)
+    _page(source, "b.md", PROSE.replace("State", "Effects"))
+    writer = DocsIndexWriter(root, source)
+
+    assert writer.sync()["changed"] == 2
+    assert writer.sync()["changed"] == 0
+    _page(source, "b.md", "Refs let a component hold information that is not used for rendering. " * 3)
+    assert writer.sync()["changed"] == 1
+    assert _search(root, "refs rendering") == {"b.md"}
+
+
+def test_merge_skips_pages_without_chunks(tmp_path):
+    source, root = tmp_path / "src", tmp_path / "index"
+    writer = DocsIndexWriter(root, source)
+    _page(source, "a.md", PROSE)
+    writer.sync()
+    # Too short to produce a chunk, so its segment is dropped while the page entry still names it.
+    _page(source, "tiny.md", "Short.")
+    writer.sync()
+    _page(source, "b.md", PROSE.replace("State", "Context"))
+    writer.sync()
+
+    assert writer.merge()
+    manifest = _read_manifest(root)
+    assert len(manifest["segments"]) == 1
+    assert manifest["files"]["tiny.md"]["start"] == manifest["files"]["tiny.md"]["end"]
+    assert _search(root, "remember information") == {"a.md", "b.md"}
+    assert sorted(os.listdir(root / "segments")) == manifest["segments"]
+
+
+def _sync_and_merge(root: Path, source: Path) -> None:
+    writer = DocsIndexWriter(root, source, max_segments=1)
+    writer.sync()
+    if writer.needs_merge():
+        writer.merge()
+
+
+def test_worker_processes_take_turns(tmp_path):
+    source, root = tmp_path / "src", tmp_path / "index"
+    for idx in range(200):
+        _page(source, f"page-{idx}.md", PROSE.replace("State", f"Topic{idx}"))
+    # Like uvicorn workers all syncing the shared index at startup.
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=_sync_and_merge, args=(root, source)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+        assert worker.exitcode == 0
+
+    manifest = _read_manifest(root)
+    assert len(manifest["files"]) == 200
+    assert sorted(os.listdir(root / "segments")) == sorted(manifest["segments"])
+    assert _search(root, "topic7", k=1) == {"page-7.md"}
+
+
+def test_open_closes_segments_when_one_vanishes(tmp_path, monkeypatch):
+    source, root = tmp_path / "src", tmp_path / "index"
+    writer = DocsIndexWriter(root, source)
+    for name in ("a.md", "b.md", "c.md"):
+        _page(source, name, PROSE.replace("State", name[0].upper()))
+        writer.sync()
+    opened = []
+    real = docs_index.DocsIndex
+
+    class RacingIndex(real):
+        # The third segment is "merged away" on the first attempt only.
+        def __init__(self, path):
+            if len(opened) == 2:
+                opened.append(None)
+                raise FileNotFoundError(path)
+            super().__init__(path)
+            opened.append(self)
+
+    monkeypatch.setattr(docs_index, "DocsIndex", RacingIndex)
+    index = SegmentedIndex.open(root)
+
+    assert index is not None and index.stats()["segments"] == 3
+    assert all(segment._file.closed for segment in opened[:2])
+    index.close()
+
+
+def test_common_terms_do_not_change_the_top_hits(tmp_path, monkeypatch):
+    source, root = tmp_path / "src", tmp_path / "index"
+    for idx in range(300):
+        body = f"Every component renders state. Topic{idx} explains component props in group{idx % 5}. " * (2 + idx % 3)
+        _page(source, f"page-{idx}.md", body)
+    DocsIndexWriter(root, source).sync()
+    index = SegmentedIndex.open(root)
+    # The group words match 120 pages, so the common words are only scored for the best of them.
+    query = "how does a component render state and props in topic42, topic117, group2 and group3"
+
+    bounded = index.search(query, k=4)
+    monkeypatch.setattr(docs_index, "MAX_TERM_POSTINGS", 10**9)
+    assert [key for _, key in index.search(query, k=4)] == [key for _, key in bounded]
+    assert {index.chunk(key).source for _, key in bounded[:2]} == {"page-42.md", "page-117.md"}
+    index.close()
+
+
+def test_retriever_caches_queries_and_runs_off_the_loop(tmp_path):
+    source, root = tmp_path / "src", tmp_path / "index"
+    _page(source, "a.md", PROSE)
+    _page(source, "b.md", "Refs let a component hold information that is not used for rendering. " * 3)
+    DocsIndexWriter(root, source).sync()
+    retriever = DocsRetriever(root, fallback=ContextProvider(tmp_path / "missing.txt"))
+
+    first = retriever.context_for("refs rendering")
+    second = asyncio.run(retriever.context_for_async("refs rendering"))
+
+    assert "Refs let a component" in first.text
+    assert second.text == first.text and second.version == first.version
+    assert retriever.stats()["cache_hits"] == 1
+
+
+def test_cached_queries_skip_the_worker_thread(tmp_path, monkeypatch):
+    source, root = tmp_path / "src", tmp_path / "index"
+    _page(source, "a.md", PROSE)
+    DocsIndexWriter(root, source).sync()
+    retriever = DocsRetriever(root, fallback=ContextProvider(tmp_path / "missing.txt"))
+    first = asyncio.run(retriever.context_for_async("component state"))
+
+    async def no_thread(*args, **kwargs):
+        raise AssertionError("a cached query went to a worker thread")
+
+    monkeypatch.setattr(asyncio, "to_thread", no_thread)
+    second = asyncio.run(retriever.context_for_async("component state"))
+
+    assert second.text == first.text and second.version == first.version
+    assert retriever.stats()["cache_hits"] == 1 and retriever.stats()["queries"] == 2
@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+from app.llm_admission import AdmissionController, AdmissionRejected, estimate_request_tokens
+
+
+async def _hold(controller: AdmissionController, name: str, order: list, release: asyncio.Event, tokens: int = 1):
+    async with controller.admit("stub", tokens):
+        order.append(name)
+        await release.wait()
+
+
+def test_waiters_are_admitted_in_arrival_order():
+    async def scenario():
+        controller = AdmissionController(max_concurrency=1)
+        order: list = []
+        releases = [asyncio.Event() for _ in range(4)]
+        tasks = []
+        for idx, release in enumerate(releases):
+            tasks.append(asyncio.ensure_future(_hold(controller, f"r{idx}", order, release)))
+            await asyncio.sleep(0)
+        assert order == ["r0"] and controller.stats()["queue_depth"] == 3
+
+        for release in releases:
+            release.set()
+            await asyncio.sleep(0.01)
+        await asyncio.gather(*tasks)
+        assert order == ["r0", "r1", "r2", "r3"]
+        assert controller.stats()["in_flight"] == 0 and controller.admitted == 4
+
+    asyncio.run(scenario())
+
+
+def test_a_cancelled_waiter_leaves_the_queue():
+    async def scenario():
+        controller = AdmissionController(max_concurrency=1)
+        order: list = []
+        first, second, third = asyncio.Event(), asyncio.Event(), asyncio.Event()
+        head = asyncio.ensure_future(_hold(controller, "head", order, first))
+        await asyncio.sleep(0)
+        leaving = asyncio.ensure_future(_hold(controller, "leaving", order, second))
+        behind = asyncio.ensure_future(_hold(controller, "behind", order, third))
+        await asyncio.sleep(0)
+        leaving.cancel()
+        first.set()
+        third.set()
+        await asyncio.gather(head, behind)
+        assert order == ["head", "behind"] and controller.stats()["queue_depth"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_request_budget_rejects_once_the_queue_wait_runs_out():
+    async def scenario():
+        controller = AdmissionController(requests_per_minute=1, max_queue_seconds=0.05)
+        async with controller.admit("stub", 10):
+            pass
+        with pytest.raises(AdmissionRejected):
+            async with controller.admit("stub", 10):
+                pass
+        async with controller.admit("other-model", 10):  # budgets are per model
+            pass
+        assert controller.rejected == 1 and controller.admitted == 2
+
+    asyncio.run(scenario())
+
+
+def test_token_budget_holds_back_large_requests():
+    async def scenario():
+        controller = AdmissionController(tokens_per_minute=6000, max_queue_seconds=0.05)
+        async with controller.admit("stub", 5000):
+            pass
+        with pytest.raises(AdmissionRejected):
+            async with controller.admit("stub", 5000):
+                pass
+        async with controller.admit("stub", 500):  # 1000 tokens are left
+            pass
+
+    asyncio.run(scenario())
+
+
+def test_token_estimate_counts_the_prompt_and_the_output_reserve():
+    messages = [{"role": "user", "content": "x" * 400}]
+    assert estimate_request_tokens(messages, 100) == 200
+    assert estimate_request_tokens(messages, None) == 100 + 512
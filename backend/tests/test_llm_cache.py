@@ -0,0 +1,70 @@
+import asyncio
+
+import httpx
+
+from app.llm_cache import ResponseCache
+from app.llm_stub import StubSettings, StubTransport
+from app.openai_client import OpenAIClient
+
+MESSAGES = [{"role": "user", "content": "What is a React hook?"}]
+
+
+class _CountingTransport(StubTransport):
+    def __init__(self) -> None:
+        super().__init__(StubSettings(latency_ms=1, latency_p95_ms=1, tokens_per_second=0, seed=1))
+        self.calls = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        return await super().handle_async_request(request)
+
+
+def _client(cache: ResponseCache):
+    transport = _CountingTransport()
+    return OpenAIClient(http_client=httpx.AsyncClient(transport=transport), cache=cache), transport
+
+
+def test_use_cache_false_goes_upstream():
+    async def scenario():
+        cache = ResponseCache()
+        client, transport = _client(cache)
+        first = await client.generate_text(model="stub", messages=MESSAGES, cache_ttl=60)
+        again = await client.generate_text(model="stub", messages=MESSAGES, cache_ttl=60)
+        assert again == first and transport.calls == 1
+
+        await client.generate_text(model="stub", messages=MESSAGES, cache_ttl=60, use_cache=False)
+        assert transport.calls == 2
+        assert cache.stats()["bypasses"] == 1 and cache.stats()["stores"] == 1
+
+        await client.generate_text(model="stub", messages=MESSAGES)  # no TTL: never cached
+        assert transport.calls == 3
+
+    asyncio.run(scenario())
+
+
+def test_disk_tier_survives_a_restart_and_hits_are_fresh_objects(tmp_path):
+    path = str(tmp_path / "llm_cache.db")
+    key = ResponseCache.make_key(
+        kind="json", model="stub", messages=MESSAGES, temperature=None, max_output_tokens=None
+    )
+    cache = ResponseCache(disk_path=path)
+    cache.put(key, {"concepts": ["useState"]}, ttl=60)
+    cache.close()
+
+    reopened = ResponseCache(disk_path=path)
+    hit = reopened.get(key)
+    assert hit == {"concepts": ["useState"]} and reopened.stats()["disk_hits"] == 1
+    hit["concepts"].append("mutated")
+    assert reopened.get(key) == {"concepts": ["useState"]}
+    reopened.close()
+
+
+def test_keys_ignore_whitespace_but_not_the_context_version():
+    def key(content: str, version: str = "") -> str:
+        messages = [{"role": "user", "content": content}]
+        return ResponseCache.make_key(
+            kind="text", model="m", messages=messages, temperature=0.2, max_output_tokens=None, context_version=version
+        )
+
+    assert key("What  is\na hook?") == key("What is a hook?")
+    assert key("What is a hook?", "v1") != key("What is a hook?", "v2")
@@ -0,0 +1,53 @@
+import asyncio
+import json
+
+from app.llm_stub import StubResponder, StubSettings, handle_responses
+
+
+def _settings(**kwargs) -> StubSettings:
+    return StubSettings(latency_ms=0, tokens_per_second=0, seed=7, **kwargs)
+
+
+def _body(system: str, user: str, **kwargs):
+    return {"model": "stub", "input": [{"role": "system", "content": system}, {"role": "user", "content": user}], **kwargs}
+
+
+def test_extraction_payload_is_deterministic_and_cites_transcript_lines():
+    transcript = "Transcript:\n[3] user: How does useState work?\n[4] assistant: It stores state."
+    body = _body("You are a concept graph builder.", transcript)
+
+    async def reply():
+        status, _, payload = await handle_responses(StubResponder(_settings()), body)
+        assert status == 200
+        return json.loads(payload["output"][0]["content"][0]["text"])
+
+    first, second = asyncio.run(reply()), asyncio.run(reply())
+    assert first == second
+    labels = [concept["label"] for concept in first["concepts"]]
+    assert "useState" in labels
+    assert {concept["first_seen_index"] for concept in first["concepts"]} <= {3, 4}
+    assert len(first["edges"]) == len(first["concepts"]) - 1
+
+
+def test_streamed_deltas_add_up_to_the_plain_reply():
+    body = _body("You are a tutor.", "Explain props.", max_output_tokens=40)
+
+    async def scenario():
+        _, _, plain = await handle_responses(StubResponder(_settings()), body)
+        status, headers, events = await handle_responses(StubResponder(_settings()), {**body, "stream": True})
+        assert status == 200 and headers["content-type"] == "text/event-stream"
+        frames = [json.loads(chunk.decode().split("data: ", 1)[1]) async for chunk in events]
+        return plain["output"][0]["content"][0]["text"], frames
+
+    text, frames = asyncio.run(scenario())
+    assert frames[0]["type"] == "response.created" and frames[-1]["type"] == "response.completed"
+    assert "".join(frame["delta"] for frame in frames[1:-1]) == text
+
+
+def test_injected_errors_look_like_rate_limits():
+    async def scenario():
+        return await handle_responses(StubResponder(_settings(error_rate=1.0)), _body("s", "u"))
+
+    status, headers, payload = asyncio.run(scenario())
+    assert status == 429 and headers == {"retry-after-ms": "200"}
+    assert payload["error"]["code"] == "rate_limit_exceeded"
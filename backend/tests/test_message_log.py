@@ -0,0 +1,41 @@
+from app.bounded_cache import CacheLimits, process_spill_dir
+from app.message_log import MessageLog
+from app.message_record import MessageRecord
+from app.store import InMemoryChatStore
+
+
+def _record(index: int) -> MessageRecord:
+    role = "user" if index % 2 == 0 else "assistant"
+    return MessageRecord.create(role, f"message {index} — ünïcode {'x' * (index % 7)}")
+
+
+def test_spilled_messages_read_back_in_order(tmp_path):
+    records = [_record(i) for i in range(200)]
+    log = MessageLog(hot_limit=8, segment_dir=tmp_path)
+    for record in records:
+        log.append(record)
+
+    assert log.cold_count > 0
+    assert len(log) == len(records)
+    assert [m.uid for m in log] == [r.uid for r in records]
+    assert [m.content for m in log[5:40]] == [r.content for r in records[5:40]]
+    assert log[3].role == records[3].role and log[3].ts == records[3].ts
+    assert [m.content for m in log.tail(3)] == [r.content for r in records[-3:]]
+    assert log.first_user_message().uid == records[0].uid
+
+    log.discard()
+    assert not list(tmp_path.iterdir())
+
+
+def test_chat_store_segments_are_per_process_and_removed_on_close(tmp_path):
+    store = InMemoryChatStore(CacheLimits(spill_dir=str(tmp_path)), hot_messages=4)
+    sid = store.create_session()
+    for i in range(50):
+        store.append(sid, _record(i))
+
+    segment_dir = process_spill_dir(str(tmp_path)) / "message_log"
+    assert len(list(segment_dir.glob("*.seg"))) == 1
+    assert [m.content for m in store.list_messages(sid)][:2] == [_record(0).content, _record(1).content]
+
+    store.close()
+    assert not segment_dir.exists()
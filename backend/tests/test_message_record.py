@@ -0,0 +1,17 @@
+import dataclasses
+
+import pytest
+
+from app.context_builder import message_tokens
+from app.message_record import MessageRecord, message_token_count
+
+
+def test_token_count_is_set_at_construction_and_records_stay_frozen():
+    record = MessageRecord.create("user", "How do I lift state up?")
+
+    assert record.token_count == message_token_count(record.content) == message_tokens(record)
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        record.token_count = 0  # type: ignore[misc]
+
+    row = MessageRecord.from_row(record.id, record.role, record.content, record.ts)
+    assert row == record and hash(row) == hash(record)
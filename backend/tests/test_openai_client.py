@@ -0,0 +1,113 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.llm_resilience import CallPolicy, CircuitBreaker, LatencyTracker, default_policies
+from app.llm_stub import StubSettings, StubTransport
+from app.openai_client import OpenAIClient
+
+MESSAGES = [{"role": "user", "content": "What is a React hook?"}]
+
+
+def _client(latency_ms: float, **kwargs) -> OpenAIClient:
+    settings = StubSettings(latency_ms=latency_ms, latency_p95_ms=latency_ms, tokens_per_second=0, seed=1)
+    return OpenAIClient(http_client=httpx.AsyncClient(transport=StubTransport(settings)), **kwargs)
+
+
+async def _cancel_after(coro, delay: float) -> None:
+    task = asyncio.ensure_future(coro)
+    await asyncio.sleep(delay)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+
+def test_cancelled_half_open_probe_releases_the_breaker():
+    async def scenario():
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+        breaker.record_failure()
+        client = _client(500, breaker=breaker)
+        await _cancel_after(client.generate_text(model="stub", messages=MESSAGES), 0.05)
+        assert breaker.state == "half_open"
+        breaker.before_call()  # raises CircuitOpenError while the dead probe holds the slot
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_caller_cancels_the_hedged_primary():
+    async def scenario():
+        policies = default_policies()
+        policies["default"] = CallPolicy(hedge=True, hedge_min_samples=1)
+        client = _client(500, policies=policies)
+        # A recorded latency past the cancellation point: the primary is still alone when the caller leaves.
+        client._latency["default"] = tracker = LatencyTracker()
+        tracker.record(10.0)
+        await _cancel_after(client.generate_text(model="stub", messages=MESSAGES), 0.05)
+        await asyncio.sleep(0)
+        assert asyncio.all_tasks() == {asyncio.current_task()}
+
+    asyncio.run(scenario())
+
+
+class _FailingStreamTransport(StubTransport):
+    """Streams like the stub, but the final event reports failure instead of completion."""
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        response = await super().handle_async_request(request)
+        if not isinstance(response.stream, httpx.AsyncByteStream):
+            return response
+        upstream = response.stream
+
+        async def chunks():
+            async for chunk in upstream:
+                yield chunk.replace(b"response.completed", b"response.failed")
+
+        return httpx.Response(response.status_code, headers=response.headers, stream=_Bytes(chunks()))
+
+
+class _Bytes(httpx.AsyncByteStream):
+    def __init__(self, chunks) -> None:
+        self._chunks = chunks
+
+    async def __aiter__(self):
+        async for chunk in self._chunks:
+            yield chunk
+
+    async def aclose(self) -> None:
+        await self._chunks.aclose()
+
+
+def _stream_client(transport: httpx.AsyncBaseTransport, breaker: CircuitBreaker) -> OpenAIClient:
+    return OpenAIClient(http_client=httpx.AsyncClient(transport=transport), breaker=breaker)
+
+
+def test_stream_failing_midway_opens_the_breaker():
+    async def scenario():
+        breaker = CircuitBreaker(failure_threshold=1)
+        settings = StubSettings(latency_ms=1, latency_p95_ms=1, tokens_per_second=0, seed=1)
+        client = _stream_client(_FailingStreamTransport(settings), breaker)
+        deltas = []
+        with pytest.raises(RuntimeError):
+            async for delta in client.stream_text(model="stub", messages=MESSAGES):
+                deltas.append(delta)
+        assert deltas  # the failure came after text had started flowing
+        assert breaker.state == "open"
+
+    asyncio.run(scenario())
+
+
+def test_completed_stream_closes_a_half_open_breaker():
+    async def scenario():
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+        breaker.record_failure()
+        settings = StubSettings(latency_ms=1, latency_p95_ms=1, tokens_per_second=0, seed=1)
+        client = _stream_client(StubTransport(settings), breaker)
+        stream = client.stream_text(model="stub", messages=MESSAGES)
+        await stream.__anext__()
+        assert breaker.state == "half_open"  # no verdict while the stream is still open
+        async for _ in stream:
+            pass
+        assert breaker.state == "closed"
+
+    asyncio.run(scenario())
@@ -0,0 +1,88 @@
+import asyncio
+
+from app.goal_node.jobs import RefinementQueue
+from app.goal_node.models import InteractionEvent
+
+
+class _Runner:
+    """Records each job it runs; sessions listed in `gates` wait for their event first."""
+
+    def __init__(self) -> None:
+        self.runs = []
+        self.gates = {}
+
+    async def __call__(self, job):
+        self.runs.append((job.session_id, list(job.concept_ids), len(job.events)))
+        gate = self.gates.get(job.session_id)
+        if gate is not None:
+            await gate.wait()
+        if "broken" in job.concept_ids:
+            raise ValueError("refinement failed")
+        return len(self.runs)
+
+
+async def _settle(queue: RefinementQueue, *job_ids: str) -> None:
+    for _ in range(200):
+        if all(queue.get(job_id).status in ("done", "failed") for job_id in job_ids):
+            return
+        await asyncio.sleep(0.005)
+    raise AssertionError("jobs did not finish")
+
+
+def test_a_burst_of_requests_folds_into_one_queued_job():
+    async def scenario():
+        runner = _Runner()
+        queue = RefinementQueue(runner, workers=2)
+        event = InteractionEvent(concept_id="c_state", event="expand", strength=1.0)
+        first = queue.enqueue("s1", events=[event], concept_ids=["c_state"])
+        second = queue.enqueue("s1", concept_ids=["c_props", "c_state"])
+        third = queue.enqueue("s1", concept_ids=[" c_context "], select_focus=True)
+        assert first is second is third and first.coalesced == 2
+
+        await _settle(queue, first.id)
+        assert runner.runs == [("s1", ["c_state", "c_props", "c_context"], 1)]
+        assert first.status == "done" and first.select_focus and first.events == []
+        assert queue.stats()["coalesced"] == 2 and queue.stats()["completed"] == 1
+        queue.close()
+
+    asyncio.run(scenario())
+
+
+def test_a_job_queued_behind_a_running_one_waits_for_it():
+    async def scenario():
+        runner = _Runner()
+        runner.gates["s1"] = gate = asyncio.Event()
+        queue = RefinementQueue(runner, workers=4)
+        running = queue.enqueue("s1", concept_ids=["c_a"])
+        await asyncio.sleep(0.01)
+        assert running.status == "running"
+
+        queued = queue.enqueue("s1", concept_ids=["c_b"])
+        also = queue.enqueue("s1", concept_ids=["c_c"])
+        other = queue.enqueue("s2", concept_ids=["c_x"])
+        assert queued is also and queued is not running
+        await _settle(queue, other.id)  # other sessions are not held up
+        assert queued.status == "queued"
+
+        gate.set()
+        await _settle(queue, running.id, queued.id)
+        assert [run[1] for run in runner.runs if run[0] == "s1"] == [["c_a"], ["c_b", "c_c"]]
+        assert queued.started_ts >= running.finished_ts
+        queue.close()
+
+    asyncio.run(scenario())
+
+
+def test_failed_jobs_report_their_error_and_stay_queryable():
+    async def scenario():
+        queue = RefinementQueue(_Runner(), workers=1, history=1)
+        failed = queue.enqueue("s1", concept_ids=["broken"])
+        await _settle(queue, failed.id)
+        assert (failed.status, failed.error) == ("failed", "refinement failed")
+
+        done = queue.enqueue("s2", concept_ids=["c_a"])
+        await _settle(queue, done.id)
+        assert queue.get(done.id) is done and queue.get(failed.id) is None  # history keeps one
+        queue.close()
+
+    asyncio.run(scenario())
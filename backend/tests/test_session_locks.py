@@ -0,0 +1,74 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.concept_graph import ConceptGraphService
+from app.concept_graph.extractor import ConceptExtractionResult
+from app.llm_stub import StubSettings, StubTransport
+from app.message_record import MessageRecord
+from app.openai_client import OpenAIClient
+from app.session_locks import RevisionConflict, SessionLocks
+from app.store import InMemoryChatStore
+
+
+def test_writes_to_one_session_run_one_at_a_time():
+    async def scenario():
+        locks = SessionLocks()
+        active = {"a": 0, "b": 0}
+        peak = {"a": 0, "b": 0}
+
+        async def write(session_id: str) -> None:
+            async with locks.hold(session_id):
+                active[session_id] += 1
+                peak[session_id] = max(peak[session_id], active[session_id])
+                await asyncio.sleep(0.05)
+                active[session_id] -= 1
+
+        started = asyncio.get_running_loop().time()
+        await asyncio.gather(*(write(session_id) for session_id in "aabb"))
+        assert peak == {"a": 1, "b": 1}
+        assert asyncio.get_running_loop().time() - started < 0.15  # a and b never waited on each other
+        assert locks.stats()["contended"] == 2 and locks.stats()["active_sessions"] == 0
+
+    asyncio.run(scenario())
+
+
+class _GatedExtractor:
+    """Stands in for the LLM extraction; calls marked `gated` wait until released."""
+
+    def __init__(self) -> None:
+        self.release = asyncio.Event()
+        self.gated = True
+
+    async def extract(self, *, session_id, messages, start_index, use_cache=True):
+        if self.gated:
+            self.gated = False
+            await self.release.wait()
+        labels = [f"Topic {start_index + offset}" for offset in range(len(messages))]
+        return ConceptExtractionResult(concepts=[{"label": label} for label in labels], edges=[])
+
+
+def test_unlocked_build_conflicts_with_a_rebuild_made_while_it_extracted():
+    async def scenario():
+        llm = OpenAIClient(http_client=httpx.AsyncClient(transport=StubTransport(StubSettings(latency_ms=0))))
+        store = InMemoryChatStore()
+        locks = SessionLocks()
+        graphs = ConceptGraphService(store=store, llm=llm, locks=locks)
+        graphs._extractor = extractor = _GatedExtractor()
+        session_id = store.create_session()
+        store.append(session_id, MessageRecord.create("user", "How does useState work?"))
+
+        background = asyncio.ensure_future(graphs.build_graph(session_id, mode="incremental", apply_locks=locks))
+        await asyncio.sleep(0)
+        async with locks.hold(session_id):
+            rebuilt = await graphs.build_graph(session_id, mode="full")
+        extractor.release.set()
+
+        with pytest.raises(RevisionConflict):
+            await background
+        assert locks.stats()["conflicts"] == 1
+        assert graphs.get_graph(session_id) is rebuilt
+        assert rebuilt.meta.last_processed_index == 0
+
+    asyncio.run(scenario())
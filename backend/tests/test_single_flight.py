@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from app.single_flight import SingleFlight
+
+
+def test_concurrent_callers_share_one_execution():
+    async def scenario():
+        flight = SingleFlight()
+        calls = []
+
+        async def build():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"nodes": len(calls)}
+
+        results = await asyncio.gather(*(flight.do("session-1", build) for _ in range(5)))
+        assert calls == [1] and all(result is results[0] for result in results)
+        assert flight.stats() == {"in_flight": 0, "executed": 1, "coalesced": 4}
+
+        await flight.do("session-1", build)  # the key is free again once the call finished
+        assert len(calls) == 2
+
+    asyncio.run(scenario())
+
+
+def test_a_cancelled_caller_leaves_the_shared_call_running():
+    async def scenario():
+        flight = SingleFlight()
+        release = asyncio.Event()
+
+        async def build():
+            await release.wait()
+            return "graph"
+
+        leaving = asyncio.ensure_future(flight.do("k", build))
+        staying = asyncio.ensure_future(flight.do("k", build))
+        await asyncio.sleep(0)
+        leaving.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        assert await staying == "graph"
+        assert leaving.cancelled()
+
+    asyncio.run(scenario())
+
+
+def test_failures_reach_every_waiter_and_free_the_key():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("upstream")
+
+        results = await asyncio.gather(flight.do("k", fail), flight.do("k", fail), return_exceptions=True)
+        assert all(isinstance(result, ValueError) for result in results)
+        assert flight.stats()["in_flight"] == 0
+        with pytest.raises(ValueError):
+            await flight.do("k", fail)
+        assert flight.executed == 2
+
+    asyncio.run(scenario())
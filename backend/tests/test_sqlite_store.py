@@ -0,0 +1,71 @@
+import sqlite3
+import time
+
+from app.message_record import MessageRecord
+from app.sqlite_store import SqliteChatStore
+
+
+def _wait_for(predicate, timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+def _rows_on_disk(path: str, session_id: str) -> int:
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM messages WHERE session_id = ?", (session_id,)).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_appends_are_group_committed_in_batches(tmp_path):
+    path = str(tmp_path / "chat.db")
+    store = SqliteChatStore(path, batch_size=4, commit_interval=60)
+    session_id = store.create_session()
+    for idx in range(3):
+        store.append(session_id, MessageRecord.create("user", f"turn {idx}"))
+    assert store.stats()["pending_appends"] == 3
+    assert _rows_on_disk(path, session_id) == 0
+
+    store.append(session_id, MessageRecord.create("assistant", "turn 3"))  # fills the batch
+    assert store.stats()["pending_appends"] == 0
+    assert _rows_on_disk(path, session_id) == 4
+    store.close()
+
+
+def test_the_flusher_commits_a_partial_batch_after_the_interval(tmp_path):
+    path = str(tmp_path / "chat.db")
+    store = SqliteChatStore(path, batch_size=64, commit_interval=0.01)
+    session_id = store.create_session()
+    store.append(session_id, MessageRecord.create("user", "hello"))
+
+    assert _wait_for(lambda: _rows_on_disk(path, session_id) == 1)
+    assert store.stats()["pending_appends"] == 0
+    store.close()
+
+
+def test_reads_see_pending_writes_and_a_reopened_store_keeps_everything(tmp_path):
+    path = str(tmp_path / "chat.db")
+    store = SqliteChatStore(path, batch_size=64, commit_interval=60)
+    session_id = store.create_session()
+    store.append(session_id, MessageRecord.create("user", "What is JSX?"))
+    store.append(session_id, MessageRecord.create("assistant", "Markup in JavaScript."))
+    assert [m.content for m in store.list_messages(session_id)] == ["What is JSX?", "Markup in JavaScript."]
+    store.set_summary(session_id, "JSX basics", 2)
+    store.append(session_id, MessageRecord.create("user", "And props?"))
+    store.close()  # flushes the last, still pending append
+
+    conn = sqlite3.connect(path)
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"  # WAL is persistent
+    conn.close()
+    reopened = SqliteChatStore(path)
+    session = reopened.get_session(session_id)
+    assert [m.content for m in session.messages] == ["What is JSX?", "Markup in JavaScript.", "And props?"]
+    assert session.first_user_ts is not None
+    assert (session.summary, session.summary_upto) == ("JSX basics", 2)
+    assert reopened.count_messages(session_id) == 3
+    reopened.close()